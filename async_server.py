@@ -0,0 +1,444 @@
+import argparse
+import asyncio
+import itertools
+import time
+from game_logic import BitBoard, Board
+from journal import Journal, recover
+from matchmaking import MATCH_WINDOW, WIDEN_PER_SECOND, MatchQueue, Ratings
+from metrics import ServerMetrics, serve_http
+from protocol import (HEARTBEAT_INTERVAL, IDLE_TIMEOUT, MAX_PLAYER_BACKLOG, FrameDecoder, ProtocolError,
+                      encode_message, negotiate)
+from room import RECONNECT_GRACE, TURN_TIMEOUT, GameRoom, RoomConfig, SHIP_SIZES, new_token
+from timers import TimerWheel
+
+HELLO_TIMEOUT = 1.0  # Seconds to wait for a hello (which may resume a session) before seating a client
+MATCH_INTERVAL = 0.25  # Seconds between matchmaking passes for players whose window has widened
+
+
+class PlayerConnection:
+    """A connected player and the room seat it occupies"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.addr = writer.get_extra_info('peername')
+        self.room = None
+        self.seat = None
+        self.encoding = 'json'  # Encoding for messages sent to this player
+        self.token = None  # Session token handed out in init
+        self.name = None  # Player name from hello, used for ratings
+        self.moved = False  # Handed to another process, which serves it from now on
+        self.unread = []  # Messages read but not processed yet, passed on with the socket when it moves
+        self.outbox = []  # Frames queued during this loop iteration, written together by flush()
+        self.queued = 0  # Bytes in outbox
+        self.last_heard = time.monotonic()  # When the player last sent anything
+        self.heartbeat = None  # Timer that pings the player or drops it once it has gone quiet
+
+
+class AsyncBattleshipServer:
+    """Single-process server that pairs players into many independent rooms
+
+    Every timeout lives on one timer wheel advanced by a single task: each
+    connection has a heartbeat timer, each room a turn clock and each
+    dropped seat its grace window. Reads only stamp the connection, and a
+    shot only stamps the room; a timer that fires early for that reason
+    re-arms itself for whatever time is left.
+    """
+
+    def __init__(self, host='127.0.0.1', port=54321, backlog=1024, config=None, journal=None, grace=RECONNECT_GRACE,
+                 queue=None, ratings=None, metrics=None, reuse_port=False, heartbeat=HEARTBEAT_INTERVAL,
+                 idle_timeout=IDLE_TIMEOUT, turn_timeout=TURN_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.backlog = backlog
+        self.reuse_port = reuse_port  # Lets several worker processes listen on the same port
+        self.config = config or RoomConfig()
+        self.journal = journal
+        self.grace = grace
+        self.heartbeat = heartbeat  # Seconds of silence before a player is pinged
+        self.idle_timeout = idle_timeout  # Seconds of silence before a player is dropped; 0 never drops
+        self.turn_timeout = turn_timeout  # Seconds a seat has for its move; 0 waits forever
+        self.wheel = TimerWheel()
+
+        self.rooms = {}  # room_id -> GameRoom
+        self.players = {}  # room_id -> [PlayerConnection, PlayerConnection]; None for an empty seat
+        self.queue = queue or MatchQueue()  # Players waiting for an opponent
+        self.ratings = ratings or Ratings()
+        self.metrics = metrics or ServerMetrics()
+        self.names = {}  # room_id -> player names, for the rating update when the room closes
+        self.room_ids = itertools.count(journal.next_room_id if journal else 1)
+        self.sessions = {}  # token -> (room_id, seat)
+        self.grace_timers = {}  # (room_id, seat) -> Timer that abandons the room
+        self.turn_timers = {}  # room_id -> Timer that checks the room's turn clock
+
+    def make_room(self, room_id, config):
+        """Create a room whose seats are looked up in self.players"""
+        players = self.players[room_id] = [None, None]
+        room = GameRoom(room_id, lambda seat, data: self.send_to_connection(players[seat], data),
+                        config=config, journal=self.journal, metrics=self.metrics)
+        self.rooms[room_id] = room
+        self.metrics.rooms.set(len(self.rooms))
+        return room
+
+    def recover(self):
+        """Bring back the rooms the journal shows as unfinished"""
+        rooms = recover(self.journal.path, self.make_room, self.config.board_class)
+        for room in rooms.values():
+            for seat, token in enumerate(room.tokens):
+                room.player_left(seat)
+                if token:
+                    self.sessions[token] = (room.room_id, seat)
+        print(f"♻️ Recovered {len(rooms)} unfinished rooms from {self.journal.path}")
+
+    def send_to_connection(self, conn, data):
+        """Queue data on a player's connection; everything queued in one loop iteration goes out in one write"""
+        if conn is None:
+            return
+        if conn.writer.is_closing():
+            self.metrics.send_failures.inc()
+            return
+        start = time.perf_counter()
+        try:
+            frame = encode_message(data, conn.encoding)
+            conn.outbox.append(frame)
+            conn.queued += len(frame)
+            if len(conn.outbox) == 1:
+                asyncio.get_running_loop().call_soon(self.flush, conn)
+            self.metrics.messages_sent.inc()
+        except Exception as e:
+            self.metrics.send_failures.inc()
+            print(f"Error sending to {conn.addr}: {e}")
+        self.metrics.send_seconds.observe(time.perf_counter() - start)
+
+        backlog = conn.queued + conn.writer.transport.get_write_buffer_size()
+        if backlog > MAX_PLAYER_BACKLOG:
+            # Aborting wakes the connection's reader, which then releases the seat like any drop
+            print(f"🐢 Disconnecting {conn.addr}: {backlog} bytes behind")
+            self.metrics.slow_disconnects.inc()
+            conn.outbox.clear()
+            conn.writer.transport.abort()
+
+    def flush(self, conn):
+        """Write everything a connection queued since the last flush"""
+        data = b''.join(conn.outbox)
+        conn.outbox.clear()
+        conn.queued = 0
+        if data and not conn.writer.is_closing():
+            conn.writer.write(data)
+
+    def negotiate_encoding(self, conn, message):
+        """Answer a client's hello and switch to the encoding it prefers"""
+        encoding = negotiate(message.get("encodings"))
+        self.send_to_connection(conn, {"type": "hello", "encoding": encoding})
+        conn.encoding = encoding
+
+    def join(self, conn):
+        """Put a new player in the matchmaking queue"""
+        conn.token = new_token()
+        self.queue.add(conn, self.ratings.get(conn.name), time.monotonic())
+        self.send_to_connection(conn, {"type": "message", "content": "🔎 Looking for an opponent..."})
+        self.match()
+
+    def match(self):
+        """Open a room for every pair the queue considers close enough by now"""
+        for first, second in self.queue.pop_ready(time.monotonic()):
+            self.open_room(first, second)
+
+    async def ticker(self):
+        """Advance the timer wheel"""
+        while True:
+            await asyncio.sleep(self.wheel.tick)
+            self.wheel.advance()
+
+    def watch(self, conn):
+        """Start the heartbeat of a connection"""
+        if self.idle_timeout:
+            conn.heartbeat = self.wheel.schedule(min(self.heartbeat, self.idle_timeout), self.check_idle, conn)
+
+    def check_idle(self, conn):
+        """Ping a player that has gone quiet, and drop one that stopped answering"""
+        if conn.moved or conn.writer.is_closing():
+            return
+        quiet = time.monotonic() - conn.last_heard
+        if quiet >= self.idle_timeout:
+            # Aborting wakes the connection's reader, which then releases the seat like any drop
+            print(f"💤 Disconnecting {conn.addr}: silent for {quiet:.0f}s")
+            self.metrics.idle_disconnects.inc()
+            conn.writer.transport.abort()
+            return
+        if quiet >= self.heartbeat:
+            self.send_to_connection(conn, {"type": "ping"})
+            delay = min(self.heartbeat, self.idle_timeout - quiet)
+        else:
+            delay = min(self.heartbeat, self.idle_timeout) - quiet
+        conn.heartbeat = self.wheel.schedule(delay, self.check_idle, conn)
+
+    def watch_turn(self, room, delay=None):
+        """Check a room's turn clock once the seat it waits on could have run out of time"""
+        if self.turn_timeout:
+            self.turn_timers[room.room_id] = self.wheel.schedule(delay or self.turn_timeout, self.check_turn, room)
+
+    def check_turn(self, room):
+        self.turn_timers.pop(room.room_id, None)
+        if room.room_id not in self.rooms:
+            return
+        left = room.expire_turn(self.turn_timeout, time.monotonic())
+        if left is None:
+            self.close_room(room)
+        else:
+            self.watch_turn(room, left)
+
+    async def matchmaker(self):
+        """Re-check the queue as waiting players' rating windows widen"""
+        while True:
+            await asyncio.sleep(MATCH_INTERVAL)
+            self.match()
+
+    def open_room(self, first, second):
+        """Seat two matched players in a new room and start it"""
+        room_id = next(self.room_ids)
+        room = self.make_room(room_id, self.config)
+        players = self.players[room_id]
+        players[:] = [first, second]
+        self.names[room_id] = [first.name, second.name]
+        for seat, player in enumerate(players):
+            player.room = room
+            player.seat = seat
+            room.tokens[seat] = player.token
+            self.sessions[player.token] = (room_id, seat)
+
+        for seat, player in enumerate(players):
+            opponent = players[1 - seat]
+            self.send_to_connection(player, {"type": "init", "player_id": seat + 1, "token": player.token})
+            self.send_to_connection(player, {
+                "type": "message",
+                "content": f"✅ You are Player {seat + 1}! Playing {opponent.name or 'a guest'} "
+                           f"({self.ratings.get(opponent.name):.0f})"
+            })
+
+        print(f"🎉 Room {room_id} opened for {first.addr} and {second.addr} ({len(self.rooms)} active)")
+        room.start()
+        self.watch_turn(room)
+
+    def close_room(self, room):
+        """Tear down a finished or abandoned room"""
+        if self.rooms.pop(room.room_id, None) is None:
+            return
+        self.metrics.rooms.set(len(self.rooms))
+        names = self.names.pop(room.room_id, None)
+        if names and room.winner is not None:
+            self.ratings.record(names[room.winner], names[1 - room.winner])
+        for player in self.players.pop(room.room_id):
+            if player is not None:
+                player.room = None
+                player.seat = None
+        for seat, token in enumerate(room.tokens):
+            self.sessions.pop(token, None)
+            timer = self.grace_timers.pop((room.room_id, seat), None)
+            if timer:
+                timer.cancel()
+        timer = self.turn_timers.pop(room.room_id, None)
+        if timer:
+            timer.cancel()
+        print(f"🏁 Room {room.room_id} closed ({len(self.rooms)} active)")
+
+    def leave(self, conn):
+        """Release a disconnected player; a seated player has `grace` seconds to come back"""
+        if self.queue.remove(conn):
+            return
+        if conn.room is not None:
+            room, seat = conn.room, conn.seat
+            conn.room = conn.seat = None
+            self.players[room.room_id][seat] = None
+            room.player_left(seat)
+            self.start_grace(room, seat)
+
+    def start_grace(self, room, seat):
+        timer = self.wheel.schedule(self.grace, self.expire, room, seat)
+        self.grace_timers[(room.room_id, seat)] = timer
+
+    def expire(self, room, seat):
+        """The grace window ran out: the match is lost for good"""
+        self.grace_timers.pop((room.room_id, seat), None)
+        if room.room_id in self.rooms and self.players[room.room_id][seat] is None:
+            room.abandon(seat)
+            self.close_room(room)
+
+    def resume(self, conn, token, seen=0):
+        """Put a reconnecting player back into their seat; False if the session is gone"""
+        if token not in self.sessions:
+            return False
+        room_id, seat = self.sessions[token]
+        room = self.rooms[room_id]
+        players = self.players[room_id]
+        old = players[seat]
+        if old is not None:
+            # The old connection hasn't noticed it is dead yet; retire it quietly
+            old.room = old.seat = None
+            old.writer.close()
+        else:
+            timer = self.grace_timers.pop((room_id, seat), None)
+            if timer:
+                timer.cancel()
+
+        players[seat] = conn
+        conn.room, conn.seat, conn.token = room, seat, token
+        room.resume(seat, seen)
+        print(f"🔌 Player {seat + 1} of room {room_id} is back from {conn.addr}")
+        return True
+
+    def process_messages(self, conn, messages):
+        for message in messages:
+            start = time.perf_counter()
+            msg_type = message.get("type")
+            self.metrics.received(msg_type)
+            if msg_type == "hello":
+                self.negotiate_encoding(conn, message)
+            elif msg_type == "pong":
+                pass  # Reading it was the point
+            elif msg_type == "stats":
+                self.send_to_connection(conn, self.metrics.stats_message())
+            elif conn.room is not None:
+                room = conn.room
+                try:
+                    room.process_message(conn.seat, message)
+                except (TypeError, ValueError) as e:
+                    # A malformed message costs the player that message, not the connection
+                    print(f"Invalid {msg_type} from {conn.addr}: {e}")
+                    self.send_to_connection(conn, {"type": "invalid", "request": msg_type})
+                if room.finished:
+                    self.close_room(room)
+            self.metrics.process_seconds.observe(time.perf_counter() - start)
+
+    def welcome(self, conn, hello):
+        """Answer a hello and put a player presenting a session token back in their seat"""
+        self.metrics.received("hello")
+        self.negotiate_encoding(conn, hello)
+        conn.name = hello.get("name")
+        if hello.get("token") and not self.resume(conn, hello["token"], hello.get("seen", 0)):
+            self.send_to_connection(conn, {"type": "message", "content": "⌛ Session expired, joining a new game"})
+
+    async def handle_connection(self, reader, writer):
+        """Serve one player for the lifetime of its connection"""
+        await self.serve_connection(PlayerConnection(reader, writer), FrameDecoder())
+
+    async def serve_connection(self, conn, decoder, messages=None):
+        """Read a player's messages until it goes away; `messages` were already read for it by another process"""
+        reader = conn.reader
+        self.metrics.connections.inc()
+        self.metrics.connections_total.inc()
+        self.watch(conn)
+
+        try:
+            if messages is None:
+                # The hello may carry a session token, so only seat the player once it has been read
+                try:
+                    data = await asyncio.wait_for(reader.read(65536), HELLO_TIMEOUT)
+                except asyncio.TimeoutError:
+                    data = None  # Clients that never say hello are seated all the same
+                if data == b'':
+                    return
+                conn.last_heard = time.monotonic()
+                messages = decoder.feed_messages(data) if data else []
+            if messages and messages[0].get("type") == "hello":
+                hello = messages.pop(0)
+                conn.unread = messages  # Whatever came with the hello moves along if the player does
+                self.welcome(conn, hello)
+            if not conn.moved:
+                conn.unread = []
+                if conn.room is None:
+                    self.join(conn)
+                self.process_messages(conn, messages)
+
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                conn.last_heard = time.monotonic()
+                if conn.moved:
+                    conn.unread += decoder.feed_messages(data)  # Left for the process the player moved to
+                else:
+                    self.process_messages(conn, decoder.feed_messages(data))
+
+        except (ConnectionError, ProtocolError) as e:
+            print(f"Error receiving from {conn.addr}: {e}")
+
+        finally:
+            self.metrics.connections.dec()
+            if conn.heartbeat:
+                conn.heartbeat.cancel()
+            self.leave(conn)
+            conn.writer.close()
+
+    async def serve(self):
+        """Accept connections until cancelled"""
+        server = await asyncio.start_server(self.handle_connection, self.host, self.port, backlog=self.backlog,
+                                            reuse_port=self.reuse_port)
+        for room in list(self.rooms.values()):  # Recovered rooms wait for their players like any dropped seat
+            for seat in range(2):
+                self.start_grace(room, seat)
+            self.watch_turn(room)
+        self.ticker_task = asyncio.create_task(self.ticker())
+        self.matchmaker_task = asyncio.create_task(self.matchmaker())
+        print(f"🚀 Battleship Server started on {self.host}:{self.port}")
+        async with server:
+            await server.serve_forever()
+
+    def run(self):
+        """Main server execution"""
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            print("Server stopped by user")
+        finally:
+            if self.journal:
+                self.journal.close()
+            self.ratings.save()
+
+
+BOARD_CLASSES = {'list': Board, 'bitboard': BitBoard}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-room Battleship server")
+    parser.add_argument("--host", default='127.0.0.1')
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--rows", type=int, default=6)
+    parser.add_argument("--cols", type=int, default=8)
+    parser.add_argument("--fleet", type=lambda s: [int(size) for size in s.split(',')], default=SHIP_SIZES,
+                        help="comma-separated ship sizes")
+    parser.add_argument("--board", choices=BOARD_CLASSES, default='list',
+                        help="board backend; bitboard is for small boards only, its shots cost O(cells)")
+    parser.add_argument("--journal", help="append placements and shots to this file")
+    parser.add_argument("--flush-interval", type=float, default=0.05,
+                        help="seconds between journal writes; 0 syncs every record")
+    parser.add_argument("--no-fsync", action='store_true', help="leave journal durability to the OS")
+    parser.add_argument("--recover", action='store_true', help="restore unfinished rooms from the journal")
+    parser.add_argument("--grace", type=float, default=RECONNECT_GRACE,
+                        help="seconds a dropped player has to reconnect")
+    parser.add_argument("--heartbeat", type=float, default=HEARTBEAT_INTERVAL,
+                        help="seconds of silence before a player is pinged")
+    parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT,
+                        help="seconds of silence before a player is disconnected; 0 never disconnects")
+    parser.add_argument("--turn-timeout", type=float, default=TURN_TIMEOUT,
+                        help="seconds a player has to place their ships or shoot before forfeiting; 0 waits forever")
+    parser.add_argument("--ratings", help="JSON file to load and save Elo ratings, keyed by the unverified hello name")
+    parser.add_argument("--match-window", type=float, default=MATCH_WINDOW,
+                        help="rating gap two players are paired at straight away")
+    parser.add_argument("--widen", type=float, default=WIDEN_PER_SECOND,
+                        help="rating points the window grows per second of waiting")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on this port at /metrics")
+    args = parser.parse_args()
+    if args.recover and not args.journal:
+        parser.error("--recover needs --journal")
+    config = RoomConfig(args.rows, args.cols, args.fleet, BOARD_CLASSES[args.board])
+    journal = Journal(args.journal, args.flush_interval, not args.no_fsync) if args.journal else None
+    server = AsyncBattleshipServer(args.host, args.port, config=config, journal=journal, grace=args.grace,
+                                   queue=MatchQueue(args.match_window, args.widen), ratings=Ratings(args.ratings),
+                                   heartbeat=args.heartbeat, idle_timeout=args.idle_timeout,
+                                   turn_timeout=args.turn_timeout)
+    if args.metrics_port is not None:
+        serve_http(server.metrics.registry, args.host, args.metrics_port)
+    if args.recover:
+        server.recover()
+    server.run()
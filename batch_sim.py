@@ -0,0 +1,165 @@
+import argparse
+import numpy as np  # Optional: only batch_sim, bench_batch and replay need it (pip install numpy)
+from room import SHIP_SIZES
+
+MISS, HIT, INVALID = 0, 1, 2
+
+
+class BatchBoards:
+    """N boards of the same size stored as stacked NumPy arrays
+
+    Follows Board's rules: ships lie horizontally or vertically inside the
+    board without overlapping, a shot on a ship cell is a hit, and a board is
+    beaten once every ship cell has been hit.
+    """
+
+    def __init__(self, n, rows=6, cols=8):
+        self.n = n
+        self.rows = rows
+        self.cols = cols
+        self.ships = np.zeros((n, rows, cols), dtype=bool)
+        self.shot = np.zeros((n, rows, cols), dtype=bool)
+        self.ships_count = np.zeros(n, dtype=np.int32)
+        self.hit_count = np.zeros(n, dtype=np.int32)
+
+    def valid_starts(self, size):
+        """Masks of the free horizontal and vertical start cells for a ship on every board"""
+        occupied = self.ships.astype(np.int32)
+        valid_h = np.zeros(self.ships.shape, dtype=bool)
+        valid_v = np.zeros(self.ships.shape, dtype=bool)
+        if size <= self.cols:
+            sums = np.cumsum(np.pad(occupied, ((0, 0), (0, 0), (1, 0))), axis=2)
+            valid_h[:, :, :self.cols - size + 1] = sums[:, :, size:] == sums[:, :, :self.cols - size + 1]
+        if size <= self.rows:
+            sums = np.cumsum(np.pad(occupied, ((0, 0), (1, 0), (0, 0))), axis=1)
+            valid_v[:, :self.rows - size + 1, :] = sums[:, size:, :] == sums[:, :self.rows - size + 1, :]
+        return valid_h, valid_v
+
+    def place_random_fleet(self, fleet, rng):
+        """Place a fleet on every board, each ship uniformly among its legal positions"""
+        cells = self.rows * self.cols
+        boards = np.arange(self.n)
+        for size in sorted(fleet, reverse=True):
+            valid_h, valid_v = self.valid_starts(size)
+            valid = np.concatenate([valid_h.reshape(self.n, cells), valid_v.reshape(self.n, cells)], axis=1)
+            counts = valid.sum(axis=1)
+            if not counts.all():
+                raise ValueError(f"No room left for a {size}-cell ship on some boards")
+
+            # Pick the k-th legal start on each board with k uniform in [0, count)
+            picks = (rng.random(self.n) * counts).astype(np.int64)
+            choice = (np.cumsum(valid, axis=1) > picks[:, None]).argmax(axis=1)
+            vertical, start = np.divmod(choice, cells)
+            x, y = np.divmod(start, self.cols)
+
+            offsets = np.arange(size)
+            xs = x[:, None] + offsets * vertical[:, None]
+            ys = y[:, None] + offsets * (1 - vertical[:, None])
+            self.ships[boards[:, None], xs, ys] = True
+            self.ships_count += size
+
+    def shoot(self, boards, xs, ys):
+        """Fire one shot at each listed board and return MISS/HIT/INVALID codes"""
+        already = self.shot[boards, xs, ys]
+        hit = self.ships[boards, xs, ys] & ~already
+        self.shot[boards, xs, ys] = True
+        self.hit_count[boards] += hit
+        return np.where(already, INVALID, np.where(hit, HIT, MISS))
+
+    def all_ships_sunk(self, boards):
+        """Win detection for the listed boards"""
+        return (self.ships_count[boards] > 0) & (self.hit_count[boards] >= self.ships_count[boards])
+
+
+class RandomTargets:
+    """Shoot every board in its own random order, fixed up front"""
+
+    def __init__(self, boards, rng):
+        cells = boards.rows * boards.cols
+        self.cols = boards.cols
+        dtype = np.int16 if cells <= np.iinfo(np.int16).max else np.int32
+        self.order = rng.permuted(np.tile(np.arange(cells, dtype=dtype), (boards.n, 1)), axis=1)
+        self.next = np.zeros(boards.n, dtype=np.int64)
+
+    def __call__(self, targets):
+        cells = self.order[targets, self.next[targets]]
+        self.next[targets] += 1
+        return np.divmod(cells, self.cols)
+
+
+class HuntTargets:
+    """Random hunting, but finish off ships by shooting next to earlier hits first"""
+
+    def __init__(self, boards, rng):
+        self.boards = boards
+        self.rng = rng
+
+    def __call__(self, targets):
+        boards = self.boards
+        shot = boards.shot[targets]
+        hits = shot & boards.ships[targets]
+        near = np.zeros_like(hits)
+        near[:, 1:, :] |= hits[:, :-1, :]
+        near[:, :-1, :] |= hits[:, 1:, :]
+        near[:, :, 1:] |= hits[:, :, :-1]
+        near[:, :, :-1] |= hits[:, :, 1:]
+        scores = self.rng.random(shot.shape) + near
+        scores[shot] = -1
+        return np.divmod(scores.reshape(len(targets), -1).argmax(axis=1), boards.cols)
+
+
+STRATEGIES = {'random': RandomTargets, 'hunt': HuntTargets}
+
+
+def simulate(games, rows=6, cols=8, fleet=SHIP_SIZES, strategy='hunt', seed=None):
+    """Play many two-player games at once
+
+    Game g uses boards 2g (player 1) and 2g + 1 (player 2). Like the server, a
+    hit earns another shot and a miss passes the turn. Returns the winning
+    player (1 or 2) and the shots each player fired, per game.
+    """
+    rng = np.random.default_rng(seed)
+    boards = BatchBoards(2 * games, rows, cols)
+    boards.place_random_fleet(fleet, rng)
+    pick = STRATEGIES[strategy](boards, rng)
+
+    current = np.zeros(games, dtype=np.int64)  # Seat to move in each game
+    winner = np.zeros(games, dtype=np.int8)
+    shots = np.zeros((games, 2), dtype=np.int32)
+    active = np.arange(games)
+
+    while len(active):
+        seat = current[active]
+        targets = 2 * active + 1 - seat
+        xs, ys = pick(targets)
+        results = boards.shoot(targets, xs, ys)
+        shots[active, seat] += 1
+
+        won = boards.all_ships_sunk(targets)
+        winner[active[won]] = seat[won] + 1
+        current[active[results == MISS]] ^= 1
+        active = active[~won]
+
+    return winner, shots
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate many games at once with NumPy")
+    parser.add_argument("-n", "--games", type=int, default=100000)
+    parser.add_argument("--rows", type=int, default=6)
+    parser.add_argument("--cols", type=int, default=8)
+    parser.add_argument("--fleet", type=lambda s: [int(size) for size in s.split(',')], default=SHIP_SIZES)
+    parser.add_argument("--strategy", choices=STRATEGIES, default='hunt')
+    parser.add_argument("--batch", type=int, default=100000, help="games held in memory at once")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    seeds = np.random.SeedSequence(args.seed).spawn(-(-args.games // args.batch))
+    player1_wins = winning_shots = 0
+    for i, seed in enumerate(seeds):
+        games = min(args.batch, args.games - i * args.batch)
+        winner, shots = simulate(games, args.rows, args.cols, args.fleet, args.strategy, seed)
+        player1_wins += np.count_nonzero(winner == 1)
+        winning_shots += shots[np.arange(games), winner - 1].sum()
+    print(f"🎲 {args.games} games: player 1 won {player1_wins / args.games:.1%}, "
+          f"average {winning_shots / args.games:.1f} shots to win")
@@ -0,0 +1,55 @@
+import argparse
+import random
+import time
+from batch_sim import simulate
+from fleet import random_fleet
+from game_logic import MISS, Board
+from room import SHIP_SIZES
+
+
+def play_python(rows, cols, fleet, rng):
+    """One game with random shots on pure-Python Boards"""
+    boards = []
+    for _ in range(2):
+        board = Board(rows, cols)
+        for ship in random_fleet(rows, cols, fleet, rng):
+            board.place(ship["size"], ship["direction"], *ship["position"])
+        boards.append(board)
+
+    cells = [(x, y) for x in range(rows) for y in range(cols)]
+    orders = [rng.sample(cells, len(cells)) for _ in range(2)]
+    current = 0
+    while True:
+        target = boards[1 - current]
+        result = target.fire(*orders[current].pop())
+        if target.all_ships_sunk():
+            return current + 1
+        if result == MISS:
+            current = 1 - current
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NumPy batch engine vs a pure-Python Board loop")
+    parser.add_argument("-n", "--games", type=int, default=20000)
+    parser.add_argument("--rows", type=int, default=6)
+    parser.add_argument("--cols", type=int, default=8)
+    parser.add_argument("--fleet", type=lambda s: [int(size) for size in s.split(',')], default=SHIP_SIZES)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    start = time.perf_counter()
+    for _ in range(args.games):
+        play_python(args.rows, args.cols, args.fleet, rng)
+    python_rate = args.games / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    simulate(args.games, args.rows, args.cols, args.fleet, strategy='random', seed=0)
+    batch_rate = args.games / (time.perf_counter() - start)
+
+    print(f"{args.games} games on {args.rows}x{args.cols}, fleet {args.fleet}, random shots")
+    print(f"Board loop   {python_rate:>12,.0f} games/s")
+    print(f"NumPy batch  {batch_rate:>12,.0f} games/s ({batch_rate / python_rate:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import argparse
+import random
+import time
+from game_logic import BitBoard, Board
+
+# Board side -> fleet; the fleet grows with the board like a tournament setup would
+SIZES = {
+    10: [5, 4, 3, 3, 2],
+    100: [5, 4, 3, 3, 2] * 20,
+    1000: [5, 4, 3, 3, 2] * 100,
+}
+
+
+def random_fleet(n, fleet, rng):
+    """Pick legal placements for a fleet on an n x n board"""
+    board = Board(n, n)
+    placements = []
+    for size in fleet:
+        while True:
+            direction = rng.choice('hv')
+            x, y = rng.randrange(n), rng.randrange(n)
+            if board.place(size, direction, x, y):
+                placements.append((size, direction, x, y))
+                break
+    return placements
+
+
+def bench(board_class, n, fleet, shots, rng):
+    """Return per-operation times in microseconds for one board size"""
+    placements = random_fleet(n, fleet, rng)
+    targets = [(rng.randrange(n), rng.randrange(n)) for _ in range(shots)]
+    ship_cells = [(x + i * (d == 'v'), y + i * (d == 'h')) for size, d, x, y in placements for i in range(size)]
+
+    start = time.perf_counter()
+    board = board_class(n, n)
+    construct = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for size, direction, x, y in placements:
+        board.place(size, direction, x, y)
+    place = (time.perf_counter() - start) / len(placements)
+
+    fire = board.fire
+    start = time.perf_counter()
+    for x, y in targets:
+        fire(x, y)
+    shoot = (time.perf_counter() - start) / len(targets)
+
+    start = time.perf_counter()
+    board.get_board_state(hide_ships=True)
+    state = time.perf_counter() - start  # Built from scratch
+
+    updates = [(rng.randrange(n), rng.randrange(n)) for _ in range(100)]
+    start = time.perf_counter()
+    for x, y in updates:
+        fire(x, y)
+        board.get_board_state(hide_ships=True)
+    update = (time.perf_counter() - start) / len(updates)  # A shot, then only its row rebuilt
+
+    version = board.version
+    start = time.perf_counter()
+    for _ in range(1000):
+        board.snapshot('hidden', seen=version)
+    same = (time.perf_counter() - start) / 1000
+
+    for x, y in ship_cells:
+        fire(x, y)
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        sunk = board.all_ships_sunk()
+    check = (time.perf_counter() - start) / 1000
+    assert sunk
+
+    return [value * 1e6 for value in (construct, place, shoot, check, state, update, same)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Board operation cost at growing board sizes")
+    parser.add_argument("--shots", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'board':<10}{'size':>11}{'ships':>7}{'new (us)':>11}{'place (us)':>12}{'shot (us)':>11}"
+          f"{'shots/s':>12}{'sunk? (us)':>12}{'state (us)':>13}{'shot+state':>12}{'same (us)':>11}")
+    for board_class in (Board, BitBoard):
+        for n, fleet in SIZES.items():
+            rng = random.Random(args.seed)
+            construct, place, shoot, check, state, update, same = bench(board_class, n, fleet, args.shots, rng)
+            print(f"{board_class.__name__:<10}{f'{n}x{n}':>11}{len(fleet):>7}"
+                  f"{construct:>11.2f}{place:>12.2f}{shoot:>11.2f}{1e6 / shoot:>12,.0f}{check:>12.3f}"
+                  f"{state:>13,.0f}{update:>12,.1f}{same:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
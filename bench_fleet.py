@@ -0,0 +1,82 @@
+import argparse
+import random
+import time
+from fleet import FleetSampler
+from game_logic import Board
+
+MAX_TRIES = 100000  # Retries a rejection placement gets for one ship before the fleet counts as stuck
+
+# (rows, cols, fleet); 4x4 and 9x9 are full tilings, the crowded 10x10 fleets cover 46%, 65%, 80% and 84% of the board
+SCENARIOS = [
+    (4, 4, [3, 3, 3, 3, 2, 2]),
+    (9, 9, [3] * 27),
+    (6, 8, [3, 2]),
+    (10, 10, [5, 4, 3, 3, 2]),
+    (10, 10, [5, 5, 4, 4, 4, 3, 3, 3, 3, 2, 2, 2, 2, 2, 2]),
+    (10, 10, [5, 5, 5, 4, 4, 4, 4, 3, 3, 3, 3, 3, 3, 2, 2, 2, 2, 2, 2, 2, 2]),
+    (10, 10, [5] * 16),
+    (10, 10, [5] * 8 + [4] * 6 + [3] * 4 + [2] * 4),
+    (100, 100, [5, 4, 3, 3, 2] * 40),
+    (1000, 1000, [5, 4, 3, 3, 2] * 100),
+    (1000, 1000, [5, 4, 3, 3, 2] * 4000),
+]
+
+
+def rejection_fleet(rows, cols, fleet, rng):
+    """The old way: retry random positions until Board accepts each ship; None if a ship gets stuck"""
+    board = Board(rows, cols)
+    for size in sorted(fleet, reverse=True):
+        for _ in range(MAX_TRIES):
+            direction = rng.choice('hv')
+            x = rng.randrange(rows - (size - 1 if direction == 'v' else 0))
+            y = rng.randrange(cols - (size - 1 if direction == 'h' else 0))
+            if board.place(size, direction, x, y):
+                break
+        else:
+            return None
+    return board.fleet
+
+
+def sample_or_none(sampler, rng):
+    """A sampled fleet, or None when the sampler gave up on it"""
+    try:
+        return sampler.sample(rng)
+    except ValueError:
+        return None
+
+
+def rate(function, seconds, ships):
+    """(placements/s, failed fleets, fleets drawn) for drawing fleets for about `seconds`"""
+    fleets = failed = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        failed += function() is None
+        fleets += 1
+    return fleets * ships / (time.perf_counter() - start), failed, fleets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Random fleet placement: rejection retries vs FleetSampler")
+    parser.add_argument("--seconds", type=float, default=1.0, help="rough time per measurement")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'board':>11}{'ships':>7}{'rejection/s':>14}{'stuck':>9}{'mode':>8}{'sampler/s':>12}{'gave up':>9}{'batch/s':>12}")
+    for rows, cols, fleet in SCENARIOS:
+        rng = random.Random(args.seed)
+        sampler = FleetSampler(rows, cols, fleet)
+        rejection, stuck, tried = rate(lambda: rejection_fleet(rows, cols, fleet, rng), args.seconds, len(fleet))
+        single, gave_up, fleets = rate(lambda: sample_or_none(sampler, rng), args.seconds, len(fleet))
+        start = time.perf_counter()
+        try:
+            sampler.sample_many(fleets, rng)
+            batch = f"{fleets * len(fleet) / (time.perf_counter() - start):,.0f}"
+        except ValueError:
+            batch = 'gave up'
+        mode = 'table' if sampler.layouts is not None else 'search'
+        print(f"{f'{rows}x{cols}':>11}{len(fleet):>7}{rejection:>14,.0f}{f'{stuck}/{tried}':>9}{mode:>8}"
+              f"{single:>12,.0f}{f'{gave_up}/{fleets}':>9}{batch:>12}")
+
+
+if __name__ == "__main__":
+    main()
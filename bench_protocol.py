@@ -0,0 +1,67 @@
+import argparse
+import time
+from protocol import FrameDecoder, encode_message
+
+# One sample of every message type the server and client exchange
+SAMPLE_MESSAGES = [
+    {"type": "init", "player_id": 1},
+    {"type": "message", "content": "✅ You are Player 1! Waiting for Player 2..."},
+    {"type": "place_ships_request", "sizes": [3, 2], "rows": 6, "cols": 8},
+    {"type": "place_ships", "ships": [
+        {"size": 3, "direction": "h", "position": [0, 0]},
+        {"size": 2, "direction": "v", "position": [2, 5]},
+    ]},
+    {"type": "ships_placed", "success": True},
+    {"type": "game_start", "current_player": 1},
+    {"type": "shoot", "position": [3, 4]},
+    {"type": "shoot_result", "shooter": 1, "position": [3, 4], "result": "hit", "game_over": False},
+    {"type": "ship_sunk", "owner": 2, "ship": 0, "size": 3, "direction": "h", "position": [3, 2]},
+    {"type": "turn_change", "current_player": 2},
+    {"type": "game_over", "winner": 1},
+    {"type": "player_disconnected", "message": "Player 2 disconnected. Game over."},
+]
+
+
+def measure(message, encoding, iterations):
+    """Return (frame bytes, encodes/s, decodes/s) for one message"""
+    frame = encode_message(message, encoding)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        encode_message(message, encoding)
+    encode_rate = iterations / (time.perf_counter() - start)
+
+    decoder = FrameDecoder()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        decoder.feed_messages(frame)
+    decode_rate = iterations / (time.perf_counter() - start)
+
+    return len(frame), encode_rate, decode_rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare JSON and binary message encodings")
+    parser.add_argument("-n", "--iterations", type=int, default=50000)
+    args = parser.parse_args()
+
+    print(f"{'message':<22}{'encoding':<10}{'bytes':>7}{'encode/s':>14}{'decode/s':>14}")
+    totals = {}
+    for message in SAMPLE_MESSAGES:
+        for encoding in ('json', 'binary'):
+            size, encode_rate, decode_rate = measure(message, encoding, args.iterations)
+            total = totals.setdefault(encoding, [0, 0.0, 0.0])
+            total[0] += size
+            total[1] += 1 / encode_rate
+            total[2] += 1 / decode_rate
+            print(f"{message['type']:<22}{encoding:<10}{size:>7}{encode_rate:>14,.0f}{decode_rate:>14,.0f}")
+
+    print()
+    count = len(SAMPLE_MESSAGES)
+    for encoding, (size, encode_time, decode_time) in totals.items():
+        print(f"{encoding:<6} avg {size / count:6.1f} bytes/message, "
+              f"{count / encode_time:,.0f} encodes/s, {count / decode_time:,.0f} decodes/s")
+
+
+if __name__ == "__main__":
+    main()
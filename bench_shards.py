@@ -0,0 +1,34 @@
+import argparse
+import os
+from loadtest import raise_fd_limit, run_processes, spawn_server
+
+
+def bench(workers, clients, procs, port):
+    """Return (games/s, p99 shot RTT in ms, errors) for one worker count"""
+    server = spawn_server(port, [], workers)
+    try:
+        stats, elapsed = run_processes('127.0.0.1', port, clients, procs=procs)
+    finally:
+        server.terminate()
+        server.wait()
+    rtts = sorted(stats.rtts)
+    p99 = rtts[int(0.99 * len(rtts))] * 1e3 if rtts else float('nan')
+    return stats.games / 2 / elapsed, p99, sum(stats.errors.values())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Matches per second of sharded_server.py by worker count")
+    parser.add_argument("--workers", type=lambda s: [int(n) for n in s.split(',')],
+                        default=sorted({1, 2, 4, os.cpu_count()}), help="comma-separated worker counts")
+    parser.add_argument("-n", "--clients", type=int, default=4000)
+    parser.add_argument("--procs", type=int, default=os.cpu_count(), help="load generator processes")
+    parser.add_argument("--port", type=int, default=54321)
+    args = parser.parse_args()
+
+    raise_fd_limit()
+    print(f"{'workers':>8} {'games/s':>10} {'speedup':>8} {'p99 RTT':>10} {'errors':>7}")
+    baseline = None
+    for workers in args.workers:
+        rate, p99, errors = bench(workers, args.clients, args.procs, args.port)
+        baseline = baseline or rate
+        print(f"{workers:>8} {rate:>10.1f} {rate / baseline:>7.2f}x {p99:>8.1f}ms {errors:>7}")
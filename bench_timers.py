@@ -0,0 +1,74 @@
+import argparse
+import asyncio
+import random
+import time
+from timers import TimerWheel
+
+
+def noop():
+    pass
+
+
+class FakeClock:
+    """A clock the benchmark moves by hand, so ticks cost only what the wheel does"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def bench_wheel(count, ticks, rng):
+    """(schedule us, cancel us, tick us) with `count` heartbeat-style timers pending"""
+    clock = FakeClock()
+    wheel = TimerWheel(clock=clock)
+    delays = [rng.uniform(10, 30) for _ in range(count)]
+    start = time.perf_counter()
+    timers = [wheel.schedule(delay, noop) for delay in delays]
+    schedule = (time.perf_counter() - start) / count
+
+    start = time.perf_counter()
+    for _ in range(ticks):
+        clock.now += wheel.tick
+        wheel.advance()
+    tick = (time.perf_counter() - start) / ticks
+
+    start = time.perf_counter()
+    for timer in timers:
+        timer.cancel()
+    cancel = (time.perf_counter() - start) / count
+    return schedule * 1e6, cancel * 1e6, tick * 1e6
+
+
+async def bench_loop(count, rng):
+    """(schedule us, cancel us) for the same timers as asyncio call_later handles"""
+    loop = asyncio.get_running_loop()
+    delays = [rng.uniform(10, 30) for _ in range(count)]
+    start = time.perf_counter()
+    handles = [loop.call_later(delay, noop) for delay in delays]
+    schedule = (time.perf_counter() - start) / count
+    start = time.perf_counter()
+    for handle in handles:
+        handle.cancel()
+    cancel = (time.perf_counter() - start) / count
+    await asyncio.sleep(0)  # Lets the loop sweep the cancelled handles out of its heap
+    return schedule * 1e6, cancel * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Timer wheel vs asyncio timers for many pending timeouts")
+    parser.add_argument("--ticks", type=int, default=50, help="idle ticks to time with the timers pending")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'timers':>9}{'wheel add us':>14}{'cancel us':>11}{'tick us':>10}{'loop add us':>13}{'cancel us':>11}")
+    for count in [1000, 10000, 100000, 1000000]:
+        rng = random.Random(args.seed)
+        add, cancel, tick = bench_wheel(count, args.ticks, rng)
+        loop_add, loop_cancel = asyncio.run(bench_loop(count, rng))
+        print(f"{count:>9,}{add:>14.2f}{cancel:>11.2f}{tick:>10.2f}{loop_add:>13.2f}{loop_cancel:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
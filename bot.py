@@ -0,0 +1,287 @@
+import argparse
+import asyncio
+import random
+from collections import Counter
+from fleet import random_fleet
+from protocol import ENCODINGS, FrameDecoder, ProtocolError, encode_message
+from solver import load_policy, ship_mask
+
+SHOT = 1 << 40  # Subtracted from a cell's heat once it has been shot so it is never picked again
+
+
+class ProbabilityTargeter:
+    """Probability-density targeting for one enemy board
+
+    For every remaining ship size we keep, per cell, how many placements of
+    that size cover the cell without touching a miss or a sunk ship. The
+    heatmap is the sum of those counts weighted by how many ships of each
+    size are still afloat. Blocking a cell only revisits the placements
+    through that cell, so an update costs O(size^2) per ship size instead of
+    re-enumerating the board.
+    """
+
+    def __init__(self, rows, cols, fleet):
+        self.rows = rows
+        self.cols = cols
+        self.afloat = Counter(fleet)  # size -> ships of that size not yet sunk
+        self.blocked = bytearray(rows * cols)  # Misses and cells of sunk ships
+        self.shot = bytearray(rows * cols)
+        self.hits = set()  # Hit cells that don't belong to a sunk ship yet
+        self.by_size = {size: self.placement_counts(size) for size in self.afloat}
+        self.heat = [0] * (rows * cols)
+        for size, counts in self.by_size.items():
+            weight = self.afloat[size]
+            heat = self.heat
+            for i, count in enumerate(counts):
+                heat[i] += weight * count
+
+    def placement_counts(self, size):
+        """Placements of one ship size covering each cell of an empty board"""
+        counts = []
+        for x in range(self.rows):
+            vertical = min(x, self.rows - size) - max(0, x - size + 1) + 1 if size > 1 else 0
+            for y in range(self.cols):
+                horizontal = min(y, self.cols - size) - max(0, y - size + 1) + 1
+                counts.append(max(0, horizontal) + max(0, vertical))
+        return counts
+
+    def placements_through(self, index, size):
+        """Yield the cell lists of every in-bounds placement of `size` covering a cell"""
+        x, y = divmod(index, self.cols)
+        for start in range(max(0, y - size + 1), min(y, self.cols - size) + 1):
+            base = x * self.cols
+            yield range(base + start, base + start + size)
+        if size > 1:
+            for start in range(max(0, x - size + 1), min(x, self.rows - size) + 1):
+                yield range(start * self.cols + y, (start + size) * self.cols + y, self.cols)
+
+    def block(self, index):
+        """Remove every placement through a cell that can no longer hold a ship"""
+        if self.blocked[index]:
+            return
+        blocked = self.blocked
+        heat = self.heat
+        for size, counts in self.by_size.items():
+            weight = self.afloat[size]
+            for cells in self.placements_through(index, size):
+                if any(blocked[cell] for cell in cells):
+                    continue
+                for cell in cells:
+                    counts[cell] -= 1
+                    heat[cell] -= weight
+        blocked[index] = 1
+
+    def mark_shot(self, index):
+        """Never pick a cell twice"""
+        if not self.shot[index]:
+            self.shot[index] = 1
+            self.heat[index] -= SHOT
+
+    def record(self, x, y, result):
+        """Update the heatmap with the outcome of our shot"""
+        index = x * self.cols + y
+        self.mark_shot(index)
+        if result == "hit":
+            self.hits.add(index)
+        elif result == "miss":
+            self.block(index)
+
+    def sunk(self, size, direction, x, y):
+        """A ship went down: its cells are taken and one ship of its size is gone"""
+        step = 1 if direction == 'h' else self.cols
+        start = x * self.cols + y
+        for index in range(start, start + size * step, step):
+            self.hits.discard(index)
+            self.mark_shot(index)
+            self.block(index)
+
+        if self.afloat[size] <= 0:
+            return
+        self.afloat[size] -= 1
+        heat = self.heat
+        for i, count in enumerate(self.by_size[size]):
+            if count:
+                heat[i] -= count
+        if not self.afloat[size]:
+            del self.afloat[size]
+            del self.by_size[size]
+
+    def target_cell(self):
+        """Best cell next to unsunk hits, or None if there are none"""
+        if not self.hits:
+            return None
+        blocked = self.blocked
+        shot = self.shot
+        scores = Counter()
+        for hit in self.hits:
+            for size, weight in self.afloat.items():
+                for cells in self.placements_through(hit, size):
+                    if any(blocked[cell] for cell in cells):
+                        continue
+                    for cell in cells:
+                        if not shot[cell]:
+                            scores[cell] += weight
+        if not scores:
+            return None
+        return max(scores, key=scores.__getitem__)
+
+    def next_shot(self):
+        """Pick the (x, y) to fire at next"""
+        index = self.target_cell()
+        if index is None:
+            index = max(range(len(self.heat)), key=self.heat.__getitem__)
+        return divmod(index, self.cols)
+
+
+class ExpertTargeter(ProbabilityTargeter):
+    """Fires from the policy solver.py saved for this board, and by the heatmap where there is none"""
+
+    def __init__(self, rows, cols, fleet, policy=None):
+        super().__init__(rows, cols, fleet)
+        self.policy = policy or load_policy(rows, cols, tuple(fleet))
+        if self.policy and not self.policy.matches(rows, cols, fleet):
+            self.policy = None
+        self.miss_mask = 0
+        self.hit_mask = 0
+        self.sunk_masks = ()
+
+    def record(self, x, y, result):
+        super().record(x, y, result)
+        if result == "hit":
+            self.hit_mask |= 1 << (x * self.cols + y)
+        elif result == "miss":
+            self.miss_mask |= 1 << (x * self.cols + y)
+
+    def sunk(self, size, direction, x, y):
+        super().sunk(size, direction, x, y)
+        self.sunk_masks += (ship_mask(self.rows, self.cols, size, direction, x, y),)
+
+    def next_shot(self):
+        if self.policy:
+            index = self.policy.lookup(self.miss_mask, self.hit_mask, self.sunk_masks)
+            if index is not None and not self.shot[index]:
+                return divmod(index, self.cols)
+        return super().next_shot()
+
+
+class BotClient:
+    """Headless player that speaks the server protocol"""
+
+    def __init__(self, host='127.0.0.1', port=54321, seed=None, name=None, expert=False):
+        self.host = host
+        self.port = port
+        self.name = name  # Sent in hello so the server can rate the bot
+        self.targeter_class = ExpertTargeter if expert else ProbabilityTargeter
+        self.rng = random.Random(seed)
+        self.writer = None
+        self.encoding = 'json'
+        self.player_id = None
+        self.current_player = None
+        self.game_started = False
+        self.targeter = None
+        self.waiting_for_result = False
+        self.winner = None
+        self.shots = 0
+
+    def send_message(self, message):
+        self.writer.write(encode_message(message, self.encoding))
+
+    def process_message(self, message):
+        """Process messages from the server"""
+        msg_type = message.get("type", "")
+
+        if msg_type == "hello":
+            self.encoding = message.get("encoding", "json")
+
+        elif msg_type == "ping":
+            self.send_message({"type": "pong"})
+
+        elif msg_type == "init":
+            self.player_id = message.get("player_id")
+
+        elif msg_type == "place_ships_request":
+            rows, cols = message.get("rows", 6), message.get("cols", 8)
+            sizes = message.get("sizes", [3, 2])
+            self.targeter = self.targeter_class(rows, cols, sizes)
+            self.send_message({"type": "place_ships", "ships": random_fleet(rows, cols, sizes, self.rng)})
+
+        elif msg_type == "game_start":
+            self.game_started = True
+            self.current_player = message.get("current_player")
+
+        elif msg_type == "shoot_result":
+            # The turn_change may arrive in a later read, so follow the turn rules here
+            if message.get("result") == "miss":
+                self.current_player = 3 - message.get("shooter")
+            if message.get("game_over"):
+                self.game_started = False
+            if message.get("shooter") == self.player_id:
+                self.waiting_for_result = False
+                x, y = message.get("position")
+                self.targeter.record(x, y, message.get("result"))
+
+        elif msg_type == "ship_sunk":
+            if message.get("owner") != self.player_id:
+                x, y = message.get("position")
+                self.targeter.sunk(message.get("size"), message.get("direction"), x, y)
+
+        elif msg_type == "turn_change":
+            self.current_player = message.get("current_player")
+
+        elif msg_type == "game_over":
+            self.winner = message.get("winner")
+
+        elif msg_type == "player_disconnected":
+            self.winner = self.player_id
+
+    def take_turn(self):
+        """Fire once all messages from the last read have been applied"""
+        if (self.game_started and self.winner is None and not self.waiting_for_result
+                and self.current_player == self.player_id):
+            x, y = self.targeter.next_shot()
+            self.waiting_for_result = True
+            self.shots += 1
+            self.send_message({"type": "shoot", "position": [x, y]})
+
+    async def play(self):
+        """Play one game and return True if the bot won"""
+        reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        decoder = FrameDecoder()
+        hello = {"type": "hello", "encodings": ENCODINGS}
+        if self.name:
+            hello["name"] = self.name
+        self.send_message(hello)
+        try:
+            while self.winner is None:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                for message in decoder.feed_messages(data):
+                    self.process_message(message)
+                self.take_turn()
+                await self.writer.drain()
+        except (ConnectionError, ProtocolError) as e:
+            print(f"Bot lost connection: {e}")
+        finally:
+            self.writer.close()
+        return self.winner == self.player_id
+
+
+async def run_bots(host, port, count, seed, name=None, expert=False):
+    bots = [BotClient(host, port, seed=None if seed is None else seed + i, name=name and f"{name}-{i}", expert=expert)
+            for i in range(count)]
+    results = await asyncio.gather(*(bot.play() for bot in bots))
+    for i, (bot, won) in enumerate(zip(bots, results)):
+        print(f"🤖 Bot {i}: {'won' if won else 'lost'} after {bot.shots} shots")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless Battleship bot")
+    parser.add_argument("--host", default='127.0.0.1')
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("-n", "--bots", type=int, default=1, help="bots to run at once")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--name", help="name prefix the bots are rated under")
+    parser.add_argument("--expert", action='store_true', help="play the policy saved by solver.py for the board")
+    args = parser.parse_args()
+    asyncio.run(run_bots(args.host, args.port, args.bots, args.seed, args.name, args.expert))
@@ -1,10 +1,18 @@
 import socket
-import json
 import threading
 import pygame
 import sys
 import time
+from collections import deque
 from pygame.locals import *
+from fleet import random_fleet
+from protocol import ENCODINGS, IDLE_TIMEOUT, FrameDecoder, encode_message
+
+# Posted by the receive thread so that all game state is only touched by the main loop
+NETWORK_MESSAGE = pygame.event.custom_type()
+NETWORK_CLOSED = pygame.event.custom_type()
+RECONNECT = pygame.event.custom_type()
+RECONNECT_ATTEMPTS = 10  # One per second, well inside the server's grace window
 
 class BattleshipClient:
     def __init__(self, host='127.0.0.1', port=54321):
@@ -13,15 +21,18 @@ class BattleshipClient:
         self.port = port
         self.client_socket = None
         self.connected = False
+        self.encoding = 'json'  # Switched once the server answers our hello
+        self.token = None  # Session token from init, used to get our seat back after a disconnect
+        self.reconnect_attempts = 0
+        self.shots_seen = 0  # Valid shots received, so a resume only sends the ones we missed
         self.player_id = None
         self.current_player = None
         self.game_started = False
         self.winner = None
         self.message = "Connecting to server..."
         
-        # Game settings
-        self.my_board = [['w' for _ in range(8)] for _ in range(6)]
-        self.enemy_board = [['w' for _ in range(8)] for _ in range(6)]
+        # Game settings (the server sends the real dimensions with place_ships_request)
+        self.rows, self.cols = 6, 8
         
         # Ship placement
         self.placing_ships = False
@@ -35,7 +46,6 @@ class BattleshipClient:
         self.width, self.height = 800, 600
         self.screen = pygame.display.set_mode((self.width, self.height))
         pygame.display.set_caption('Battleship Game')
-        self.clock = pygame.time.Clock()
         self.font = pygame.font.SysFont('Arial', 20)
         self.title_font = pygame.font.SysFont('Arial', 30, True)
         
@@ -50,52 +60,118 @@ class BattleshipClient:
         self.LIGHT_BLUE = (173, 216, 230)
         
         # Board settings
-        self.cell_size = 40
         self.board_margin = 50
         self.my_board_x = self.board_margin
         self.my_board_y = 120
-        self.enemy_board_x = self.width - self.board_margin - 8 * self.cell_size
         self.enemy_board_y = 120
         
+        # Rendering caches: only what changed since the last frame is repainted
+        self.text_cache = {}
+        self.tiles = {}
+        self.static_layer = None
+        self.changed_cells = deque()  # (is_enemy, row, col) waiting to be repainted
+        self.needs_full_redraw = True
+        self.drawn_status = None
+        self.drawn_preview = ((), False)
+        self.drawn_connected = None
+        self.set_board_size(self.rows, self.cols)
+        
         # Connect to server and start game
         self.connect_to_server()
     
+    def set_board_size(self, rows, cols):
+        """Reset both boards and fit the cell size to the window"""
+        self.rows, self.cols = rows, cols
+        self.my_board = [['w' for _ in range(cols)] for _ in range(rows)]
+        self.enemy_board = [['w' for _ in range(cols)] for _ in range(rows)]
+        
+        max_width = (self.width - 3 * self.board_margin) // 2
+        max_height = self.height - self.my_board_y - 80
+        cell_size = min(40, max_width // cols, max_height // rows)
+        self.board_fits = cell_size >= 1  # Boards with more cells than pixels aren't drawn or played
+        self.cell_size = max(1, cell_size)
+        self.enemy_board_x = self.width - self.board_margin - cols * self.cell_size
+        
+        # Only label every n-th row/column when cells are too small for text
+        self.label_step = -(-24 // self.cell_size)
+        self.tiles = {}
+        self.needs_full_redraw = True
+    
+    def set_cell(self, is_enemy, row, col, value):
+        """Change one cell and queue it for repainting"""
+        board = self.enemy_board if is_enemy else self.my_board
+        board[row][col] = value
+        self.changed_cells.append((is_enemy, row, col))
+    
     def connect_to_server(self):
         """Connect to the game server"""
         try:
             self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.client_socket.connect((self.host, self.port))
             self.connected = True
+            self.encoding = 'json'
             
-            # Start thread to receive messages
-            threading.Thread(target=self.receive_messages).start()
+            # Offer the encodings we understand, and our session if we are coming back
+            hello = {"type": "hello", "encodings": ENCODINGS}
+            if self.token:
+                hello["token"] = self.token
+                hello["seen"] = self.shots_seen
+            self.send_message(hello)
+            
+            # Start thread to receive messages; it only forwards them to the event queue
+            threading.Thread(target=self.receive_messages, args=(self.client_socket,), daemon=True).start()
         except Exception as e:
             self.message = f"Failed to connect: {e}"
     
-    def receive_messages(self):
-        """Receive and process messages from the server"""
-        while self.connected:
+    def receive_messages(self, sock):
+        """Receive messages from the server and post them as pygame events"""
+        decoder = FrameDecoder()
+        sock.settimeout(IDLE_TIMEOUT)  # The server pings quiet players, so a silent server is a dead one
+        while True:
             try:
-                data = self.client_socket.recv(4096).decode()
+                data = sock.recv(4096)
                 if not data:
                     break
                 
-                message = json.loads(data)
-                self.process_message(message)
+                for message in decoder.feed_messages(data):
+                    pygame.event.post(pygame.event.Event(NETWORK_MESSAGE, message=message))
                 
+            except socket.timeout:
+                print(f"No word from the server for {IDLE_TIMEOUT}s")
+                sock.close()
+                break
             except Exception as e:
                 print(f"Error receiving message: {e}")
                 break
         
-        self.connected = False
-        self.message = "Disconnected from server"
+        try:
+            pygame.event.post(pygame.event.Event(NETWORK_CLOSED, sock=sock))
+        except pygame.error:
+            pass  # The window is already gone
     
     def process_message(self, message):
         """Process messages from the server"""
         msg_type = message.get("type", "")
         
-        if msg_type == "init":
+        if msg_type == "hello":
+            self.encoding = message.get("encoding", "json")
+        
+        elif msg_type == "ping":
+            self.send_message({"type": "pong"})
+        
+        elif msg_type == "init":
+            # A new seat, possibly after our old session expired: forget the previous game
             self.player_id = message.get("player_id")
+            self.token = message.get("token")
+            self.shots_seen = 0
+            self.current_player = None
+            self.game_started = False
+            self.winner = None
+            self.placing_ships = False
+            self.ships_to_place = []
+            self.placed_ships = []
+            self.current_ship = None
+            self.set_board_size(self.rows, self.cols)
             self.message = f"You are Player {self.player_id}"
         
         elif msg_type == "message":
@@ -105,6 +181,10 @@ class BattleshipClient:
             self.placing_ships = True
             self.ships_to_place = []
             self.placed_ships = []  # Reset placed ships
+            self.set_board_size(message.get("rows", 6), message.get("cols", 8))
+            if not self.board_fits:
+                self.placing_ships = False
+                return
             sizes = message.get("sizes", [3, 2])
             for size in sizes:
                 self.ships_to_place.append({"size": size, "direction": "h", "position": None})
@@ -125,29 +205,43 @@ class BattleshipClient:
         elif msg_type == "game_start":
             self.game_started = True
             self.current_player = message.get("current_player")
-            self.message = f"Game started! {'Your turn' if self.current_player == self.player_id else 'Opponent\'s turn'}"
+            turn = "Your turn" if self.current_player == self.player_id else "Opponent's turn"
+            self.message = f"Game started! {turn}"
         
         elif msg_type == "shoot_result":
-            shooter = message.get("shooter")
-            position = message.get("position", [0, 0])
-            result = message.get("result")
-            x, y = position
-            
-            # Update the appropriate board
-            if shooter == self.player_id:  # I shot
-                if result == "hit":
-                    self.enemy_board[x][y] = "H"
-                    self.message = "🎯 Hit! Your turn again"
-                elif result == "miss":
-                    self.enemy_board[x][y] = "M"
-                    self.message = "❌ Miss! Opponent's turn"
-            else:  # Opponent shot
-                if result == "hit":
-                    self.my_board[x][y] = "H"
-                    self.message = "😱 Your ship was hit! Opponent goes again"
-                elif result == "miss":
-                    self.my_board[x][y] = "M"
-                    self.message = "😅 Opponent missed! Your turn"
+            x, y = message.get("position", [0, 0])
+            if message.get("result") != "invalid":
+                self.shots_seen += 1
+            self.apply_shot(message.get("shooter"), x, y, message.get("result"))
+        
+        elif msg_type == "resumed":
+            # Our own board and whatever the opponent fired while we were away; the first part has the match state
+            if "player_id" in message:
+                self.player_id = message.get("player_id")
+                if (message.get("rows"), message.get("cols")) != (self.rows, self.cols):
+                    self.set_board_size(message.get("rows"), message.get("cols"))
+                self.game_started = message.get("game_started", False)
+                self.current_player = message.get("current_player")
+            for ship in message.get("ships", []):
+                x, y = ship["position"]
+                for i in range(ship["size"]):
+                    row, col = (x, y + i) if ship["direction"] == 'h' else (x + i, y)
+                    if self.my_board[row][col] == 'w':
+                        self.set_cell(False, row, col, 'S')
+            for shooter, x, y, result in message.get("shots", []):
+                self.shots_seen += 1
+                self.apply_shot(shooter, x, y, result)
+            if message.get("more"):
+                return
+            self.reconnect_attempts = 0
+            turn = "Your turn" if self.current_player == self.player_id else "Opponent's turn"
+            self.message = f"🔌 Reconnected! {turn}" if self.game_started else "🔌 Reconnected!"
+        
+        elif msg_type == "ship_sunk":
+            if message.get("owner") == self.player_id:
+                self.message = f"💥 Your {message.get('size')}-cell ship was sunk!"
+            else:
+                self.message = f"🔥 You sank a {message.get('size')}-cell ship!"
         
         elif msg_type == "turn_change":
             self.current_player = message.get("current_player")
@@ -167,12 +261,40 @@ class BattleshipClient:
         elif msg_type == "player_disconnected":
             self.message = message.get("message", "Opponent disconnected")
             self.game_started = False
+            self.token = None
+    
+    def apply_shot(self, shooter, x, y, result):
+        """Mark a shot on the board it hit"""
+        if shooter == self.player_id:  # I shot
+            if result == "hit":
+                self.set_cell(True, x, y, "H")
+                self.message = "🎯 Hit! Your turn again"
+            elif result == "miss":
+                self.set_cell(True, x, y, "M")
+                self.message = "❌ Miss! Opponent's turn"
+        else:  # Opponent shot
+            if result == "hit":
+                self.set_cell(False, x, y, "H")
+                self.message = "😱 Your ship was hit! Opponent goes again"
+            elif result == "miss":
+                self.set_cell(False, x, y, "M")
+                self.message = "😅 Opponent missed! Your turn"
+    
+    def connection_lost(self):
+        """Try to get our seat back while the server still holds it"""
+        self.connected = False
+        if self.token and not self.winner and self.reconnect_attempts < RECONNECT_ATTEMPTS:
+            self.reconnect_attempts += 1
+            self.message = f"Connection lost, reconnecting ({self.reconnect_attempts}/{RECONNECT_ATTEMPTS})..."
+            pygame.time.set_timer(RECONNECT, 1000, 1)
+        else:
+            self.message = "Disconnected from server"
     
     def send_message(self, message):
         """Send a message to the server"""
         if self.connected:
             try:
-                self.client_socket.send(json.dumps(message).encode())
+                self.client_socket.sendall(encode_message(message, self.encoding))
             except Exception as e:
                 print(f"Error sending message: {e}")
     
@@ -185,7 +307,7 @@ class BattleshipClient:
         board_x = (x - self.my_board_x) // self.cell_size
         board_y = (y - self.my_board_y) // self.cell_size
         
-        if 0 <= board_y < 6 and 0 <= board_x < 8:
+        if 0 <= board_y < self.rows and 0 <= board_x < self.cols:
             # Validate placement
             size = self.current_ship["size"]
             direction = self.current_ship["direction"]
@@ -197,7 +319,7 @@ class BattleshipClient:
                 check_y = board_x + i if direction == 'h' else board_x
                 check_x = board_y + i if direction == 'v' else board_y
                 
-                if not (0 <= check_x < 6 and 0 <= check_y < 8):
+                if not (0 <= check_x < self.rows and 0 <= check_y < self.cols):
                     valid = False
                     break
                 if self.my_board[check_x][check_y] != 'w':
@@ -211,7 +333,7 @@ class BattleshipClient:
                     place_y = board_x + i if direction == 'h' else board_x
                     place_x = board_y + i if direction == 'v' else board_y
                     
-                    self.my_board[place_x][place_y] = 'S'
+                    self.set_cell(False, place_x, place_y, 'S')
                 
                 # Create a copy of current_ship with position and add to placed_ships
                 placed_ship = {
@@ -226,15 +348,38 @@ class BattleshipClient:
                 
                 # If all ships placed, send to server
                 if not self.ships_to_place:
-                    self.send_message({
-                        "type": "place_ships",
-                        "ships": self.placed_ships
-                    })
-                    self.placing_ships = False
-                    self.current_ship = None
+                    self.send_fleet()
                 else:
                     self.current_ship = self.ships_to_place[0]
     
+    def auto_place(self):
+        """Place the remaining ships at random around the ones already placed"""
+        sizes = [ship["size"] for ship in self.ships_to_place]
+        try:
+            ships = random_fleet(self.rows, self.cols, sizes, placed=self.placed_ships)
+        except ValueError:
+            self.message = "Couldn't fit the remaining ships, place them by hand"
+            return
+        for ship in ships:
+            x, y = ship["position"]
+            for i in range(ship["size"]):
+                if ship["direction"] == 'h':
+                    self.set_cell(False, x, y + i, 'S')
+                else:
+                    self.set_cell(False, x + i, y, 'S')
+        self.placed_ships += ships
+        self.ships_to_place = []
+        self.send_fleet()
+    
+    def send_fleet(self):
+        """Send the finished placement to the server"""
+        self.send_message({
+            "type": "place_ships",
+            "ships": self.placed_ships
+        })
+        self.placing_ships = False
+        self.current_ship = None
+    
     def rotate_ship(self):
         """Rotate the current ship during placement"""
         if self.current_ship:
@@ -249,7 +394,7 @@ class BattleshipClient:
         board_x = (x - self.enemy_board_x) // self.cell_size
         board_y = (y - self.enemy_board_y) // self.cell_size
         
-        if 0 <= board_y < 6 and 0 <= board_x < 8:
+        if 0 <= board_y < self.rows and 0 <= board_x < self.cols:
             # Check if cell was already shot
             if self.enemy_board[board_y][board_x] not in ['H', 'M']:
                 self.send_message({
@@ -257,169 +402,240 @@ class BattleshipClient:
                     "position": [board_y, board_x]  # Note the coordinates order
                 })
     
-    def draw_board(self, x, y, board, is_enemy=False):
-        """Draw a game board"""
-        # Draw board grid
-        for row in range(6):
-            for col in range(8):
-                cell_value = board[row][col]
-                color = self.WHITE
+    def render_text(self, text, color, font=None):
+        """Render a string once and reuse the surface afterwards"""
+        font = font or self.font
+        key = (text, color, font)
+        surface = self.text_cache.get(key)
+        if surface is None:
+            if len(self.text_cache) > 256:
+                self.text_cache.clear()
+            surface = self.text_cache[key] = font.render(text, True, color)
+        return surface
+    
+    def cell_color(self, value, is_enemy):
+        if value == 'S' and not is_enemy:
+            return self.GREY
+        if value == 'H':
+            return self.RED
+        if value == 'M':
+            return self.BLUE
+        return self.WHITE
+    
+    def tile(self, color):
+        """A cell-sized surface in one color, with its grid line"""
+        tile = self.tiles.get(color)
+        if tile is None:
+            tile = self.tiles[color] = pygame.Surface((self.cell_size, self.cell_size))
+            tile.fill(color)
+            if self.cell_size >= 4:
+                pygame.draw.rect(tile, self.BLACK, tile.get_rect(), 1)
+        return tile
+    
+    def board_origin(self, is_enemy):
+        if is_enemy:
+            return self.enemy_board_x, self.enemy_board_y
+        return self.my_board_x, self.my_board_y
+    
+    def cell_rect(self, is_enemy, row, col):
+        x, y = self.board_origin(is_enemy)
+        return pygame.Rect(x + col * self.cell_size, y + row * self.cell_size, self.cell_size, self.cell_size)
+    
+    def draw_cell(self, is_enemy, row, col):
+        """Paint one cell from the board state and return its rect"""
+        board = self.enemy_board if is_enemy else self.my_board
+        rect = self.cell_rect(is_enemy, row, col)
+        self.screen.blit(self.tile(self.cell_color(board[row][col], is_enemy)), rect)
+        return rect
+    
+    def build_static_layer(self):
+        """Pre-render everything that only changes with the board size: titles, labels and the empty grid"""
+        layer = pygame.Surface((self.width, self.height))
+        layer.fill(self.WHITE)
+        
+        title = self.render_text("BATTLESHIP", self.DARK_BLUE, self.title_font)
+        layer.blit(title, (self.width // 2 - title.get_width() // 2, 20))
+        
+        if self.connected and self.board_fits:
+            water = self.tile(self.WHITE)
+            for is_enemy, name in ((False, "YOUR BOARD"), (True, "OPPONENT'S BOARD")):
+                x, y = self.board_origin(is_enemy)
+                board_title = self.render_text(name, self.BLACK)
+                layer.blit(board_title, (x + self.cols * self.cell_size // 2 - board_title.get_width() // 2, y - 50))
                 
-                if cell_value == 'S' and not is_enemy:
-                    color = self.GREY
-                elif cell_value == 'H':
-                    color = self.RED
-                elif cell_value == 'M':
-                    color = self.BLUE
+                layer.blits([(water, (x + col * self.cell_size, y + row * self.cell_size))
+                             for row in range(self.rows) for col in range(self.cols)], False)
                 
-                pygame.draw.rect(self.screen, color, 
-                                (x + col * self.cell_size, y + row * self.cell_size, 
-                                 self.cell_size, self.cell_size))
-                pygame.draw.rect(self.screen, self.BLACK, 
-                                (x + col * self.cell_size, y + row * self.cell_size, 
-                                 self.cell_size, self.cell_size), 1)
-        
-        # Draw row numbers
-        for row in range(6):
-            text = self.font.render(str(row), True, self.BLACK)
-            self.screen.blit(text, (x - 20, y + row * self.cell_size + 10))
-        
-        # Draw column numbers
-        for col in range(8):
-            text = self.font.render(str(col), True, self.BLACK)
-            self.screen.blit(text, (x + col * self.cell_size + 15, y - 25))
+                for row in range(0, self.rows, self.label_step):
+                    layer.blit(self.render_text(str(row), self.BLACK),
+                               (x - 20, y + row * self.cell_size + self.cell_size // 4))
+                for col in range(0, self.cols, self.label_step):
+                    layer.blit(self.render_text(str(col), self.BLACK),
+                               (x + col * self.cell_size + self.cell_size * 3 // 8, y - 25))
+        
+        self.static_layer = layer
     
-    def draw_ship_preview(self, mouse_pos):
-        """Draw a preview of the ship being placed"""
-        if not self.placing_ships or not self.current_ship:
-            return
+    def status_items(self):
+        """The status texts to show right now as (text, color, font, x, y); x=None centers the text"""
+        items = []
+        if self.player_id:
+            items.append((f"Player {self.player_id}", self.BLUE if self.player_id == 1 else self.RED, self.font, 20, 60))
+        items.append((self.message, self.BLACK, self.font, None, 60))
+        
+        if self.connected:
+            if not self.board_fits:
+                items.append((f"The {self.rows}x{self.cols} board is too big for this window", self.RED, self.font,
+                              None, self.height - 60))
+            
+            if self.placing_ships and self.current_ship:
+                items.append((f"Place your {self.current_ship['size']}-cell ship", self.BLACK, self.font,
+                              None, self.height - 60))
+                items.append(("Left-click to place, Space to rotate, R to auto-place", self.BLACK, self.font, None, self.height - 30))
+            
+            if self.game_started and not self.winner:
+                my_turn = self.current_player == self.player_id
+                items.append(("YOUR TURN" if my_turn else "OPPONENT'S TURN", self.GREEN if my_turn else self.RED,
+                              self.font, None, self.height - 30))
+            
+            if self.winner:
+                won = self.winner == self.player_id
+                items.append(("YOU WIN!" if won else "YOU LOSE!", self.GREEN if won else self.RED,
+                              self.title_font, None, self.height - 50))
+        return items
+    
+    def draw_status(self, items):
+        """Repaint the status bands above and below the boards"""
+        bands = [pygame.Rect(0, 55, self.width, 30), pygame.Rect(0, self.height - 60, self.width, 60)]
+        for band in bands:
+            self.screen.blit(self.static_layer, band, band)
+        for text, color, font, x, y in items:
+            surface = self.render_text(text, color, font)
+            if x is None:
+                x = self.width // 2 - surface.get_width() // 2
+            self.screen.blit(surface, (x, y))
+        self.drawn_status = items
+        return bands
+    
+    def ship_preview(self, mouse_pos):
+        """Cells covered by the ship being placed under the mouse, and whether it fits"""
+        if not self.connected or not self.placing_ships or not self.current_ship:
+            return (), False
         
         x, y = mouse_pos
         board_x = (x - self.my_board_x) // self.cell_size
         board_y = (y - self.my_board_y) // self.cell_size
+        if not (0 <= board_y < self.rows and 0 <= board_x < self.cols):
+            return (), False
         
-        if 0 <= board_y < 6 and 0 <= board_x < 8:
-            size = self.current_ship["size"]
-            direction = self.current_ship["direction"]
-            
-            # Check if position is valid
-            valid = True
-            for i in range(size):
-                check_x = board_y
-                check_y = board_x + i if direction == 'h' else board_x
-                check_x = board_y + i if direction == 'v' else board_y
-                
-                if not (0 <= check_x < 6 and 0 <= check_y < 8):
-                    valid = False
-                    break
-                if self.my_board[check_x][check_y] != 'w':
-                    valid = False
-                    break
-            
-            # Draw preview
-            for i in range(size):
-                preview_x = self.my_board_x + (board_x + (i if direction == 'h' else 0)) * self.cell_size
-                preview_y = self.my_board_y + (board_y + (i if direction == 'v' else 0)) * self.cell_size
-                
-                if valid:
-                    pygame.draw.rect(self.screen, self.GREEN, 
-                                    (preview_x, preview_y, self.cell_size, self.cell_size), 3)
-                else:
-                    pygame.draw.rect(self.screen, self.RED, 
-                                    (preview_x, preview_y, self.cell_size, self.cell_size), 3)
+        horizontal = self.current_ship["direction"] == 'h'
+        cells = [(board_y + i * (not horizontal), board_x + i * horizontal) for i in range(self.current_ship["size"])]
+        on_board = tuple((row, col) for row, col in cells if row < self.rows and col < self.cols)
+        valid = len(on_board) == len(cells) and all(self.my_board[row][col] == 'w' for row, col in on_board)
+        return on_board, valid
+    
+    def draw_ship_preview(self, preview):
+        """Replace the previous placement outline with a new one"""
+        old_cells, _ = self.drawn_preview
+        cells, valid = preview
+        dirty = [self.draw_cell(False, row, col) for row, col in old_cells]
+        for row, col in cells:
+            rect = self.cell_rect(False, row, col)
+            pygame.draw.rect(self.screen, self.GREEN if valid else self.RED, rect, 3)
+            dirty.append(rect)
+        self.drawn_preview = preview
+        return dirty
+    
+    def redraw_all(self):
+        """Rebuild the static layer and repaint the whole window"""
+        self.needs_full_redraw = False
+        self.changed_cells.clear()
+        self.build_static_layer()
+        self.screen.blit(self.static_layer, (0, 0))
+        
+        if self.connected and self.board_fits:
+            for is_enemy, board in ((False, self.my_board), (True, self.enemy_board)):
+                for row, cells in enumerate(board):
+                    for col, value in enumerate(cells):
+                        if value != 'w':
+                            self.draw_cell(is_enemy, row, col)
+        
+        self.drawn_preview = ((), False)
+        self.draw_ship_preview(self.ship_preview(pygame.mouse.get_pos()))
+        self.draw_status(self.status_items())
+        self.drawn_connected = self.connected
+        pygame.display.flip()
+    
+    def render(self):
+        """Repaint what changed since the last frame; an idle frame draws nothing"""
+        if self.needs_full_redraw or self.drawn_connected != self.connected:
+            self.redraw_all()
+            return
+        
+        dirty = []
+        while self.changed_cells:
+            is_enemy, row, col = self.changed_cells.popleft()
+            if row < self.rows and col < self.cols and self.board_fits:
+                dirty.append(self.draw_cell(is_enemy, row, col))
+        
+        preview = self.ship_preview(pygame.mouse.get_pos())
+        if preview != self.drawn_preview or dirty:
+            dirty += self.draw_ship_preview(preview)
+        
+        items = self.status_items()
+        if items != self.drawn_status:
+            dirty += self.draw_status(items)
+        
+        if dirty:
+            pygame.display.update(dirty)
     
     def run(self):
         """Main game loop"""
         running = True
         
         while running:
-            mouse_pos = pygame.mouse.get_pos()
-            
-            # Event handling
-            for event in pygame.event.get():
+            # Sleep until there is input or a message from the server, then take everything queued
+            for event in [pygame.event.wait()] + pygame.event.get():
                 if event.type == QUIT:
                     running = False
                 
+                elif event.type == NETWORK_MESSAGE:
+                    self.process_message(event.message)
+                
+                elif event.type == NETWORK_CLOSED:
+                    if event.sock is self.client_socket:  # Not an old socket we already replaced
+                        self.connection_lost()
+                
+                elif event.type == RECONNECT:
+                    self.connect_to_server()
+                    if not self.connected:
+                        self.connection_lost()
+                
                 elif event.type == MOUSEBUTTONDOWN:
+                    mouse_pos = event.pos
                     if event.button == 1:  # Left click
                         if self.placing_ships:
                             # Check if click is on my board
-                            if (self.my_board_x <= mouse_pos[0] <= self.my_board_x + 8 * self.cell_size and
-                                self.my_board_y <= mouse_pos[1] <= self.my_board_y + 6 * self.cell_size):
+                            if (self.my_board_x <= mouse_pos[0] <= self.my_board_x + self.cols * self.cell_size and
+                                self.my_board_y <= mouse_pos[1] <= self.my_board_y + self.rows * self.cell_size):
                                 self.place_ship(mouse_pos[0], mouse_pos[1])
                         
-                        elif self.game_started and self.current_player == self.player_id and not self.winner:
+                        elif (self.game_started and self.current_player == self.player_id and not self.winner
+                              and self.board_fits):
                             # Check if click is on enemy board
-                            if (self.enemy_board_x <= mouse_pos[0] <= self.enemy_board_x + 8 * self.cell_size and
-                                self.enemy_board_y <= mouse_pos[1] <= self.enemy_board_y + 6 * self.cell_size):
+                            if (self.enemy_board_x <= mouse_pos[0] <= self.enemy_board_x + self.cols * self.cell_size and
+                                self.enemy_board_y <= mouse_pos[1] <= self.enemy_board_y + self.rows * self.cell_size):
                                 self.shoot(mouse_pos[0], mouse_pos[1])
                 
                 elif event.type == KEYDOWN:
                     if event.key == K_SPACE and self.placing_ships:
                         self.rotate_ship()
-            
-            # Drawing
-            self.screen.fill(self.WHITE)
-            
-            # Draw title
-            title = self.title_font.render("BATTLESHIP", True, self.DARK_BLUE)
-            self.screen.blit(title, (self.width // 2 - title.get_width() // 2, 20))
-            
-            # Draw player info
-            if self.player_id:
-                player_text = self.font.render(f"Player {self.player_id}", True, 
-                                           self.BLUE if self.player_id == 1 else self.RED)
-                self.screen.blit(player_text, (20, 60))
-            
-            # Draw message
-            msg_text = self.font.render(self.message, True, self.BLACK)
-            self.screen.blit(msg_text, (self.width // 2 - msg_text.get_width() // 2, 60))
-            
-            # Draw boards
-            if self.connected:
-                # Draw my board title
-                my_board_title = self.font.render("YOUR BOARD", True, self.BLACK)
-                self.screen.blit(my_board_title, 
-                               (self.my_board_x + 4 * self.cell_size - my_board_title.get_width() // 2, 
-                                self.my_board_y - 50))
-                
-                # Draw enemy board title
-                enemy_board_title = self.font.render("OPPONENT'S BOARD", True, self.BLACK)
-                self.screen.blit(enemy_board_title, 
-                               (self.enemy_board_x + 4 * self.cell_size - enemy_board_title.get_width() // 2, 
-                                self.enemy_board_y - 50))
-                
-                # Draw boards
-                self.draw_board(self.my_board_x, self.my_board_y, self.my_board, False)
-                self.draw_board(self.enemy_board_x, self.enemy_board_y, self.enemy_board, True)
-                
-                # Draw ship preview during placement
-                if self.placing_ships and self.current_ship:
-                    self.draw_ship_preview(mouse_pos)
-                    
-                    # Draw placement instructions
-                    instructions1 = self.font.render(f"Place your {self.current_ship['size']}-cell ship", True, self.BLACK)
-                    instructions2 = self.font.render("Left-click to place, Space to rotate", True, self.BLACK)
-                    self.screen.blit(instructions1, (self.width // 2 - instructions1.get_width() // 2, self.height - 60))
-                    self.screen.blit(instructions2, (self.width // 2 - instructions2.get_width() // 2, self.height - 30))
-                
-                # Draw turn indicator if game started
-                if self.game_started and not self.winner:
-                    turn_text = self.font.render(
-                        "YOUR TURN" if self.current_player == self.player_id else "OPPONENT'S TURN", 
-                        True, self.GREEN if self.current_player == self.player_id else self.RED)
-                    self.screen.blit(turn_text, (self.width // 2 - turn_text.get_width() // 2, self.height - 30))
+                    elif event.key == K_r and self.placing_ships:
+                        self.auto_place()
                 
-                # Draw game over message
-                if self.winner:
-                    game_over_text = self.title_font.render(
-                        "YOU WIN!" if self.winner == self.player_id else "YOU LOSE!", 
-                        True, self.GREEN if self.winner == self.player_id else self.RED)
-                    self.screen.blit(game_over_text, 
-                                   (self.width // 2 - game_over_text.get_width() // 2, self.height - 50))
+                elif event.type in (VIDEOEXPOSE, WINDOWEXPOSED):
+                    self.needs_full_redraw = True
             
-            pygame.display.flip()
-            self.clock.tick(30)
+            self.render()
         
         # Clean up
         pygame.quit()
@@ -0,0 +1,366 @@
+import bisect
+import random
+from functools import lru_cache
+from math import isqrt
+
+EXACT_CELLS = 64  # Boards up to this many cells try to list every layout up front
+LAYOUT_LIMIT = 100000  # Most layouts a sampler keeps in its table
+SEARCH_BUDGET = 500000  # Most placements tried while listing layouts before settling for search
+DRAW_BUDGET = 2000  # Failed positions one search for a fleet may run into before starting over
+DRAW_RESTARTS = 4  # Fresh searches after the first before a fleet is given up on
+
+
+def fits(length, size):
+    """Placements of a ship along a free run of cells"""
+    return max(0, length - size + 1)
+
+
+class LineCounts:
+    """Placements each line has room for, summed per block of lines so a pick only scans block totals"""
+
+    def __init__(self, counts):
+        self.counts = list(counts)
+        self.block = max(1, isqrt(len(self.counts)))  # Lines per block
+        self.blocks = [sum(self.counts[i:i + self.block]) for i in range(0, len(self.counts), self.block)]
+        self.total = sum(self.counts)
+
+    def copy(self):
+        clone = object.__new__(LineCounts)
+        clone.counts = self.counts.copy()
+        clone.block = self.block
+        clone.blocks = self.blocks.copy()
+        clone.total = self.total
+        return clone
+
+    def add(self, line, delta):
+        self.counts[line] += delta
+        self.blocks[line // self.block] += delta
+        self.total += delta
+
+    def find(self, target):
+        """(line, target minus the counts of the lines before it) for the line holding the target-th placement"""
+        line = 0
+        for block_total in self.blocks:
+            if target < block_total:
+                break
+            target -= block_total
+            line += self.block
+        counts = self.counts
+        while target >= counts[line]:
+            target -= counts[line]
+            line += 1
+        return line, target
+
+
+def list_layouts(rows, cols, fleet, limit=LAYOUT_LIMIT, budget=SEARCH_BUDGET):
+    """Every legal fleet as a tuple of (size, direction, x, y), or None past `limit` layouts or `budget` steps
+
+    Ships of one size are interchangeable, so each layout is listed once.
+    """
+    options = {}
+    for size in set(fleet):
+        options[size] = []
+        for direction in 'hv' if size > 1 else 'h':
+            for x in range(rows - (size - 1 if direction == 'v' else 0)):
+                for y in range(cols - (size - 1 if direction == 'h' else 0)):
+                    step = 1 if direction == 'h' else cols
+                    mask = sum(1 << (x * cols + y + i * step) for i in range(size))
+                    options[size].append((mask, (size, direction, x, y)))
+    layouts = []
+    ships = []
+    steps = 0
+
+    def extend(i, used, first):
+        # `first` is the lowest option a ship may take, so ships of one size only appear in one order
+        nonlocal steps
+        if i == len(fleet):
+            layouts.append(tuple(ships))
+            return len(layouts) <= limit
+        choices = options[fleet[i]]
+        for j in range(first, len(choices)):
+            steps += 1
+            if steps > budget:
+                return False
+            mask, ship = choices[j]
+            if mask & used:
+                continue
+            ships.append(ship)
+            more = i + 1 < len(fleet) and fleet[i + 1] == fleet[i]
+            if not extend(i + 1, used | mask, j + 1 if more else 0):
+                return False
+            ships.pop()
+        return True
+
+    return layouts if extend(0, 0, 0) else None
+
+
+class FleetSampler:
+    """Draws legal fleets without retrying whole fleets
+
+    Small boards list every layout once (up to LAYOUT_LIMIT) and draw from
+    that table, so every fleet is exactly equally likely and a batch is a
+    handful of random indices.
+
+    Larger boards place ships largest first, each uniformly among the
+    positions still open (horizontal_weight tilts that towards horizontal or
+    vertical ships). Every row and column keeps its free runs of cells, and
+    for each ship size and orientation we count the placements each line has
+    room for, so a pick walks those counts by running total and a ship costs
+    O(size * sizes + sqrt(lines)). After each ship we check the rest of the
+    fleet still has room: enough free cells and a placement for every size
+    left. When that fails the ship is moved, trying its other positions in
+    random order and backing up further if none works. That keeps each ship
+    uniform given the ones before it, which is close to but not exactly
+    uniform over whole fleets.
+
+    Backtracking can take exponentially long on fleets that barely fit, so
+    a search gives up after DRAW_BUDGET positions that didn't work out and
+    starts over, and after DRAW_RESTARTS fresh starts the draw raises
+    ValueError. A fleet that fills a whole board (a tiling) usually ends up
+    there even though it fits; typical fleets never come near the budget.
+    """
+
+    def __init__(self, rows, cols, fleet, horizontal_weight=1.0):
+        self.rows = rows
+        self.cols = cols
+        self.fleet = sorted(fleet, reverse=True)
+        self.horizontal_weight = horizontal_weight
+        sizes = sorted(set(fleet))
+        # Initial per-size line counts, copied for every fleet drawn; a 1-cell ship is only counted horizontally
+        self.row_counts = {size: LineCounts([fits(cols, size)] * rows) for size in sizes}
+        self.col_counts = {size: LineCounts([fits(rows, size) if size > 1 else 0] * cols) for size in sizes}
+        # Cells and distinct sizes of the ships from each index on, for the room check
+        self.rest = []
+        for i in range(len(self.fleet) + 1):
+            rest = self.fleet[i:]
+            self.rest.append((sum(rest), sorted(set(rest))))
+        self.layouts = None
+        if rows * cols <= EXACT_CELLS and horizontal_weight == 1.0:
+            self.layouts = list_layouts(rows, cols, self.fleet)
+
+    def sample(self, rng=random, placed=()):
+        """One fleet as place_ships dicts, fitted around any ships already `placed`"""
+        if self.layouts is not None and not placed:
+            return as_ships(rng.choice(self.table()))
+        return FleetDraw(self).draw(rng, placed)
+
+    def sample_many(self, count, rng=random):
+        """`count` independent fleets"""
+        if self.layouts is not None:
+            return [as_ships(layout) for layout in rng.choices(self.table(), k=count)]
+        # One draw is rewound after each fleet instead of copying the line counts every time
+        draw = FleetDraw(self)
+        fleets = []
+        for _ in range(count):
+            fleets.append(draw.draw(rng))
+            draw.undo(0)
+        return fleets
+
+    def table(self):
+        """The listed layouts; ValueError if listing found none"""
+        if not self.layouts:
+            raise ValueError(f"Fleet {self.fleet} does not fit on a {self.rows}x{self.cols} board")
+        return self.layouts
+
+
+def as_ships(layout):
+    return [{"size": size, "direction": direction, "position": [x, y]} for size, direction, x, y in layout]
+
+
+class FleetDraw:
+    """The free runs and placement counts while one fleet is being drawn"""
+
+    def __init__(self, sampler):
+        self.sampler = sampler
+        self.counts = ({size: counts.copy() for size, counts in sampler.row_counts.items()},
+                       {size: counts.copy() for size, counts in sampler.col_counts.items()})
+        self.lengths = (sampler.cols, sampler.rows)  # Line length for rows and for columns
+        self.runs = ({}, {})  # orientation -> line -> sorted run starts; lines not listed are one free run
+        self.run_lengths = ({}, {})  # orientation -> line -> run start -> length
+        self.free = sampler.rows * sampler.cols  # Cells not taken
+        self.journal = []  # Every cut as (across, line, run start, run length, start, length), for undo()
+
+    def line_runs(self, across, line):
+        starts = self.runs[across].get(line)
+        if starts is None:
+            starts = self.runs[across][line] = [0]
+            self.run_lengths[across][line] = {0: self.lengths[across]}
+        return starts, self.run_lengths[across][line]
+
+    def recount(self, across, line, run_length, before, after, sign):
+        """Update the placement counts of a line whose run of run_length split into before and after"""
+        for size, counts in self.counts[across].items():
+            if run_length < size or across and size == 1:
+                continue
+            delta = ((before - size + 1 if before >= size else 0) + (after - size + 1 if after >= size else 0)
+                     - (run_length - size + 1))
+            counts.add(line, sign * delta)
+
+    def cut(self, across, line, start, length):
+        """Take cells start..start+length-1 of a line out of its free runs; False if any was taken"""
+        starts, lengths = self.line_runs(across, line)
+        i = bisect.bisect_right(starts, start) - 1
+        if i < 0:
+            return False
+        run = starts[i]
+        run_length = lengths[run]
+        before, after = start - run, run + run_length - start - length
+        if after < 0:
+            return False
+        del starts[i]
+        del lengths[run]
+        if before:
+            starts.insert(i, run)
+            lengths[run] = before
+            i += 1
+        if after:
+            starts.insert(i, start + length)
+            lengths[start + length] = after
+        self.recount(across, line, run_length, before, after, 1)
+        if not across:
+            self.free -= length
+        self.journal.append((across, line, run, run_length, start, length))
+        return True
+
+    def uncut(self, across, line, run, run_length, start, length):
+        """Give a cut's cells back to the run they were taken from"""
+        starts, lengths = self.runs[across][line], self.run_lengths[across][line]
+        before, after = start - run, run + run_length - start - length
+        i = bisect.bisect_left(starts, run)  # Where the pieces of the run are, or would go
+        if before:
+            del starts[i]
+            del lengths[run]
+        if after:
+            del starts[i]
+            del lengths[start + length]
+        starts.insert(i, run)
+        lengths[run] = run_length
+        self.recount(across, line, run_length, before, after, -1)
+        if not across:
+            self.free += length
+
+    def undo(self, mark):
+        """Take back every cut made since the journal was `mark` long"""
+        journal = self.journal
+        while len(journal) > mark:
+            self.uncut(*journal.pop())
+
+    def occupy(self, size, direction, x, y):
+        """Mark a ship's cells taken in its own line and in every line it crosses; False if it doesn't fit"""
+        if not (0 <= x < self.sampler.rows and 0 <= y < self.sampler.cols):
+            return False
+        if direction == 'h':
+            if not self.cut(0, x, y, size):
+                return False
+            return all(self.cut(1, col, x, 1) for col in range(y, y + size))
+        if not self.cut(1, y, x, size):
+            return False
+        return all(self.cut(0, row, y, 1) for row in range(x, x + size))
+
+    def has_room(self, index):
+        """Whether the ships from `index` on might still fit: enough free cells and a placement for each size"""
+        cells, sizes = self.sampler.rest[index]
+        rows, cols = self.counts
+        return cells <= self.free and all(rows[size].total or cols[size].total for size in sizes)
+
+    def pick(self, size, rng):
+        """Choose (direction, x, y) for a ship among every position still open"""
+        rows, cols = self.counts
+        horizontal = rows[size].total
+        vertical = cols[size].total if size > 1 else 0
+        if not horizontal and not vertical:
+            raise ValueError(f"No room left for a {size}-cell ship")
+        if horizontal and vertical:
+            weighted = horizontal * self.sampler.horizontal_weight
+            across = int(rng.random() * (weighted + vertical) >= weighted)
+        else:
+            across = int(not horizontal)
+        counts = self.counts[across][size]
+        line, target = counts.find(rng.randrange(counts.total))
+        starts, lengths = self.line_runs(across, line)
+        for start in starts:
+            count = fits(lengths[start], size)
+            if target < count:
+                offset = start + target
+                break
+            target -= count
+        return ('v', offset, line) if across else ('h', line, offset)
+
+    def positions(self, size, rng, exclude):
+        """Every open (direction, x, y) for a ship but `exclude`, shuffled"""
+        found = []
+        for across in (0, 1) if size > 1 else (0,):
+            for line, count in enumerate(self.counts[across][size].counts):
+                if not count:
+                    continue
+                starts, lengths = self.line_runs(across, line)
+                for start in starts:
+                    for offset in range(start, start + fits(lengths[start], size)):
+                        found.append(('v', offset, line) if across else ('h', line, offset))
+        found.remove(exclude)
+        rng.shuffle(found)
+        return found
+
+    def draw(self, rng=random, placed=()):
+        for ship in placed:
+            if not self.occupy(ship["size"], ship["direction"], *ship["position"]):
+                raise ValueError(f"Ship {ship} overlaps another or leaves the board")
+        mark = len(self.journal)
+        for _ in range(DRAW_RESTARTS + 1):
+            ships = self.search(rng, DRAW_BUDGET)
+            if ships is not None:
+                return ships
+            self.undo(mark)
+        fleet, rows, cols = self.sampler.fleet, self.sampler.rows, self.sampler.cols
+        raise ValueError(f"Gave up fitting fleet {fleet} on a {rows}x{cols} board after {DRAW_RESTARTS + 1} searches")
+
+    def search(self, rng, budget):
+        """Place the whole fleet, backtracking as needed; None after `budget` positions that didn't work out"""
+        fleet = self.sampler.fleet
+        chosen = []  # (direction, x, y) of each ship placed so far
+        levels = []  # For each ship placed: (journal length before it, its untried positions or None)
+        untried = None  # Positions left for the next ship once its random pick has failed
+        while len(chosen) < len(fleet):
+            if budget < 0:
+                return None
+            size = fleet[len(chosen)]
+            mark = len(self.journal)
+            if untried is None:
+                choice = self.pick(size, rng) if self.has_room(len(chosen)) else None
+            else:
+                choice = untried.pop() if untried else None
+            if choice is not None:
+                self.occupy(size, *choice)
+                if self.has_room(len(chosen) + 1):
+                    chosen.append(choice)
+                    levels.append((mark, untried))
+                    untried = None
+                    continue
+                self.undo(mark)
+                budget -= 1
+                if untried is None:
+                    untried = self.positions(size, rng, choice)
+                continue
+
+            # Nowhere left for this ship: move the one before it
+            if not chosen:
+                raise ValueError(f"Fleet {fleet} does not fit on a {self.sampler.rows}x{self.sampler.cols} board")
+            failed = chosen.pop()
+            mark, untried = levels.pop()
+            self.undo(mark)
+            budget -= 1
+            if untried is None:
+                untried = self.positions(fleet[len(chosen)], rng, failed)
+        return [{"size": size, "direction": direction, "position": [x, y]}
+                for size, (direction, x, y) in zip(fleet, chosen)]
+
+
+@lru_cache(maxsize=64)
+def fleet_sampler(rows, cols, fleet):
+    """Shared sampler for a board size and a fleet given as a tuple of sizes"""
+    return FleetSampler(rows, cols, fleet)
+
+
+def random_fleet(rows, cols, sizes, rng=random, placed=()):
+    """Pick legal placements for a fleet following Board's rules, around any ships already placed"""
+    return fleet_sampler(rows, cols, tuple(sorted(sizes))).sample(rng, placed)
@@ -1,30 +1,131 @@
-class Board:
+import logging
+from functools import lru_cache
+
+# Shot results returned by fire()
+MISS = 0
+HIT = 1
+SUNK = 2  # Hit that sank the ship; its id is in last_sunk
+ALREADY_SHOT = 3
+OUT_OF_BOUNDS = 4
+DIRECTIONS = ('h', 'v')  # Horizontal ships run along a row, vertical ones down a column
+
+# How each view redraws the owner's cells: 'hidden' is what the opponent may see of a board,
+# 'enemy' is the console's enemy view where a hit reads 'S'
+VIEWS = {'owner': None, 'hidden': str.maketrans('S', 'w'), 'enemy': str.maketrans('HS', 'Sw')}
+
+
+class BoardBase:
+    """Engine API shared by the board backends
+
+    Backends implement place() and fire(), which do no I/O and only return
+    result codes. ship_installation() and shoot() keep their original return
+    values and report to any observers, so console output and logging are
+    opt-in.
+
+    Every placement or shot that changes the board bumps `version` and
+    stamps the rows it touched. Views are immutable tuples of row strings,
+    cached per version; a newer version rebuilds only the stamped rows and
+    shares the rest with the previous snapshot.
+    """
+
+    __slots__ = ()
+
+    def add_observer(self, observer):
+        """Report placements and shots to an object with on_placement/on_shot"""
+        self.observers = self.observers + (observer,)
+
+    def ship_installation(self, size, direction, start_point):
+        """Place a ship on the board"""
+        x, y = start_point
+        placed = self.place(size, direction, x, y)
+        for observer in self.observers:
+            observer.on_placement(self, size, direction, x, y, placed)
+        return placed
+
+    def shoot(self, x, y):
+        """Process a shot at coordinates (x,y)"""
+        result = self.fire(x, y)
+        for observer in self.observers:
+            observer.on_shot(self, x, y, result)
+        if result == MISS:
+            return False # Next player's turn
+        if result == HIT or result == SUNK:
+            return True  # player should shoot again
+        return None  # player should shoot again
+
+    def stamp(self, first, last):
+        """New version after cells in rows first..last changed"""
+        self.version += 1
+        for x in range(first, last + 1):
+            self.row_versions[x] = self.version
+
+    def print_board(self, hide_ships=False, is_enemy=False):
+        for row in self.view('enemy' if is_enemy else 'hidden' if hide_ships else 'owner'):
+            print(' '.join(row))
+        print("\n")
+
+    def get_board_state(self, hide_ships=False):
+        """Get board state for network transmission, as a tuple of row strings"""
+        return self.view('hidden' if hide_ships else 'owner')
+
+    def snapshot(self, view='owner', seen=None):
+        """(version, rows) of a view; rows is None if `seen` is already the current version"""
+        if seen == self.version:
+            return seen, None
+        return self.version, self.view(view)
+
+    def view(self, name):
+        """Cached rows of a view, rebuilding only the rows changed since it was last built"""
+        cached = self.views.get(name)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        table = VIEWS[name]
+        if table is None:
+            build = self.row_cells
+        else:
+            owner = self.view('owner')
+            build = lambda x: owner[x].translate(table)
+        if cached is None:
+            rows = [build(x) for x in range(self.row)]
+        else:
+            built, rows = cached[0], list(cached[1])
+            for x, version in enumerate(self.row_versions):
+                if version > built:
+                    rows[x] = build(x)
+        rows = tuple(rows)
+        self.views[name] = (self.version, rows)
+        return rows
+
+    def has_ships(self):
+        """Check if the board has any ships placed"""
+        return self.ships_count > 0
+
+    def all_ships_sunk(self):
+        """Check if all ships on the board have been sunk"""
+        return self.ships_count > 0 and self.hit_count >= self.ships_count
+
+
+class Board(BoardBase):
     def __init__(self, row=6, col=8):
         self.row = row
         self.col = col
-        self.board = [['w' for _ in range(self.col)] for _ in range(self.row)]
+        self.cells = {}  # x * col + y -> 'S', 'H' or 'M'; cells not listed are water
+        self.ship_ids = {}  # x * col + y -> index into fleet for every ship cell
+        self.fleet = []  # (size, direction, (x, y)) of each placed ship
+        self.remaining = []  # Unhit cells left on each ship
+        self.last_sunk = None  # Ship sunk by the most recent shot, if any
         self.ships_count = 0  # Total ship cells count
         self.hit_count = 0    # Total successful hits count
+        self.observers = ()
+        self.version = 0  # Bumped by every change to the cells
+        self.row_versions = [0] * row  # Version that last changed each row
+        self.views = {}  # View name -> (version, rows)
          
-    def print_board(self, hide_ships=False, is_enemy=False):
-        for row in self.board:
-            if is_enemy:
-                print(' '.join(['S' if cell == 'H' else 'M' if cell == 'M' else 'w' for cell in row]))
-            elif hide_ships:
-                print(' '.join(['w' if cell == 'S' else cell for cell in row]))
-            else:
-                print(' '.join(row))
-        print("\n")
-
-    def get_board_state(self, hide_ships=False):
-        """Get board state for network transmission"""
-        state = []
-        for row in self.board:
-            if hide_ships:
-                state.append(['w' if cell == 'S' else cell for cell in row])
-            else:
-                state.append(row[:])
-        return state
+    def row_cells(self, x):
+        """One row of the owner's view as a string of 'w', 'S', 'H' and 'M'"""
+        cells = self.cells
+        base = x * self.col
+        return ''.join([cells.get(base + y, 'w') for y in range(self.col)])
 
     def is_valid_position(self, size, direction, x, y):
         """Check if ship placement is valid"""
@@ -32,67 +133,220 @@ class Board:
             return False
         if direction == 'h' and y + size > self.col:
             return False
+        if direction not in DIRECTIONS:
+            return False
         if direction == 'v' and x + size > self.row:
             return False
-        for i in range(size):
-            if direction == 'h' and self.board[x][y + i] != 'w':
-                return False
-            if direction == 'v' and self.board[x + i][y] != 'w':
+        step = 1 if direction == 'h' else self.col
+        start = x * self.col + y
+        for index in range(start, start + size * step, step):
+            if index in self.cells:
                 return False
         return True
 
-    def ship_installation(self, size, direction, start_point):
-        """Place a ship on the board"""
-        x, y = start_point
+    def place(self, size, direction, x, y):
+        """Place a ship without any output; return whether it was placed"""
         if not self.is_valid_position(size, direction, x, y):
-            print("❌ You can't place the ship here!")
             return False
-        else:
-            for i in range(size):
-                if direction == 'h':
-                    self.board[x][y + i] = 'S'
-                else:
-                    self.board[x + i][y] = 'S'
-            self.ships_count += size
-            return True
+        ship_id = len(self.fleet)
+        step = 1 if direction == 'h' else self.col
+        start = x * self.col + y
+        for index in range(start, start + size * step, step):
+            self.cells[index] = 'S'
+            self.ship_ids[index] = ship_id
+        self.fleet.append((size, direction, (x, y)))
+        self.remaining.append(size)
+        self.ships_count += size
+        self.stamp(x, x + size - 1 if direction == 'v' else x)
+        return True
 
-    def shoot(self, x, y):
-        """Process a shot at coordinates (x,y)"""
-        if not (0 <= x < self.row and 0 <= y < self.col):  
-            print("🚫 Out of Bounds! Try again.")
-            return None  # player should shoot again
+    def fire(self, x, y):
+        """Apply a shot without any output and return its result code"""
+        self.last_sunk = None
+        if not (0 <= x < self.row and 0 <= y < self.col):
+            return OUT_OF_BOUNDS
 
-        if self.board[x][y] == 'S':
-            self.board[x][y] = 'H'
+        index = x * self.col + y
+        cell = self.cells.get(index, 'w')
+        if cell == 'S':
+            self.cells[index] = 'H'
+            self.version += 1
+            self.row_versions[x] = self.version
             self.hit_count += 1
-            print("🎯 Hit! You get another turn!")
-            return True  # player should shoot again
+            ship_id = self.ship_ids[index]
+            self.remaining[ship_id] -= 1
+            if self.remaining[ship_id]:
+                return HIT
+            self.last_sunk = ship_id
+            return SUNK
 
-        elif self.board[x][y] == 'w':
-            self.board[x][y] = 'M'
-            print("❌ Miss! Next player's turn.")
-            return False # Next player's turn
+        if cell == 'w':
+            self.cells[index] = 'M'
+            self.version += 1
+            self.row_versions[x] = self.version
+            return MISS
 
-        else:
-            print("⚠️ Already shot here! Try again.")
-            return None # player should shoot again
-            
-    def has_ships(self):
-        """Check if the board has any ships placed"""
-        return self.ships_count > 0
-        
-    def all_ships_sunk(self):
-        """Check if all ships on the board have been sunk"""
-        return self.ships_count > 0 and self.hit_count >= self.ships_count
+        return ALREADY_SHOT
+
+
+@lru_cache(maxsize=None)
+def ship_mask(size, direction, col):
+    """Bitmask of a ship anchored at cell (0, 0) on a board with `col` columns"""
+    if direction == 'h':
+        return (1 << size) - 1
+    mask = 0
+    for i in range(size):
+        mask |= 1 << (i * col)
+    return mask
+
+
+class BitBoard(BoardBase):
+    """Board backend that keeps ships, hits and misses as integer bitmasks
+
+    Cell (x, y) is bit x * col + y. It has the same public API as Board, but
+    placement validation is a mask AND and a shot is a bit test. Python ints
+    are immutable, so recording a shot still copies the whole hits or
+    misses mask: this backend is for small boards only, and Board's sparse
+    cells are the one to use on large ones.
+    """
+
+    __slots__ = ('row', 'col', 'ships', 'hits', 'misses', 'ship_ids', 'fleet', 'remaining', 'last_sunk',
+                 'ships_count', 'hit_count', 'observers', 'version', 'row_versions', 'views')
+
+    def __init__(self, row=6, col=8):
+        self.row = row
+        self.col = col
+        self.ships = 0   # Cells holding a ship
+        self.hits = 0    # Ship cells that were shot
+        self.misses = 0  # Water cells that were shot
+        self.ship_ids = {}  # Bit index -> index into fleet for every ship cell
+        self.fleet = []  # (size, direction, (x, y)) of each placed ship
+        self.remaining = []  # Unhit cells left on each ship
+        self.last_sunk = None  # Ship sunk by the most recent shot, if any
+        self.ships_count = 0  # Total ship cells count
+        self.hit_count = 0    # Total successful hits count
+        self.observers = ()
+        self.version = 0  # Bumped by every change to the cells
+        self.row_versions = [0] * row  # Version that last changed each row
+        self.views = {}  # View name -> (version, rows)
+
+    def cell_state(self, bit):
+        """Character for a single cell, matching Board's representation"""
+        if self.hits & bit:
+            return 'H'
+        if self.misses & bit:
+            return 'M'
+        if self.ships & bit:
+            return 'S'
+        return 'w'
+
+    def row_cells(self, x):
+        """One row of the owner's view as a string of 'w', 'S', 'H' and 'M'"""
+        shift = x * self.col
+        row_mask = (1 << self.col) - 1
+        ships, hits, misses = ((mask >> shift) & row_mask for mask in (self.ships, self.hits, self.misses))
+        return ''.join(['H' if hits >> y & 1 else 'M' if misses >> y & 1 else 'S' if ships >> y & 1 else 'w'
+                        for y in range(self.col)])
+
+    def is_valid_position(self, size, direction, x, y):
+        """Check if ship placement is valid"""
+        if not (0 <= x < self.row and 0 <= y < self.col):
+            return False
+        if direction == 'h' and y + size > self.col:
+            return False
+        if direction not in DIRECTIONS:
+            return False
+        if direction == 'v' and x + size > self.row:
+            return False
+        return not self.ships & (ship_mask(size, direction, self.col) << (x * self.col + y))
+
+    def place(self, size, direction, x, y):
+        """Place a ship without any output; return whether it was placed"""
+        if not self.is_valid_position(size, direction, x, y):
+            return False
+        start = x * self.col + y
+        self.ships |= ship_mask(size, direction, self.col) << start
+        step = 1 if direction == 'h' else self.col
+        ship_id = len(self.fleet)
+        for i in range(size):
+            self.ship_ids[start + i * step] = ship_id
+        self.fleet.append((size, direction, (x, y)))
+        self.remaining.append(size)
+        self.ships_count += size
+        self.stamp(x, x + size - 1 if direction == 'v' else x)
+        return True
+
+    def fire(self, x, y):
+        """Apply a shot without any output and return its result code"""
+        self.last_sunk = None
+        if not (0 <= x < self.row and 0 <= y < self.col):
+            return OUT_OF_BOUNDS
+
+        index = x * self.col + y
+        if (self.hits >> index) & 1 or (self.misses >> index) & 1:
+            return ALREADY_SHOT
+
+        self.version += 1
+        self.row_versions[x] = self.version
+        if index in self.ship_ids:
+            self.hits |= 1 << index
+            self.hit_count += 1
+            ship_id = self.ship_ids[index]
+            self.remaining[ship_id] -= 1
+            if self.remaining[ship_id]:
+                return HIT
+            self.last_sunk = ship_id
+            return SUNK
+
+        self.misses |= 1 << index
+        return MISS
+
+
+SHOT_MESSAGES = {
+    MISS: "❌ Miss! Next player's turn.",
+    HIT: "🎯 Hit! You get another turn!",
+    SUNK: "💥 Hit and sunk! You get another turn!",
+    ALREADY_SHOT: "⚠️ Already shot here! Try again.",
+    OUT_OF_BOUNDS: "🚫 Out of Bounds! Try again.",
+}
+
+
+class ConsoleObserver:
+    """Prints the console messages for placements and shots"""
+
+    def on_placement(self, board, size, direction, x, y, placed):
+        if not placed:
+            print("❌ You can't place the ship here!")
+
+    def on_shot(self, board, x, y, result):
+        print(SHOT_MESSAGES[result])
+
+
+class LoggingObserver:
+    """Logs placements and shots at debug level"""
+
+    def __init__(self, logger=None):
+        self.logger = logger or logging.getLogger(__name__)
+
+    def on_placement(self, board, size, direction, x, y, placed):
+        self.logger.debug("placement size=%s direction=%s at (%s, %s): %s",
+                          size, direction, x, y, "placed" if placed else "rejected")
+
+    def on_shot(self, board, x, y, result):
+        self.logger.debug("shot at (%s, %s): %s", x, y, SHOT_MESSAGES[result])
 
 
 class Game:
     
-    def __init__(self):
-        self.player1_board = Board()
-        self.player2_board = Board()
+    def __init__(self, row=6, col=8):
+        self.player1_board = Board(row, col)
+        self.player2_board = Board(row, col)
         self.current_player = 1
 
+        console = ConsoleObserver()
+        self.player1_board.add_observer(console)
+        self.player2_board.add_observer(console)
+
     def print_boards(self):
         """Display the active player's board and a limited view of opponent's board"""
         if self.current_player == 1:
@@ -112,8 +366,8 @@ class Game:
 
             while True:
                 try:
-                    x = int(input("Enter row (0-5): "))
-                    y = int(input("Enter column (0-7): "))
+                    x = int(input(f"Enter row (0-{self.player1_board.row - 1}): "))
+                    y = int(input(f"Enter column (0-{self.player1_board.col - 1}): "))
 
                     if self.current_player == 1:
                         result = self.player2_board.shoot(x, y)
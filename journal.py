@@ -0,0 +1,197 @@
+import mmap
+import os
+import struct
+import threading
+from game_logic import MISS, Board
+from room import RESULT_NAMES, TOKEN_BYTES, RoomConfig
+
+# Every record has the same size so a journal can be scanned as one array.
+# Fields: kind, seat, ship size, room id, x, y (unused fields are 0)
+RECORD = struct.Struct('<BBHIHH')
+ROOM, FLEET, SHIP_H, SHIP_V, PLACED, SHOT, END, TOKEN = range(1, 9)
+TOKEN_PART = struct.Struct('<HHH')  # Six bytes of a session token carried in size, x and y
+assert TOKEN_BYTES == 2 * TOKEN_PART.size
+# ROOM      size = fleet length, x = rows, y = cols; followed by one FLEET record per ship size
+#           and two TOKEN records per seat holding its session token
+# SHIP_H/V  one ship of a seat's fleet; PLACED commits the ships written before it
+# SHOT      seat fired at (x, y); only shots that reached a board are logged
+# END       seat = winning player, 0 when the match was abandoned
+
+
+class Journal:
+    """Append-only binary log of every room's placements and shots
+
+    Appending only packs a record into a memory buffer. A background thread
+    writes the buffer out every flush_interval seconds and fsyncs it, so a
+    burst of shots costs one write and one fsync. With flush_interval=0 each
+    record is written and synced before the call returns.
+    """
+
+    def __init__(self, path, flush_interval=0.05, fsync=True):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.pending = bytearray()
+        self.lock = threading.Lock()  # Guards pending
+        self.write_lock = threading.Lock()  # Keeps flushes in order
+
+        # Drop a record torn by a crash so new records stay aligned
+        self.file = open(path, 'ab')
+        length = self.file.tell()
+        if length % RECORD.size:
+            self.file.truncate(length - length % RECORD.size)
+        self.next_room_id = last_room_id(path) + 1
+
+        self.closed = threading.Event()
+        if flush_interval:
+            threading.Thread(target=self.flush_loop, daemon=True).start()
+
+    def append(self, data):
+        with self.lock:
+            self.pending += data
+        if not self.flush_interval:
+            self.flush()
+
+    def room_opened(self, room_id, config, tokens=(None, None)):
+        """Log a new room; tokens are the seats' session tokens as hex strings of TOKEN_BYTES bytes"""
+        records = [RECORD.pack(ROOM, 0, len(config.fleet), room_id, config.rows, config.cols)]
+        records += [RECORD.pack(FLEET, 0, size, room_id, 0, 0) for size in config.fleet]
+        for seat, token in enumerate(tokens):
+            if token:
+                for size, x, y in TOKEN_PART.iter_unpack(bytes.fromhex(token)):
+                    records.append(RECORD.pack(TOKEN, seat, size, room_id, x, y))
+        self.append(b''.join(records))
+
+    def placement(self, room_id, seat, fleet):
+        """Log an accepted fleet as (size, direction, (x, y)) tuples, like Board.fleet"""
+        self.append(b''.join(RECORD.pack(SHIP_H if direction == 'h' else SHIP_V, seat, size, room_id, x, y)
+                             for size, direction, (x, y) in fleet) +
+                    RECORD.pack(PLACED, seat, 0, room_id, 0, 0))
+
+    def shot(self, room_id, seat, x, y):
+        self.append(RECORD.pack(SHOT, seat, 0, room_id, x, y))
+
+    def room_closed(self, room_id, winner):
+        self.append(RECORD.pack(END, winner or 0, 0, room_id, 0, 0))
+
+    def flush(self):
+        """Write out pending records"""
+        with self.write_lock:
+            with self.lock:
+                data, self.pending = self.pending, bytearray()
+            if data:
+                self.file.write(data)
+                self.file.flush()
+                if self.fsync:
+                    os.fsync(self.file.fileno())
+
+    def flush_loop(self):
+        while not self.closed.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        self.closed.set()
+        self.flush()
+        self.file.close()
+
+
+def scan(path):
+    """Yield every complete record of a journal, reading it through mmap"""
+    with open(path, 'rb') as f:
+        length = os.fstat(f.fileno()).st_size // RECORD.size * RECORD.size
+        if not length:
+            return
+        mapped = mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ)
+    yield from RECORD.iter_unpack(mapped)
+
+
+def last_room_id(path):
+    """Id of the newest room in a journal, or 0; reads backwards from the end"""
+    with open(path, 'rb') as f:
+        length = os.fstat(f.fileno()).st_size // RECORD.size * RECORD.size
+        if not length:
+            return 0
+        with mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ) as mapped:
+            for offset in range(length - RECORD.size, -1, -RECORD.size):
+                kind, _, _, room_id, _, _ = RECORD.unpack_from(mapped, offset)
+                if kind == ROOM:
+                    return room_id
+    return 0
+
+
+class RoomLog:
+    """Everything the journal holds about one room"""
+
+    def __init__(self, room_id, rows, cols, fleet_size):
+        self.room_id = room_id
+        self.rows = rows
+        self.cols = cols
+        self.fleet_size = fleet_size
+        self.fleet = []
+        self.ships = [[], []]  # Ships written since the seat's last PLACED record
+        self.placed = [None, None]  # Committed fleet per seat
+        self.shots = []  # (seat, x, y)
+        self.winner = None  # Set by END: player number, or 0 if abandoned
+        self.tokens = [b'', b'']
+
+    def config(self, board_class=Board):
+        return RoomConfig(self.rows, self.cols, self.fleet, board_class)
+
+    def restore(self, room):
+        """Replay placements and shots onto a fresh GameRoom"""
+        for seat, fleet in enumerate(self.placed):
+            if fleet is not None:
+                board = room.config.new_board()
+                for size, direction, x, y in fleet:
+                    board.place(size, direction, x, y)
+                room.boards[seat] = board
+                room.ships_placed[seat] = True
+        room.game_started = all(room.ships_placed)
+        room.tokens = [token.hex() if len(token) == TOKEN_BYTES else None for token in self.tokens]
+        for seat, x, y in self.shots:
+            result = room.boards[1 - seat].fire(x, y)
+            room.shots.append([seat + 1, x, y, RESULT_NAMES[result]])
+            room.current_player = 1 - seat if result == MISS else seat
+        return room
+
+
+def rebuild(records, keep_finished=False):
+    """Group journal records into RoomLogs by room id"""
+    rooms = {}
+    for kind, seat, size, room_id, x, y in records:
+        if kind == ROOM:
+            rooms[room_id] = RoomLog(room_id, x, y, size)
+            continue
+        log = rooms.get(room_id)
+        if log is None:
+            continue
+        if kind == SHOT:
+            log.shots.append((seat, x, y))
+        elif kind == SHIP_H or kind == SHIP_V:
+            log.ships[seat].append((size, 'h' if kind == SHIP_H else 'v', x, y))
+        elif kind == PLACED:
+            log.placed[seat], log.ships[seat] = log.ships[seat], []
+        elif kind == FLEET:
+            log.fleet.append(size)
+        elif kind == TOKEN:
+            log.tokens[seat] += TOKEN_PART.pack(size, x, y)
+        elif kind == END:
+            if keep_finished:
+                log.winner = seat
+            else:
+                del rooms[room_id]
+    # A room whose fleet records were torn off never got to start
+    return {room_id: log for room_id, log in rooms.items() if len(log.fleet) == log.fleet_size}
+
+
+def recover(path, make_room, board_class=Board):
+    """Rebuild every unfinished room of a journal
+
+    make_room(room_id, config) must return a new GameRoom; its boards and
+    turn are then restored from the log. Returns {room_id: GameRoom}.
+    """
+    rooms = {}
+    for room_id, log in rebuild(scan(path)).items():
+        room = make_room(room_id, log.config(board_class))
+        rooms[room_id] = log.restore(room)
+    return rooms
@@ -0,0 +1,204 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from bot import BotClient
+from protocol import ENCODINGS, FrameDecoder, ProtocolError
+
+READ_TIMEOUT = 30  # Seconds a client waits for the server before counting a timeout
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return float('nan')
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class LoadStats:
+    """Measurements shared by every client of a run"""
+
+    def __init__(self):
+        self.connect_times = []  # Seconds each successful connect took
+        self.connected_at = []  # perf_counter when each connect completed
+        self.rtts = []  # Seconds from sending a shot to reading its result
+        self.errors = Counter()  # Kind of failure -> clients it happened to
+        self.games = 0  # Clients that saw game_over
+        self.wins = 0
+
+    def merge(self, other):
+        self.connect_times += other.connect_times
+        self.connected_at += other.connected_at
+        self.rtts += other.rtts
+        self.errors += other.errors
+        self.games += other.games
+        self.wins += other.wins
+
+
+class LoadClient(BotClient):
+    """Bot that times its connect and every shot round trip"""
+
+    def __init__(self, host, port, stats, seed=None):
+        super().__init__(host, port, seed=seed)
+        self.stats = stats
+        self.shot_sent = None
+
+    def take_turn(self):
+        shots = self.shots
+        super().take_turn()
+        if self.shots != shots:
+            self.shot_sent = time.perf_counter()
+
+    def process_message(self, message):
+        if (message.get("type") == "shoot_result" and message.get("shooter") == self.player_id
+                and self.shot_sent is not None):
+            self.stats.rtts.append(time.perf_counter() - self.shot_sent)
+            self.shot_sent = None
+        super().process_message(message)
+
+    async def play(self):
+        stats = self.stats
+        start = time.perf_counter()
+        try:
+            reader, self.writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), READ_TIMEOUT)
+        except (OSError, asyncio.TimeoutError):
+            stats.errors['connect'] += 1
+            return
+        stats.connect_times.append(time.perf_counter() - start)
+        stats.connected_at.append(time.perf_counter())
+
+        decoder = FrameDecoder()
+        self.send_message({"type": "hello", "encodings": ENCODINGS})
+        try:
+            while self.winner is None:
+                data = await asyncio.wait_for(reader.read(65536), READ_TIMEOUT)
+                if not data:
+                    stats.errors['closed early'] += 1
+                    return
+                for message in decoder.feed_messages(data):
+                    self.process_message(message)
+                self.take_turn()
+                await self.writer.drain()
+            stats.games += 1
+            stats.wins += self.winner == self.player_id
+        except asyncio.TimeoutError:
+            stats.errors['timeout'] += 1
+        except ProtocolError:
+            stats.errors['protocol'] += 1
+        except ConnectionError:
+            stats.errors['connection reset'] += 1
+        finally:
+            self.writer.close()
+
+
+async def run_load(host, port, clients, rate=None, seed=0):
+    """Start `clients` players, `rate` per second (all at once if None), and wait for every game"""
+    stats = LoadStats()
+    tasks = []
+    start = time.perf_counter()
+    for i in range(clients):
+        if rate:
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(LoadClient(host, port, stats, seed + i).play()))
+    await asyncio.gather(*tasks)
+    return stats, time.perf_counter() - start
+
+
+def load_process(host, port, clients, rate, seed):
+    raise_fd_limit()
+    return asyncio.run(run_load(host, port, clients, rate, seed))
+
+
+def run_processes(host, port, clients, rate=None, seed=0, procs=1):
+    """Split the clients over `procs` generator processes so the generator isn't the bottleneck"""
+    shares = [clients // procs + (i < clients % procs) for i in range(procs)]
+    with multiprocessing.Pool(procs) as pool:
+        results = pool.starmap(load_process, [(host, port, share, rate and rate / procs, seed + i * clients)
+                                              for i, share in enumerate(shares)])
+    stats = LoadStats()
+    for part, _ in results:
+        stats.merge(part)
+    return stats, max(elapsed for _, elapsed in results)
+
+
+def report(stats, clients, elapsed):
+    connects = sorted(stats.connect_times)
+    rtts = sorted(stats.rtts)
+    if len(stats.connected_at) > 1:
+        span = max(stats.connected_at) - min(stats.connected_at)
+        connect_rate = len(connects) / span if span else float('inf')
+    else:
+        connect_rate = float('nan')
+    print(f"📊 {clients} clients in {elapsed:.2f}s")
+    print(f"   connected {len(connects)}, {connect_rate:,.0f}/s; "
+          f"connect p50 {percentile(connects, 0.5) * 1e3:.2f}ms p99 {percentile(connects, 0.99) * 1e3:.2f}ms")
+    print(f"   finished {stats.games} player-games ({stats.games / 2 / elapsed:,.1f} games/s)")
+    print(f"   {len(rtts):,} shots, RTT p50 {percentile(rtts, 0.5) * 1e3:.2f}ms "
+          f"p99 {percentile(rtts, 0.99) * 1e3:.2f}ms max {(rtts[-1] if rtts else float('nan')) * 1e3:.2f}ms")
+    errors = ', '.join(f"{kind} {count}" for kind, count in stats.errors.most_common()) or 'none'
+    print(f"   errors: {errors}")
+
+
+def raise_fd_limit():
+    """Thousands of sockets need more descriptors than the usual soft limit"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def spawn_server(port, extra_args, workers=None):
+    """Start an async_server.py (or a sharded_server.py with `workers`) on localhost and wait until it accepts"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    if workers:
+        command = [os.path.join(here, 'sharded_server.py'), '--workers', str(workers)]
+    else:
+        command = [os.path.join(here, 'async_server.py')]
+    process = subprocess.Popen([sys.executable, *command, '--port', str(port), *extra_args],
+                               stdout=subprocess.DEVNULL, preexec_fn=raise_fd_limit)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline and process.poll() is None:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    else:
+        process.kill()
+        raise RuntimeError("Server did not start")
+    return process
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test a Battleship server with headless clients")
+    parser.add_argument("--host", default='127.0.0.1')
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("-n", "--clients", type=int, default=1000, help="players to connect (two per game)")
+    parser.add_argument("--rate", type=float, help="new connections per second; all at once if omitted")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--procs", type=int, default=1, help="generator processes to spread the clients over")
+    parser.add_argument("--spawn", action='store_true',
+                        help="start a local async_server.py for the run; arguments after -- are passed to it")
+    parser.add_argument("--workers", type=int, help="with --spawn, start a sharded_server.py with this many workers")
+    args, server_args = parser.parse_known_args()
+    if server_args[:1] == ['--']:
+        server_args = server_args[1:]
+    elif server_args:
+        parser.error(f"unrecognized arguments: {' '.join(server_args)}")
+
+    raise_fd_limit()
+    server = spawn_server(args.port, server_args, args.workers) if args.spawn else None
+    try:
+        stats, elapsed = run_processes(args.host, args.port, args.clients, args.rate, args.seed, args.procs)
+        report(stats, args.clients, elapsed)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
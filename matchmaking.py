@@ -0,0 +1,126 @@
+import bisect
+import heapq
+import itertools
+import json
+import os
+
+DEFAULT_RATING = 1500
+K_FACTOR = 32
+MATCH_WINDOW = 50  # Rating gap accepted straight away
+WIDEN_PER_SECOND = 25  # How fast the accepted gap grows while a player waits
+MAX_WINDOW = 800  # Gap that is never accepted, however long the wait
+
+
+class Ratings:
+    """Elo ratings by player name, optionally kept in a JSON file
+
+    Players without a name are rated DEFAULT_RATING and nothing is stored for them.
+    Names are whatever the client's hello says and are not authenticated, so
+    anyone can play under anyone's name: the ratings only mean something
+    among players who trust each other, such as a club or a LAN.
+    """
+
+    def __init__(self, path=None, k=K_FACTOR):
+        self.path = path
+        self.k = k
+        self.ratings = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.ratings = json.load(f)
+
+    def get(self, name):
+        return self.ratings.get(name, DEFAULT_RATING)
+
+    def record(self, winner, loser):
+        """Move both ratings by how surprising the result was"""
+        winner_rating, loser_rating = self.get(winner), self.get(loser)
+        change = self.k * (1 - 1 / (1 + 10 ** ((loser_rating - winner_rating) / 400)))
+        if winner is not None:
+            self.ratings[winner] = winner_rating + change
+        if loser is not None:
+            self.ratings[loser] = loser_rating - change
+
+    def save(self):
+        if self.path:
+            with open(self.path, 'w') as f:
+                json.dump(self.ratings, f)
+
+
+class MatchQueue:
+    """Waiting players ordered by rating
+
+    Two players may meet once their gap fits the window of the longer waiter,
+    which starts at `window` and grows by `widen` points per second. The
+    closest candidates are always neighbours in rating order, so instead of
+    scanning the queue we keep a heap of neighbouring pairs keyed by the time
+    each pair becomes acceptable. Joining and leaving cost a bisect and a
+    couple of heap pushes; pop_ready only pops the pairs that are due.
+    """
+
+    def __init__(self, window=MATCH_WINDOW, widen=WIDEN_PER_SECOND, max_window=MAX_WINDOW):
+        self.window = window
+        self.widen = widen
+        self.max_window = max_window
+        self.order = []  # (rating, seq) sorted by rating
+        self.entries = {}  # seq -> (player, rating, joined)
+        self.seqs = {}  # player -> seq
+        self.due = []  # Heap of (time the pair becomes acceptable, seq, seq)
+        self.counter = itertools.count()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, player):
+        return player in self.seqs
+
+    def add(self, player, rating, now):
+        seq = next(self.counter)
+        key = (rating, seq)
+        i = bisect.bisect(self.order, key)
+        self.order.insert(i, key)
+        self.entries[seq] = (player, rating, now)
+        self.seqs[player] = seq
+        if i > 0:
+            self.push_pair(self.order[i - 1][1], seq)
+        if i + 1 < len(self.order):
+            self.push_pair(seq, self.order[i + 1][1])
+
+    def remove(self, player):
+        """Take a player out of the queue; False if it wasn't waiting"""
+        seq = self.seqs.pop(player, None)
+        if seq is None:
+            return False
+        _, rating, _ = self.entries.pop(seq)
+        i = bisect.bisect_left(self.order, (rating, seq))
+        del self.order[i]
+        # Its two neighbours are neighbours of each other now
+        if 0 < i < len(self.order):
+            self.push_pair(self.order[i - 1][1], self.order[i][1])
+        return True
+
+    def push_pair(self, a, b):
+        _, rating_a, joined_a = self.entries[a]
+        _, rating_b, joined_b = self.entries[b]
+        gap = abs(rating_a - rating_b)
+        if gap > self.max_window or (gap > self.window and not self.widen):
+            return
+        ready = min(joined_a, joined_b) + max(0, gap - self.window) / (self.widen or 1)
+        heapq.heappush(self.due, (ready, a, b))
+
+        # Pairs of players who already left pile up in the heap; rebuild it when they dominate
+        if len(self.due) > 4 * len(self.entries) + 64:
+            self.due = []
+            for (_, left), (_, right) in zip(self.order, self.order[1:]):
+                self.push_pair(left, right)
+
+    def pop_ready(self, now):
+        """Remove and return every (player, player) pair that may play at `now`, longest waiter first"""
+        pairs = []
+        while self.due and self.due[0][0] <= now:
+            _, a, b = heapq.heappop(self.due)
+            if a in self.entries and b in self.entries:
+                first, second = self.entries[min(a, b)][0], self.entries[max(a, b)][0]
+                self.remove(first)
+                self.remove(second)
+                pairs.append((first, second))
+        return pairs
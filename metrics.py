@@ -0,0 +1,193 @@
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Latency buckets from 1us to about 1s, doubling each time
+DEFAULT_BUCKETS = [1e-6 * 2 ** i for i in range(21)]
+CLIENT_MESSAGE_TYPES = ('hello', 'place_ships', 'shoot', 'stats', 'pong')  # Anything else is counted as "other"
+
+# Updates are plain attribute arithmetic without locks: on the threaded
+# server an increment can very rarely be lost, which is an accepted price
+# for keeping them cheap enough to leave on.
+
+
+class Counter:
+    """A value that only goes up, optionally split by one label"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help, label=None):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.value = 0
+        self.children = {}  # label value -> Counter
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def labels(self, value):
+        child = self.children.get(value)
+        if child is None:
+            child = self.children[value] = type(self)(self.name, self.help)
+        return child
+
+    def samples(self):
+        if self.label is None:
+            yield self.name, self.value
+        for value, child in sorted(self.children.items()):
+            yield f'{self.name}{{{self.label}="{value}"}}', child.value
+
+    def snapshot(self):
+        if self.label is None:
+            return self.value
+        return {value: child.value for value, child in self.children.items()}
+
+
+class Gauge(Counter):
+    """A value that goes up and down"""
+
+    kind = 'gauge'
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+
+class Histogram:
+    """Counts of observations per bucket, plus their sum"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.bounds = list(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)  # The last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation; None if empty or beyond the last bucket"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def samples(self):
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            yield f'{self.name}_bucket{{le="{bound:.6g}"}}', seen
+        yield f'{self.name}_bucket{{le="+Inf"}}', self.count
+        yield f'{self.name}_sum', self.sum
+        yield f'{self.name}_count', self.count
+
+    def snapshot(self):
+        return {"count": self.count, "sum": self.sum, "p50": self.quantile(0.5), "p99": self.quantile(0.99)}
+
+
+class Registry:
+    """Named metrics rendered together"""
+
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, label=None):
+        return self.add(Counter(name, help, label))
+
+    def gauge(self, name, help, label=None):
+        return self.add(Gauge(name, help, label))
+
+    def histogram(self, name, help, buckets=DEFAULT_BUCKETS):
+        return self.add(Histogram(name, help, buckets))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(f'{name} {value}' for name, value in metric.samples())
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        """All metrics as plain values, for the stats message"""
+        return {metric.name: metric.snapshot() for metric in self.metrics}
+
+
+class ServerMetrics:
+    """What the servers and their rooms report"""
+
+    def __init__(self):
+        self.started = time.time()
+        registry = self.registry = Registry()
+        self.connections = registry.gauge('battleship_connections', 'Open player connections')
+        self.connections_total = registry.counter('battleship_connections_total', 'Player connections accepted')
+        self.rooms = registry.gauge('battleship_rooms', 'Rooms currently open')
+        self.messages_received = registry.counter('battleship_messages_received_total',
+                                                  'Messages received from players', 'type')
+        self.messages_sent = registry.counter('battleship_messages_sent_total', 'Messages sent to players')
+        self.send_failures = registry.counter('battleship_send_failures_total', 'Messages that could not be sent')
+        self.slow_disconnects = registry.counter('battleship_slow_disconnects_total',
+                                                 'Players cut off for letting their send queue overflow')
+        self.idle_disconnects = registry.counter('battleship_idle_disconnects_total',
+                                                 'Players cut off for not answering heartbeats')
+        self.games_started = registry.counter('battleship_games_started_total', 'Games where both fleets were placed')
+        self.games_finished = registry.counter('battleship_games_finished_total', 'Games played to the end')
+        self.games_abandoned = registry.counter('battleship_games_abandoned_total', 'Games ended by a disconnect')
+        self.turn_timeouts = registry.counter('battleship_turn_timeouts_total',
+                                              'Games forfeited by a seat that ran out of time')
+        self.process_seconds = registry.histogram('battleship_process_message_seconds',
+                                                  'Time to handle one player message')
+        self.send_seconds = registry.histogram('battleship_send_seconds', 'Time to encode and send one message')
+        self.place_seconds = registry.histogram('battleship_board_place_seconds', 'Time to validate and place a fleet')
+        self.fire_seconds = registry.histogram('battleship_board_fire_seconds', 'Time to resolve one shot')
+
+    def received(self, msg_type):
+        """Count an incoming message without letting clients invent label values"""
+        self.messages_received.labels(msg_type if msg_type in CLIENT_MESSAGE_TYPES else 'other').inc()
+
+    def stats_message(self):
+        return {"type": "stats", "uptime": time.time() - self.started, "metrics": self.registry.snapshot()}
+
+
+def serve_http(registry, host='127.0.0.1', port=9100):
+    """Serve a registry at /metrics in Prometheus text format from a daemon thread"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Scrapes would flood the console
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"📈 Metrics on http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,259 @@
+import json
+import struct
+
+HEADER = struct.Struct('!I')  # Big-endian payload length in front of every frame
+MAX_FRAME_SIZE = 64 * 1024
+MAX_PLAYER_BACKLOG = 256 * 1024  # Unsent bytes before a player who stopped reading is disconnected
+HEARTBEAT_INTERVAL = 10  # Seconds a player may stay quiet before the server pings it
+IDLE_TIMEOUT = 30  # Seconds without a byte from the peer, pongs included, before a connection counts as dead
+
+ENCODINGS = ['binary', 'json']  # Supported payload encodings, most preferred first
+
+
+class ProtocolError(Exception):
+    """Raised when the peer sends a malformed or oversized frame"""
+
+
+def encode_frame(payload):
+    """Prefix a payload with its length"""
+    if len(payload) > MAX_FRAME_SIZE:
+        raise ProtocolError(f"Frame of {len(payload)} bytes exceeds {MAX_FRAME_SIZE}")
+    return HEADER.pack(len(payload)) + payload
+
+
+# Binary payloads start with a one-byte opcode followed by fixed struct fields.
+# JSON payloads always start with '{', so every frame says how it is encoded
+# and the two encodings can be mixed on one connection.
+UINT8 = struct.Struct('!B')
+UINT16 = struct.Struct('!H')
+POINT = struct.Struct('!HH')
+SHIP = struct.Struct('!HcHH')
+SHOOT_RESULT = struct.Struct('!BHHBB')
+SHIP_SUNK = struct.Struct('!BHHcHH')
+
+RESULTS = ['miss', 'hit', 'invalid']
+
+
+def _encode_text(message, key):
+    return message[key].encode()
+
+
+def _decode_text(payload, key):
+    return {key: bytes(payload).decode()}
+
+
+def _encode_player(key):
+    return lambda message: UINT8.pack(message[key])
+
+
+def _decode_player(key):
+    return lambda payload: {key: UINT8.unpack_from(payload)[0]}
+
+
+def _encode_fleet(message):
+    sizes = message["sizes"]
+    return POINT.pack(message["rows"], message["cols"]) + UINT16.pack(len(sizes)) + struct.pack(f'!{len(sizes)}H', *sizes)
+
+
+def _decode_fleet(payload):
+    rows, cols = POINT.unpack_from(payload)
+    (count,) = UINT16.unpack_from(payload, POINT.size)
+    sizes = list(struct.unpack_from(f'!{count}H', payload, POINT.size + UINT16.size))
+    return {"sizes": sizes, "rows": rows, "cols": cols}
+
+
+def _encode_ships(message):
+    ships = message["ships"]
+    parts = [UINT16.pack(len(ships))]
+    for ship in ships:
+        x, y = ship["position"]
+        parts.append(SHIP.pack(ship["size"], ship["direction"].encode(), x, y))
+    return b''.join(parts)
+
+
+def _decode_ships(payload):
+    (count,) = UINT16.unpack_from(payload)
+    ships = []
+    for i in range(count):
+        size, direction, x, y = SHIP.unpack_from(payload, UINT16.size + i * SHIP.size)
+        ships.append({"size": size, "direction": direction.decode(), "position": [x, y]})
+    return {"ships": ships}
+
+
+def _encode_shoot(message):
+    return POINT.pack(*message["position"])
+
+
+def _decode_shoot(payload):
+    return {"position": list(POINT.unpack_from(payload))}
+
+
+def _encode_shoot_result(message):
+    x, y = message["position"]
+    return SHOOT_RESULT.pack(message["shooter"], x, y, RESULTS.index(message["result"]), message["game_over"])
+
+
+def _decode_shoot_result(payload):
+    shooter, x, y, result, game_over = SHOOT_RESULT.unpack_from(payload)
+    return {"shooter": shooter, "position": [x, y], "result": RESULTS[result], "game_over": bool(game_over)}
+
+
+def _encode_ship_sunk(message):
+    x, y = message["position"]
+    return SHIP_SUNK.pack(message["owner"], message["ship"], message["size"], message["direction"].encode(), x, y)
+
+
+def _decode_ship_sunk(payload):
+    owner, ship, size, direction, x, y = SHIP_SUNK.unpack_from(payload)
+    return {"owner": owner, "ship": ship, "size": size, "direction": direction.decode(), "position": [x, y]}
+
+
+# type -> (opcode, fields, encode, decode)
+BINARY_MESSAGES = {
+    "init": (1, {"player_id"}, _encode_player("player_id"), _decode_player("player_id")),
+    "message": (2, {"content"}, lambda m: _encode_text(m, "content"), lambda p: _decode_text(p, "content")),
+    "place_ships_request": (3, {"sizes", "rows", "cols"}, _encode_fleet, _decode_fleet),
+    "ships_placed": (4, {"success"}, lambda m: UINT8.pack(m["success"]),
+                     lambda p: {"success": bool(UINT8.unpack_from(p)[0])}),
+    "game_start": (5, {"current_player"}, _encode_player("current_player"), _decode_player("current_player")),
+    "shoot_result": (6, {"shooter", "position", "result", "game_over"}, _encode_shoot_result, _decode_shoot_result),
+    "turn_change": (7, {"current_player"}, _encode_player("current_player"), _decode_player("current_player")),
+    "game_over": (8, {"winner"}, _encode_player("winner"), _decode_player("winner")),
+    "player_disconnected": (9, {"message"}, lambda m: _encode_text(m, "message"), lambda p: _decode_text(p, "message")),
+    "place_ships": (10, {"ships"}, _encode_ships, _decode_ships),
+    "shoot": (11, {"position"}, _encode_shoot, _decode_shoot),
+    "ship_sunk": (12, {"owner", "ship", "size", "direction", "position"}, _encode_ship_sunk, _decode_ship_sunk),
+    "ping": (13, set(), lambda m: b'', lambda p: {}),
+    "pong": (14, set(), lambda m: b'', lambda p: {}),
+}
+BINARY_OPCODES = {opcode: (msg_type, decode) for msg_type, (opcode, _, _, decode) in BINARY_MESSAGES.items()}
+
+
+def encode_binary(message):
+    """Encode a message in the binary format, or return None if it has no exact binary form"""
+    spec = BINARY_MESSAGES.get(message.get("type"))
+    if spec is None:
+        return None
+    opcode, fields, encode, _ = spec
+    if message.keys() - {"type"} != fields:
+        return None
+    try:
+        return UINT8.pack(opcode) + encode(message)
+    except (struct.error, ValueError, TypeError, AttributeError):
+        return None
+
+
+def decode_binary(payload):
+    """Decode a binary payload into a message"""
+    spec = BINARY_OPCODES.get(payload[0])
+    if spec is None:
+        raise ProtocolError(f"Unknown opcode {payload[0]}")
+    msg_type, decode = spec
+    try:
+        message = decode(memoryview(payload)[1:])
+    except (struct.error, UnicodeDecodeError, IndexError, ValueError) as e:
+        raise ProtocolError(f"Invalid {msg_type} message: {e}") from None
+    message["type"] = msg_type
+    return message
+
+
+def encode_payload(message, encoding='json'):
+    """Encode a message body, falling back to JSON when binary can't represent it"""
+    if encoding == 'binary':
+        payload = encode_binary(message)
+        if payload is not None:
+            return payload
+    return json.dumps(message).encode()
+
+
+def encode_message(message, encoding='json'):
+    """Encode one message as a complete frame"""
+    return encode_frame(encode_payload(message, encoding))
+
+
+def encode_messages(messages, encoding='json'):
+    """Encode several messages into one buffer so they go out in a single write"""
+    return b''.join(encode_message(message, encoding) for message in messages)
+
+
+def _is_text_list(value):
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+# hello field -> test its value has to pass
+HELLO_FIELDS = {
+    "encodings": _is_text_list,
+    "encoding": lambda value: isinstance(value, str),
+    "token": lambda value: isinstance(value, str),
+    "name": lambda value: isinstance(value, str),
+    "seen": lambda value: type(value) is int,
+}
+
+
+def check_hello(message):
+    """Drop hello fields of the wrong type, so every server can use the rest as they are"""
+    for field, valid in HELLO_FIELDS.items():
+        if field in message and not valid(message[field]):
+            del message[field]
+
+
+def decode_message(payload):
+    """Decode a frame payload into a message"""
+    if not payload:
+        raise ProtocolError("Empty frame")
+    if payload[0] != 0x7B:  # '{'
+        return decode_binary(payload)
+    try:
+        message = json.loads(payload)
+    except ValueError as e:
+        raise ProtocolError(f"Invalid message: {e}") from None
+    if not isinstance(message, dict):
+        raise ProtocolError("Message must be a JSON object")
+    if message.get("type") == "hello":
+        check_hello(message)
+    return message
+
+
+def negotiate(encodings):
+    """Pick the first encoding offered by the peer that we support"""
+    if not _is_text_list(encodings):
+        return 'json'
+    for encoding in encodings:
+        if encoding in ENCODINGS:
+            return encoding
+    return 'json'
+
+
+class FrameDecoder:
+    """Incremental decoder that splits a byte stream back into frames
+
+    Reads may contain several frames or only part of one; incomplete data is
+    kept until the rest of the frame arrives.
+    """
+
+    def __init__(self, max_frame_size=MAX_FRAME_SIZE):
+        self.max_frame_size = max_frame_size
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        """Add received bytes and return the payloads of all complete frames"""
+        buffer = self.buffer
+        buffer += data
+        frames = []
+        offset = 0
+        while len(buffer) - offset >= HEADER.size:
+            (size,) = HEADER.unpack_from(buffer, offset)
+            if size > self.max_frame_size:
+                raise ProtocolError(f"Frame of {size} bytes exceeds {self.max_frame_size}")
+            end = offset + HEADER.size + size
+            if end > len(buffer):
+                break
+            frames.append(bytes(buffer[offset + HEADER.size:end]))
+            offset = end
+        if offset:
+            del buffer[:offset]
+        return frames
+
+    def feed_messages(self, data):
+        """Add received bytes and return all complete decoded messages"""
+        return [decode_message(payload) for payload in self.feed(data)]
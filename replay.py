@@ -0,0 +1,67 @@
+import argparse
+import mmap
+import os
+import time
+import numpy as np  # Optional: only batch_sim, bench_batch and replay need it (pip install numpy)
+from journal import END, RECORD, ROOM, SHOT, rebuild
+from room import GameRoom
+
+# Same layout as journal.RECORD, so a mapped journal can be read as one array
+RECORD_DTYPE = np.dtype([('kind', 'u1'), ('seat', 'u1'), ('size', '<u2'), ('room', '<u4'), ('x', '<u2'), ('y', '<u2')])
+assert RECORD_DTYPE.itemsize == RECORD.size
+
+
+def load(path):
+    """Map a journal read-only and view its complete records as a structured array"""
+    with open(path, 'rb') as f:
+        count = os.fstat(f.fileno()).st_size // RECORD.size
+        if not count:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        mapped = mmap.mmap(f.fileno(), count * RECORD.size, access=mmap.ACCESS_READ)
+    return np.frombuffer(mapped, dtype=RECORD_DTYPE, count=count)
+
+
+def summary(records):
+    """Print match counts, results and game lengths for a whole journal"""
+    kinds = records['kind']
+    ends = records[kinds == END]
+    finished = ends['room'][ends['seat'] > 0]
+    winners = np.bincount(ends['seat'], minlength=3)
+    opened = np.count_nonzero(kinds == ROOM)
+
+    print(f"📒 {len(records):,} records, {opened:,} rooms")
+    print(f"   finished {len(finished):,}, abandoned {winners[0]:,}, unfinished {opened - len(ends):,}")
+    if len(finished):
+        print(f"   player 1 won {winners[1] / len(finished):.1%}, player 2 won {winners[2] / len(finished):.1%}")
+        shots = np.bincount(records['room'][kinds == SHOT], minlength=int(records['room'].max()) + 1)[finished]
+        print(f"   shots per finished game: mean {shots.mean():.1f}, median {np.median(shots):.0f}, "
+              f"p99 {np.percentile(shots, 99):.0f}, max {shots.max()}")
+
+
+def show_room(records, room_id):
+    """Rebuild one room from its records and print both boards"""
+    log = rebuild(records[records['room'] == room_id].tolist(), keep_finished=True).get(room_id)
+    if log is None:
+        print(f"Room {room_id} is not in the journal")
+        return
+    result = {None: "still running", 0: "abandoned"}.get(log.winner, f"won by player {log.winner}")
+    print(f"🎮 Room {room_id}: {log.rows}x{log.cols}, fleet {log.fleet}, {len(log.shots)} shots, {result}")
+    room = log.restore(GameRoom(room_id, None, log.config()))
+    for seat, board in enumerate(room.boards):
+        print(f"\nPlayer {seat + 1}'s board")
+        board.print_board()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scan a match journal")
+    parser.add_argument("journal")
+    parser.add_argument("--room", type=int, help="replay one room and print its boards")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    records = load(args.journal)
+    if args.room is None:
+        summary(records)
+    else:
+        show_room(records, args.room)
+    print(f"\n⏱️ {time.perf_counter() - start:.3f}s")
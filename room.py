@@ -0,0 +1,316 @@
+import functools
+import secrets
+import threading
+import time
+from game_logic import DIRECTIONS, HIT, MISS, SUNK, Board
+
+SHIP_SIZES = [3, 2]
+RESULT_NAMES = {MISS: "miss", HIT: "hit", SUNK: "hit"}  # Anything else is "invalid"
+MAX_BOARD_SIZE = 1000
+TOKEN_BYTES = 12  # Random bytes in a session token
+RECONNECT_GRACE = 30  # Seconds a seat is kept for a player who lost their connection
+RESUME_CHUNK = 500  # Ships and shots per resumed frame, keeps every frame well under MAX_FRAME_SIZE
+TURN_TIMEOUT = 60  # Seconds a seat has to place its fleet or take its next shot before it forfeits
+
+
+def serialized(method):
+    """Run a GameRoom method while holding the room's lock"""
+    @functools.wraps(method)
+    def locked(self, *args):
+        with self.lock:
+            return method(self, *args)
+    return locked
+
+
+def is_point(position):
+    """Whether a message field is an [x, y] pair of ints"""
+    return (isinstance(position, (list, tuple)) and len(position) == 2
+            and all(type(value) is int for value in position))
+
+
+def is_ship(ship):
+    """Whether a place_ships entry has an int size, a known direction and an int position"""
+    return (isinstance(ship, dict) and type(ship.get("size")) is int and ship.get("direction") in DIRECTIONS
+            and is_point(ship.get("position")))
+
+
+def new_token():
+    """A session token that lets a player take their seat back after a disconnect"""
+    return secrets.token_hex(TOKEN_BYTES)
+
+
+class RoomConfig:
+    """Board dimensions, fleet and board backend shared by the rooms of a server"""
+
+    def __init__(self, rows=6, cols=8, fleet=SHIP_SIZES, board_class=Board):
+        if not (1 <= rows <= MAX_BOARD_SIZE and 1 <= cols <= MAX_BOARD_SIZE):
+            raise ValueError(f"Board must be between 1x1 and {MAX_BOARD_SIZE}x{MAX_BOARD_SIZE}")
+        if not fleet or min(fleet) < 1 or max(fleet) > max(rows, cols):
+            raise ValueError(f"Every ship must fit on a {rows}x{cols} board")
+        if sum(fleet) > rows * cols:
+            raise ValueError(f"Fleet of {sum(fleet)} cells does not fit on a {rows}x{cols} board")
+        self.rows = rows
+        self.cols = cols
+        self.fleet = list(fleet)
+        self.board_class = board_class
+
+    def new_board(self):
+        """Create an empty board with the configured dimensions"""
+        return self.board_class(self.rows, self.cols)
+
+
+class GameRoom:
+    """State of a single match: two seats, their boards and whose turn it is
+
+    Every method that reads or changes the match takes the room's lock, so
+    the two seats' handler threads (and the server's timers) apply their
+    commands one at a time. The send, broadcast and journal hooks run under
+    the lock and must not block or call back into the room.
+    """
+
+    def __init__(self, room_id, send, config=None, broadcast=None, journal=None, metrics=None):
+        self.room_id = room_id
+        self.send = send  # send(seat, data) delivers a message to one seat
+        self.broadcast = broadcast  # broadcast(data), if given, also gets everything sent to both seats
+        self.journal = journal  # Optional Journal recording placements and shots
+        self.metrics = metrics  # Optional ServerMetrics timing board operations and counting games
+        self.config = config or RoomConfig()
+        self.boards = [self.config.new_board(), self.config.new_board()]  # Game board for each seat
+        self.current_player = 0  # Current seat (0 or 1)
+        self.game_started = False
+        self.ships_placed = [False, False]  # Track if seats have placed ships
+        self.connected = [True, True]
+        self.finished = False
+        self.winner = None  # Winning seat once finished; the other seat if one abandoned the match or ran out of time
+        self.tokens = [None, None]  # Session token per seat, set by the server before start()
+        self.shots = []  # Every valid shot as [shooter, x, y, result] so a returning seat can catch up
+        self.moved_at = time.monotonic()  # When the match last moved on; the seat it waits on is timed from here
+        self.lock = threading.Lock()
+
+    @serialized
+    def start(self):
+        """Ask both players to place their ships"""
+        if self.journal:
+            self.journal.room_opened(self.room_id, self.config, self.tokens)
+        self.moved_at = time.monotonic()
+        self.send_to_both(self.place_ships_request())
+
+    def place_ships_request(self):
+        return {
+            "type": "place_ships_request",
+            "sizes": self.config.fleet,
+            "rows": self.config.rows,
+            "cols": self.config.cols
+        }
+
+    def send_to_both(self, data):
+        """Send data to every connected seat and to the broadcast hook"""
+        for seat in range(2):
+            if self.connected[seat]:
+                self.send(seat, data)
+        if self.broadcast:
+            self.broadcast(data)
+
+    @serialized
+    def process_message(self, seat, message):
+        """Process a message from one seat"""
+        if self.finished:
+            return
+
+        msg_type = message.get("type", "")
+
+        if msg_type == "place_ships" and not self.game_started:
+            # Handle ship placement on a fresh board so a rejected fleet leaves nothing behind
+            ships = message.get("ships", [])
+            start = time.perf_counter()
+            board = self.config.new_board()
+            success = (isinstance(ships, list) and all(is_ship(ship) for ship in ships)
+                       and sorted(ship["size"] for ship in ships) == sorted(self.config.fleet))
+            for ship in ships if success else []:
+                size = ship.get("size")
+                direction = ship.get("direction")
+                x, y = ship.get("position")
+                if not board.place(size, direction, x, y):
+                    success = False
+                    break
+            if self.metrics:
+                self.metrics.place_seconds.observe(time.perf_counter() - start)
+
+            if success:
+                self.boards[seat] = board
+                self.ships_placed[seat] = True
+                if self.journal:
+                    self.journal.placement(self.room_id, seat, board.fleet)
+                self.send(seat, {"type": "ships_placed", "success": True})
+
+                # Check if both players have placed ships to start the game
+                if all(self.ships_placed) and not self.game_started:
+                    self.game_started = True
+                    self.moved_at = time.monotonic()
+                    if self.metrics:
+                        self.metrics.games_started.inc()
+                    self.send_to_both({
+                        "type": "game_start",
+                        "current_player": self.current_player + 1
+                    })
+            else:
+                self.send(seat, {"type": "ships_placed", "success": False})
+
+        elif msg_type == "shoot" and self.game_started:
+            # Handle shots
+            if seat == self.current_player:  # Only process if it's this seat's turn
+                position = message.get("position")
+                if not (is_point(position) and 0 <= position[0] < self.config.rows
+                        and 0 <= position[1] < self.config.cols):
+                    # Malformed or off the board: only the shooter hears about it
+                    self.send(seat, {"type": "shoot_result", "shooter": seat + 1, "position": position,
+                                     "result": "invalid", "game_over": False})
+                    return
+                x, y = position
+                target_board = self.boards[1 - seat]  # Opponent's board
+
+                start = time.perf_counter()
+                result = target_board.fire(x, y)
+                game_over = result in RESULT_NAMES and target_board.all_ships_sunk()
+                if self.metrics:
+                    self.metrics.fire_seconds.observe(time.perf_counter() - start)
+                if self.journal and result in RESULT_NAMES:
+                    self.journal.shot(self.room_id, seat, x, y)
+
+                # Send result to both players
+                result_name = RESULT_NAMES.get(result, "invalid")
+                if result in RESULT_NAMES:
+                    self.shots.append([seat + 1, x, y, result_name])
+                    self.moved_at = time.monotonic()
+                self.send_to_both({
+                    "type": "shoot_result",
+                    "shooter": seat + 1,
+                    "position": [x, y],
+                    "result": result_name,
+                    "game_over": game_over
+                })
+
+                # Tell everyone which ship went down
+                if result == SUNK:
+                    size, direction, (ship_x, ship_y) = target_board.fleet[target_board.last_sunk]
+                    self.send_to_both({
+                        "type": "ship_sunk",
+                        "owner": 2 - seat,
+                        "ship": target_board.last_sunk,
+                        "size": size,
+                        "direction": direction,
+                        "position": [ship_x, ship_y]
+                    })
+
+                # Change turn if shot missed
+                if result == MISS:
+                    self.current_player = 1 - self.current_player
+                    self.send_to_both({"type": "turn_change", "current_player": self.current_player + 1})
+
+                # Game over check
+                if game_over:
+                    self.send_to_both({
+                        "type": "game_over",
+                        "winner": seat + 1
+                    })
+                    self.finished = True
+                    self.winner = seat
+                    if self.metrics:
+                        self.metrics.games_finished.inc()
+                    if self.journal:
+                        self.journal.room_closed(self.room_id, seat + 1)
+
+    @serialized
+    def player_left(self, seat):
+        """Mark a seat as away; the match goes on until the server gives up on it with abandon()"""
+        self.connected[seat] = False
+        if self.finished:
+            return
+
+        other = 1 - seat
+        if self.connected[other]:
+            self.send(other, {"type": "message", "content": f"⏳ Player {seat+1} lost connection, waiting for them..."})
+
+    @serialized
+    def resume(self, seat, seen=0):
+        """Give a returning seat its own board and the valid shots after the first `seen` it received
+
+        Big boards are sent as several "resumed" messages; the first carries
+        the match state and "more" counts the parts still to come.
+        """
+        self.connected[seat] = True
+        ships = [{"size": size, "direction": direction, "position": [x, y]}
+                 for size, direction, (x, y) in self.boards[seat].fleet]
+        shots = self.shots[max(0, seen if type(seen) is int else 0):]
+        parts = max(1, -(-len(ships) // RESUME_CHUNK), -(-len(shots) // RESUME_CHUNK))
+        for part in range(parts):
+            window = slice(part * RESUME_CHUNK, (part + 1) * RESUME_CHUNK)
+            message = {"type": "resumed", "ships": ships[window], "shots": shots[window], "more": parts - part - 1}
+            if part == 0:
+                message.update({
+                    "player_id": seat + 1,
+                    "rows": self.config.rows,
+                    "cols": self.config.cols,
+                    "game_started": self.game_started,
+                    "current_player": self.current_player + 1
+                })
+            self.send(seat, message)
+        if not self.ships_placed[seat]:
+            self.send(seat, self.place_ships_request())
+
+        other = 1 - seat
+        if self.connected[other]:
+            self.send(other, {"type": "message", "content": f"✅ Player {seat+1} is back!"})
+
+    @serialized
+    def abandon(self, seat):
+        """End the match for good because a seat did not come back"""
+        self.connected[seat] = False
+        if self.finished:
+            return
+        self.finished = True
+        self.winner = 1 - seat
+        if self.metrics:
+            self.metrics.games_abandoned.inc()
+        if self.journal:
+            self.journal.room_closed(self.room_id, None)
+
+        # Notify the other player
+        self.send_to_both({
+            "type": "player_disconnected",
+            "message": f"Player {seat+1} disconnected. Game over."
+        })
+
+    @serialized
+    def expire_turn(self, limit, now):
+        """Forfeit whoever the match has waited on for `limit` seconds
+
+        Before the game starts that is every seat still placing its fleet,
+        afterwards the seat whose turn it is, connected or not. Returns the
+        seconds left on the clock, or None once the match is over.
+        """
+        if self.finished:
+            return None
+        left = self.moved_at + limit - now
+        if left > 0:
+            return left
+        late = [self.current_player] if self.game_started else [seat for seat in range(2) if not self.ships_placed[seat]]
+        self.finished = True
+        if self.metrics:
+            self.metrics.turn_timeouts.inc()
+        if len(late) == 2:
+            if self.journal:
+                self.journal.room_closed(self.room_id, None)
+            self.send_to_both({
+                "type": "player_disconnected",
+                "message": "⏰ Neither player placed their ships in time. Game over."
+            })
+            return None
+
+        seat = late[0]
+        self.winner = 1 - seat
+        if self.journal:
+            self.journal.room_closed(self.room_id, self.winner + 1)
+        self.send_to_both({"type": "message", "content": f"⏰ Player {seat+1} ran out of time"})
+        self.send_to_both({"type": "game_over", "winner": self.winner + 1})
+        return None
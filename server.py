@@ -1,21 +1,110 @@
 import socket
-import json
 import threading
-from game_logic import Board
+import time
+from metrics import ServerMetrics, serve_http
+from protocol import HEARTBEAT_INTERVAL, IDLE_TIMEOUT, MAX_PLAYER_BACKLOG, FrameDecoder, encode_message, negotiate
+from room import RECONNECT_GRACE, TURN_TIMEOUT, GameRoom, new_token
+from spectators import SpectatorHub
+from timers import TimerWheel
+
+class SendQueue:
+    """Outgoing frames of one player socket, written by a thread of its own
+    
+    put() only appends, so the game never waits on a peer. The writer takes
+    everything queued since its last write and sends it with one sendall. A
+    peer that lets more than max_backlog bytes pile up is cut off: its socket
+    is shut down and its handler treats it like any other lost connection.
+    """
+    
+    def __init__(self, sock, name, max_backlog=MAX_PLAYER_BACKLOG, on_overflow=None):
+        self.sock = sock
+        self.name = name
+        self.max_backlog = max_backlog
+        self.on_overflow = on_overflow  # Called once if the peer falls too far behind
+        self.frames = []
+        self.size = 0  # Bytes queued or being sent
+        self.closed = False
+        self.ready = threading.Condition()
+        threading.Thread(target=self.write_loop, daemon=True).start()
+    
+    def put(self, frame):
+        """Queue a frame; False if the queue is closed or just overflowed"""
+        with self.ready:
+            if self.closed:
+                return False
+            self.frames.append(frame)
+            self.size += len(frame)
+            if self.size <= self.max_backlog:
+                self.ready.notify()
+                return True
+        print(f"🐢 Disconnecting {self.name}: {self.size} bytes behind")
+        if self.on_overflow:
+            self.on_overflow()
+        self.abort()
+        return False
+    
+    def write_loop(self):
+        while True:
+            with self.ready:
+                while not self.frames and not self.closed:
+                    self.ready.wait()
+                if self.closed:
+                    return
+                data = b''.join(self.frames)
+                self.frames = []
+            try:
+                self.sock.sendall(data)
+            except OSError:
+                self.abort()
+                return
+            with self.ready:
+                self.size -= len(data)
+    
+    def abort(self):
+        """Drop whatever is queued and shut the socket down so its reader wakes up"""
+        with self.ready:
+            self.closed = True
+            self.frames = []
+            self.ready.notify()
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
 
 class BattleshipServer:
-    def __init__(self, host='127.0.0.1', port=54321):
+    def __init__(self, host='127.0.0.1', port=54321, config=None, journal=None, grace=RECONNECT_GRACE,
+                 metrics_port=None, heartbeat=HEARTBEAT_INTERVAL, idle_timeout=IDLE_TIMEOUT, turn_timeout=TURN_TIMEOUT):
         self.host = host
         self.port = port
         self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.server_socket.bind((self.host, self.port))
-        self.server_socket.listen(2)
+        self.server_socket.listen(128)
         
         self.clients = [None, None]  # Socket for each player
-        self.boards = [Board(), Board()]  # Game board for each player
-        self.current_player = 0  # Current player (0 or 1)
-        self.game_started = False
-        self.ships_placed = [False, False]  # Track if players have placed ships
+        self.queues = [None, None]  # SendQueue for each player's socket
+        self.encodings = ['json', 'json']  # Negotiated encoding for each player
+        self.spectators = SpectatorHub(handoff=self.resume)  # Everyone who connects after the two players
+        self.journal = journal
+        self.metrics = ServerMetrics()
+        if metrics_port is not None:
+            serve_http(self.metrics.registry, self.host, metrics_port)
+        room_id = journal.next_room_id if journal else 0
+        self.room = GameRoom(room_id, self.send_to_client, config, self.spectators.publish, journal,
+                             self.metrics)  # Boards and turn state for the match
+        self.room.tokens = [new_token(), new_token()]
+        
+        # A dropped player keeps their seat for `grace` seconds
+        self.grace = grace
+        self.grace_timers = [None, None]
+        self.seat_lock = threading.Lock()  # Guards clients against a resume racing a disconnect
+        
+        # Heartbeats, turn clock and grace windows all run off one timer wheel thread
+        self.heartbeat = heartbeat  # Seconds of silence before a player is pinged
+        self.idle_timeout = idle_timeout  # Seconds of silence before a player is dropped; 0 never drops
+        self.turn_timeout = turn_timeout  # Seconds a player has for their move; 0 waits forever
+        self.last_heard = [0.0, 0.0]  # When each seat's connection last sent anything
+        self.wheel = TimerWheel()
+        self.wheel.start()
         
         print("🚀 Battleship Server is ready...")
     
@@ -24,9 +113,10 @@ class BattleshipServer:
         for i in range(2):
             client, addr = self.server_socket.accept()
             self.clients[i] = client
+            self.queues[i] = SendQueue(client, f"player {i+1}", on_overflow=self.metrics.slow_disconnects.inc)
             
-            # Send player number
-            self.send_to_client(i, {"type": "init", "player_id": i+1})
+            # Send player number and the token to resume with
+            self.send_to_client(i, {"type": "init", "player_id": i+1, "token": self.room.tokens[i]})
             
             print(f"🎮 Player {i+1} connected from {addr}")
             
@@ -36,121 +126,164 @@ class BattleshipServer:
             else:
                 self.send_to_client(i, {"type": "message", "content": "✅ You are Player 2! Game is ready to start..."})
                 self.send_to_client(0, {"type": "message", "content": "🎮 Player 2 has joined! Game is ready to start..."})
+            
+            # Read from the player straight away so the first one answers heartbeats while it waits
+            threading.Thread(target=self.handle_player, args=(i, client)).start()
         
         print("🎉 Both players connected! Game can begin.")
         
-        # Start receiving player messages in separate threads
-        threading.Thread(target=self.handle_player, args=(0,)).start()
-        threading.Thread(target=self.handle_player, args=(1,)).start()
-    
         # Send request to place ships
-        self.send_to_both({"type": "place_ships_request", "sizes": [3, 2]})
+        self.room.start()
+        self.watch_turn()
     
     def send_to_client(self, player_id, data):
-        """Send data to a client"""
-        try:
-            self.clients[player_id].send(json.dumps(data).encode())
-        except Exception as e:
-            print(f"Error sending to player {player_id+1}: {e}")
+        """Queue data for a client; its SendQueue writes it out"""
+        start = time.perf_counter()
+        queue = self.queues[player_id]
+        if queue and queue.put(encode_message(data, self.encodings[player_id])):
+            self.metrics.messages_sent.inc()
+        else:
+            self.metrics.send_failures.inc()
+        self.metrics.send_seconds.observe(time.perf_counter() - start)
     
-    def handle_player(self, player_id):
+    def handle_player(self, player_id, client, decoder=None, pending=()):
         """Handle messages from a player"""
-        client = self.clients[player_id]
+        decoder = decoder or FrameDecoder()
+        self.metrics.connections.inc()
+        self.metrics.connections_total.inc()
+        self.watch(player_id, client)
+        for message in pending:
+            self.process_message(player_id, message)
         
         while True:
             try:
-                data = client.recv(4096).decode()
+                data = client.recv(4096)
                 if not data:
                     break
+                self.last_heard[player_id] = time.monotonic()
                 
-                message = json.loads(data)
-                self.process_message(player_id, message)
+                for message in decoder.feed_messages(data):
+                    self.process_message(player_id, message)
                 
             except Exception as e:
                 print(f"Error receiving from player {player_id+1}: {e}")
                 break
         
-        print(f"Connection with player {player_id+1} lost")
-        self.clients[player_id] = None
+        self.metrics.connections.dec()
+        with self.seat_lock:
+            if self.clients[player_id] is not client:
+                return  # Already replaced by a resumed connection
+            print(f"Connection with player {player_id+1} lost")
+            self.clients[player_id] = None
+            self.queues[player_id].abort()
+            self.queues[player_id] = None
+            
+            # Notify the other player and hold the seat for a while
+            self.room.player_left(player_id)
+            self.grace_timers[player_id] = self.wheel.schedule(self.grace, self.expire, player_id)
+    
+    def watch(self, player_id, client):
+        """Start the heartbeat of a player's connection"""
+        self.last_heard[player_id] = time.monotonic()
+        if self.idle_timeout:
+            self.wheel.schedule(min(self.heartbeat, self.idle_timeout), self.check_idle, player_id, client)
+    
+    def check_idle(self, player_id, client):
+        """Ping a player that has gone quiet, and drop one that stopped answering"""
+        with self.seat_lock:
+            if self.clients[player_id] is not client:
+                return  # Gone, or replaced by a resumed connection with a heartbeat of its own
+            quiet = time.monotonic() - self.last_heard[player_id]
+            if quiet >= self.idle_timeout:
+                # Shutting the socket down wakes its handler, which then treats it as lost
+                print(f"💤 Disconnecting player {player_id+1}: silent for {quiet:.0f}s")
+                self.metrics.idle_disconnects.inc()
+                self.queues[player_id].abort()
+                return
+            if quiet >= self.heartbeat:
+                self.send_to_client(player_id, {"type": "ping"})
+                delay = min(self.heartbeat, self.idle_timeout - quiet)
+            else:
+                delay = min(self.heartbeat, self.idle_timeout) - quiet
+        self.wheel.schedule(delay, self.check_idle, player_id, client)
+    
+    def watch_turn(self, delay=None):
+        """Check the turn clock once the player it waits on could have run out of time"""
+        if self.turn_timeout:
+            self.wheel.schedule(delay or self.turn_timeout, self.check_turn)
+    
+    def check_turn(self):
+        left = self.room.expire_turn(self.turn_timeout, time.monotonic())
+        if left is not None:
+            self.watch_turn(left)
+    
+    def expire(self, player_id):
+        """The grace window ran out: end the match"""
+        with self.seat_lock:
+            if self.clients[player_id] is None:
+                self.room.abandon(player_id)
+    
+    def resume(self, client, hello, decoder, pending):
+        """Take over a connection whose hello carries a player's session token"""
+        token = hello.get("token")
+        with self.seat_lock:
+            if self.room.finished or token not in self.room.tokens:
+                return False
+            player_id = self.room.tokens.index(token)
+            old = self.clients[player_id]
+            if self.grace_timers[player_id]:
+                self.grace_timers[player_id].cancel()
+            if self.queues[player_id]:
+                self.queues[player_id].abort()
+            
+            client.setblocking(True)
+            self.clients[player_id] = client
+            self.queues[player_id] = SendQueue(client, f"player {player_id+1}",
+                                                on_overflow=self.metrics.slow_disconnects.inc)
+            self.process_message(player_id, hello)
+            self.room.resume(player_id, hello.get("seen", 0))
         
-        # Notify the other player
-        other_player = 1 - player_id
-        if self.clients[other_player]:
-            self.send_to_client(other_player, {
-                "type": "player_disconnected",
-                "message": f"Player {player_id+1} disconnected. Game over."
-            })
+        if old:
+            # Its handler thread sees it was replaced and exits quietly
+            try:
+                old.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            old.close()
+        print(f"🔌 Player {player_id+1} is back")
+        threading.Thread(target=self.handle_player, args=(player_id, client, decoder, pending)).start()
+        return True
     
     def process_message(self, player_id, message):
         """Process messages from players"""
-        msg_type = message.get("type", "")
-        
-        if msg_type == "place_ships":
-            # Handle ship placement
-            ships = message.get("ships", [])
-            success = True
-            for ship in ships:
-                size = ship.get("size")
-                direction = ship.get("direction")
-                x, y = ship.get("position")
-                if not self.boards[player_id].ship_installation(size, direction, (x, y)):
-                    success = False
-                    break
-            
-            if success:
-                self.ships_placed[player_id] = True
-                self.send_to_client(player_id, {"type": "ships_placed", "success": True})
-                
-                # Check if both players have placed ships to start the game
-                if all(self.ships_placed):
-                    self.game_started = True
-                    self.send_to_both({
-                        "type": "game_start", 
-                        "current_player": self.current_player + 1
-                    })
-            else:
-                self.send_to_client(player_id, {"type": "ships_placed", "success": False})
-        
-        elif msg_type == "shoot" and self.game_started:
-            # Handle shots
-            if player_id == self.current_player:  # Only process if it's this player's turn
-                x, y = message.get("position")
-                target_board = self.boards[1 - player_id]  # Opponent's board
-                
-                result = target_board.shoot(x, y)
-                
-                # Send result to both players
-                self.send_to_both({
-                    "type": "shoot_result",
-                    "shooter": player_id + 1,
-                    "position": [x, y],
-                    "result": "hit" if result is True else "miss" if result is False else "invalid",
-                    "game_over": target_board.all_ships_sunk() if result is not None else False
-                })
-                
-                # Change turn if shot missed
-                if result is False:
-                    self.current_player = 1 - self.current_player
-                    self.send_to_both({"type": "turn_change", "current_player": self.current_player + 1})
-                
-                # Game over check
-                if result is not None and target_board.all_ships_sunk():
-                    self.send_to_both({
-                        "type": "game_over",
-                        "winner": player_id + 1
-                    })
+        start = time.perf_counter()
+        msg_type = message.get("type")
+        self.metrics.received(msg_type)
+        if msg_type == "hello":
+            # Answer in the current encoding, then switch to the negotiated one
+            encoding = negotiate(message.get("encodings"))
+            self.send_to_client(player_id, {"type": "hello", "encoding": encoding})
+            self.encodings[player_id] = encoding
+        elif msg_type == "pong":
+            pass  # Reading it was the point
+        elif msg_type == "stats":
+            self.send_to_client(player_id, self.metrics.stats_message())
+        else:
+            self.room.process_message(player_id, message)
+        self.metrics.process_seconds.observe(time.perf_counter() - start)
     
     def send_to_both(self, data):
         """Send data to both players"""
-        for i in range(2):
-            if self.clients[i]:
-                self.send_to_client(i, data)
+        self.room.send_to_both(data)
     
     def run(self):
         """Main server execution"""
         try:
             print(f"Server started on {self.host}:{self.port}")
             self.accept_clients()
+            
+            # Later connections may watch the match
+            self.spectators.serve(self.server_socket)
         except KeyboardInterrupt:
             print("Server stopped by user")
         finally:
@@ -158,3 +291,5 @@ class BattleshipServer:
                 if client:
                     client.close()
             self.server_socket.close()
+            if self.journal:
+                self.journal.close()
@@ -0,0 +1,413 @@
+import argparse
+import asyncio
+import base64
+import functools
+import json
+import os
+import secrets
+import signal
+import socket
+import time
+from collections import deque
+from async_server import BOARD_CLASSES, MATCH_INTERVAL, AsyncBattleshipServer, PlayerConnection
+from journal import Journal
+from matchmaking import DEFAULT_RATING, MATCH_WINDOW, WIDEN_PER_SECOND, MatchQueue, Ratings
+from metrics import serve_http
+from protocol import HEARTBEAT_INTERVAL, IDLE_TIMEOUT, FrameDecoder
+from room import RECONNECT_GRACE, SHIP_SIZES, TOKEN_BYTES, TURN_TIMEOUT, RoomConfig
+
+MAX_CONTROL_MESSAGE = 64 * 1024
+MAX_WORKERS = 256  # The first byte of a session token names the worker that owns the seat
+
+
+def shard_token(worker):
+    """A session token that routes a reconnect back to the worker owning the seat"""
+    return f"{worker:02x}" + secrets.token_hex(TOKEN_BYTES - 1)
+
+
+def token_owner(token):
+    """Worker named by a session token, or None if it isn't one"""
+    try:
+        return int(token[:2], 16)
+    except (TypeError, ValueError):
+        return None
+
+
+class ControlChannel:
+    """JSON messages between the coordinator and a worker, each optionally carrying file descriptors
+
+    The channel is a non-blocking SOCK_SEQPACKET Unix socket, so every
+    message arrives whole and its descriptors travel with it. Messages the
+    socket can't take right away wait in a backlog until it is writable, so
+    neither end ever blocks on the other.
+    """
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.sock.setblocking(False)
+        self.backlog = deque()  # (data, fds) not sent yet
+        self.on_message = None
+
+    def listen(self, on_message):
+        """Call on_message(message, fds) for everything received, and with (None, []) once the other end is gone"""
+        self.on_message = on_message
+        asyncio.get_running_loop().add_reader(self.sock, self.readable)
+
+    def readable(self):
+        while True:
+            try:
+                data, fds, _, _ = socket.recv_fds(self.sock, MAX_CONTROL_MESSAGE, 1)
+            except BlockingIOError:
+                return
+            except OSError:
+                data, fds = b'', []
+            if not data:
+                self.close()
+                self.on_message(None, [])
+                return
+            self.on_message(json.loads(data), fds)
+
+    def send(self, message, fds=()):
+        """Send a message; the channel closes the fds once they are on their way"""
+        self.backlog.append((json.dumps(message).encode(), list(fds)))
+        if len(self.backlog) == 1:
+            self.flush()
+
+    def flush(self):
+        loop = asyncio.get_running_loop()
+        while self.backlog:
+            data, fds = self.backlog[0]
+            try:
+                socket.send_fds(self.sock, [data], fds)
+            except BlockingIOError:
+                loop.add_writer(self.sock, self.flush)
+                return
+            except OSError:
+                pass  # The other end is gone; its reader will notice
+            self.backlog.popleft()
+            for fd in fds:
+                os.close(fd)
+        loop.remove_writer(self.sock)
+
+    def close(self):
+        loop = asyncio.get_running_loop()
+        loop.remove_reader(self.sock)
+        loop.remove_writer(self.sock)
+        for _, fds in self.backlog:
+            for fd in fds:
+                os.close(fd)
+        self.backlog.clear()
+
+
+class CoordinatorRatings:
+    """A worker's view of the ratings the coordinator keeps
+
+    The coordinator sends the two players' ratings with every pairing, and
+    results go back to it to be recorded.
+    """
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.known = {}
+
+    def get(self, name):
+        return self.known.get(name, DEFAULT_RATING)
+
+    def record(self, winner, loser):
+        self.channel.send({"op": "result", "winner": winner, "loser": loser})
+
+    def save(self):
+        pass
+
+
+class ShardWorker(AsyncBattleshipServer):
+    """One process of a sharded server
+
+    Every worker listens on the same port with SO_REUSEPORT, so the kernel
+    spreads new connections across them. Waiting players are queued with
+    the coordinator, which pairs them across all workers: the first
+    player's worker owns the room, and the second player's socket is passed
+    to it. A reconnecting player whose token names another worker is passed
+    along the same way.
+    """
+
+    def __init__(self, worker, workers, channel, **kwargs):
+        super().__init__(reuse_port=True, ratings=CoordinatorRatings(channel), **kwargs)
+        self.worker = worker
+        self.workers = workers
+        self.channel = channel
+        self.waiting = {}  # token -> PlayerConnection queued with the coordinator
+        self.moving = {}  # PlayerConnection -> (adopt message, dup of its socket) until pass_on() sends them
+
+    def join(self, conn):
+        """Queue a new player with the coordinator"""
+        conn.token = shard_token(self.worker)
+        self.send_to_connection(conn, {"type": "message", "content": "🔎 Looking for an opponent..."})
+        self.enqueue(conn)
+
+    def enqueue(self, conn):
+        self.waiting[conn.token] = conn
+        self.channel.send({"op": "queue", "id": conn.token, "name": conn.name})
+
+    def leave(self, conn):
+        if self.waiting.get(conn.token) is conn:
+            del self.waiting[conn.token]
+            self.channel.send({"op": "leave", "id": conn.token})
+            return
+        super().leave(conn)
+
+    async def matchmaker(self):
+        """The coordinator does the matching"""
+
+    def welcome(self, conn, hello):
+        owner = token_owner(hello.get("token"))
+        if owner is not None and owner != self.worker and owner < self.workers:
+            if self.hand_off(conn, owner, {"kind": "resume", "hello": hello}):
+                return
+        super().welcome(conn, hello)
+
+    def hand_off(self, conn, worker, message):
+        """Start passing a player's socket to another worker; False if it can't move right now
+
+        Reading stops here and the stream is ended, so serve_connection
+        decodes what was already read into conn.unread; pass_on() then sends
+        those messages and any partial frame along with the socket.
+        """
+        self.flush(conn)
+        transport = conn.writer.transport
+        if transport.is_closing() or transport.get_write_buffer_size():
+            return False
+        transport.pause_reading()  # Whatever the player sends next is read by the new owner
+        conn.reader.feed_eof()
+        fd = os.dup(conn.writer.get_extra_info('socket').fileno())
+        message.update(op="adopt", to=worker, player={"encoding": conn.encoding, "name": conn.name})
+        self.moving[conn] = (message, fd)
+        conn.moved = True
+        return True
+
+    def pass_on(self, conn, decoder):
+        """Send a moved player's socket with everything read from it that we didn't process"""
+        message, fd = self.moving.pop(conn)
+        message.update(unread=conn.unread, data=base64.b64encode(decoder.buffer).decode())
+        if len(json.dumps(message)) > MAX_CONTROL_MESSAGE:
+            print(f"Dropping {conn.addr}: too much unread data to pass on")
+            os.close(fd)
+            for key in ("unread", "data", "hello"):
+                message.pop(key, None)
+            self.channel.send(message)  # Still tells the owner, so a waiting opponent is queued again
+            return
+        self.channel.send(message, [fd])
+
+    async def serve_connection(self, conn, decoder, messages=None):
+        await super().serve_connection(conn, decoder, messages)
+        if conn.moved:
+            self.pass_on(conn, decoder)
+
+    def on_control(self, message, fds):
+        if message is None:
+            print(f"💀 Worker {self.worker} lost its coordinator")
+            self.serve_task.cancel()
+            return
+        op = message["op"]
+        self.ratings.known.update(message.get("ratings", {}))
+        if op == "pair":
+            # Both players are ours
+            first = self.waiting.pop(message["first"], None)
+            second = self.waiting.pop(message["second"], None)
+            if first and second:
+                self.open_room(first, second)
+            else:
+                for conn in (first, second):
+                    if conn:
+                        self.enqueue(conn)
+        elif op == "send":
+            # Our player is the second of a room another worker owns
+            conn = self.waiting.pop(message["second"], None)
+            moved = conn is not None and self.hand_off(conn, message["to"], {"kind": "pair", "first": message["first"]})
+            if not moved:
+                if conn:
+                    self.enqueue(conn)
+                self.channel.send({"op": "adopt", "to": message["to"], "kind": "pair", "first": message["first"]})
+        elif op == "adopt":
+            if fds:
+                asyncio.create_task(self.adopt(message, socket.socket(fileno=fds[0])))
+            elif message.get("first") in self.waiting:
+                # The opponent was gone before it could be passed over
+                self.enqueue(self.waiting.pop(message["first"]))
+
+    async def adopt(self, message, sock):
+        """Serve a player whose socket another worker passed to us"""
+        reader, writer = await asyncio.open_connection(sock=sock)
+        conn = PlayerConnection(reader, writer)
+        conn.encoding = message["player"]["encoding"]
+        conn.name = message["player"]["name"]
+        messages = []
+        if message["kind"] == "resume":
+            messages.append(message["hello"])
+        else:
+            first = self.waiting.pop(message["first"], None)
+            if first is not None:
+                conn.token = shard_token(self.worker)
+                self.open_room(first, conn)
+            # Otherwise our player left while the opponent was on its way, and serve_connection queues the opponent
+        # Carry on exactly where the old owner stopped reading
+        decoder = FrameDecoder()
+        messages += message["unread"]
+        decoder.buffer += base64.b64decode(message["data"])  # Never a whole frame, only the start of one
+        await self.serve_connection(conn, decoder, messages)
+
+    async def serve(self):
+        self.serve_task = asyncio.current_task()
+        loop = asyncio.get_running_loop()
+        self.channel.listen(self.on_control)
+        loop.add_signal_handler(signal.SIGTERM, self.serve_task.cancel)  # The launcher stopping us
+        await super().serve()
+
+
+class Coordinator:
+    """Pairs the waiting players of every worker and relays sockets between workers"""
+
+    def __init__(self, channels, queue=None, ratings=None):
+        self.channels = channels  # worker -> ControlChannel
+        self.queue = queue or MatchQueue()  # Holds (worker, token) keys
+        self.ratings = ratings or Ratings()
+        self.names = {}  # (worker, token) -> player name
+
+    def on_message(self, worker, message, fds):
+        if message is None:
+            print(f"💀 Worker {worker} exited")
+            del self.channels[worker]
+            for key in [key for key in self.names if key[0] == worker]:
+                # Its players went with it; don't pair anyone with them
+                self.queue.remove(key)
+                del self.names[key]
+            return
+        op = message["op"]
+        if op == "queue":
+            key = (worker, message["id"])
+            self.names[key] = message["name"]
+            self.queue.add(key, self.ratings.get(message["name"]), time.monotonic())
+            self.match()
+        elif op == "leave":
+            key = (worker, message["id"])
+            if self.queue.remove(key):
+                del self.names[key]
+        elif op == "adopt":
+            target = self.channels.get(message["to"])
+            if target:
+                target.send(message, fds)
+            else:
+                for fd in fds:
+                    os.close(fd)
+        elif op == "result":
+            self.ratings.record(message["winner"], message["loser"])
+
+    def match(self):
+        for first, second in self.queue.pop_ready(time.monotonic()):
+            names = [self.names.pop(first), self.names.pop(second)]
+            ratings = {name: self.ratings.get(name) for name in names if name is not None}
+            (owner, first_id), (worker, second_id) = first, second
+            if owner == worker:
+                message = {"op": "pair", "first": first_id, "second": second_id, "ratings": ratings}
+            else:
+                message = {"op": "send", "second": second_id, "to": owner, "first": first_id, "ratings": ratings}
+            if worker in self.channels:
+                self.channels[worker].send(message)
+
+    async def run(self):
+        for worker, channel in self.channels.items():
+            channel.listen(functools.partial(self.on_message, worker))
+        while self.channels:
+            await asyncio.sleep(MATCH_INTERVAL)
+            self.match()
+
+
+def run_worker(worker, channel, args, config):
+    """Body of a forked worker process"""
+    journal = None
+    if args.journal:
+        journal = Journal(f"{args.journal}.{worker}", args.flush_interval, not args.no_fsync)
+    server = ShardWorker(worker, args.workers, channel, host=args.host, port=args.port, config=config,
+                         journal=journal, grace=args.grace, heartbeat=args.heartbeat, idle_timeout=args.idle_timeout,
+                         turn_timeout=args.turn_timeout)
+    if args.metrics_port is not None:
+        serve_http(server.metrics.registry, args.host, args.metrics_port + worker)
+    if args.recover:
+        server.recover()
+    try:
+        server.run()
+    except asyncio.CancelledError:
+        pass
+
+
+def launch(args, config):
+    """Fork the workers, then coordinate them from this process"""
+    channels = {}
+    pids = []
+    for worker in range(args.workers):
+        ours, theirs = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        pid = os.fork()
+        if pid == 0:
+            ours.close()
+            for channel in channels.values():
+                channel.sock.close()
+            run_worker(worker, ControlChannel(theirs), args, config)
+            os._exit(0)
+        theirs.close()
+        channels[worker] = ControlChannel(ours)
+        pids.append(pid)
+
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    print(f"🧩 {args.workers} workers sharing port {args.port}")
+    coordinator = Coordinator(channels, MatchQueue(args.match_window, args.widen), Ratings(args.ratings))
+    try:
+        asyncio.run(coordinator.run())
+    except KeyboardInterrupt:
+        print("Server stopped by user")
+    finally:
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in pids:
+            os.waitpid(pid, 0)
+        coordinator.ratings.save()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Battleship server sharded over worker processes")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--host", default='127.0.0.1')
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--rows", type=int, default=6)
+    parser.add_argument("--cols", type=int, default=8)
+    parser.add_argument("--fleet", type=lambda s: [int(size) for size in s.split(',')], default=SHIP_SIZES,
+                        help="comma-separated ship sizes")
+    parser.add_argument("--board", choices=BOARD_CLASSES, default='list',
+                        help="board backend; bitboard is for small boards only, its shots cost O(cells)")
+    parser.add_argument("--journal", help="journal path prefix; each worker appends to PATH.<worker>")
+    parser.add_argument("--flush-interval", type=float, default=0.05,
+                        help="seconds between journal writes; 0 syncs every record")
+    parser.add_argument("--no-fsync", action='store_true', help="leave journal durability to the OS")
+    parser.add_argument("--recover", action='store_true', help="restore unfinished rooms from the journals")
+    parser.add_argument("--grace", type=float, default=RECONNECT_GRACE,
+                        help="seconds a dropped player has to reconnect")
+    parser.add_argument("--heartbeat", type=float, default=HEARTBEAT_INTERVAL,
+                        help="seconds of silence before a player is pinged")
+    parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT,
+                        help="seconds of silence before a player is disconnected; 0 never disconnects")
+    parser.add_argument("--turn-timeout", type=float, default=TURN_TIMEOUT,
+                        help="seconds a player has to place their ships or shoot before forfeiting; 0 waits forever")
+    parser.add_argument("--ratings", help="JSON file to load and save Elo ratings, keyed by the unverified hello name")
+    parser.add_argument("--match-window", type=float, default=MATCH_WINDOW,
+                        help="rating gap two players are paired at straight away")
+    parser.add_argument("--widen", type=float, default=WIDEN_PER_SECOND,
+                        help="rating points the window grows per second of waiting")
+    parser.add_argument("--metrics-port", type=int, help="first port for per-worker Prometheus metrics")
+    args = parser.parse_args()
+    if not 1 <= args.workers <= MAX_WORKERS:
+        parser.error(f"--workers must be between 1 and {MAX_WORKERS}")
+    if args.recover and not args.journal:
+        parser.error("--recover needs --journal")
+    launch(args, RoomConfig(args.rows, args.cols, args.fleet, BOARD_CLASSES[args.board]))
@@ -0,0 +1,363 @@
+import argparse
+import array
+import bisect
+import hashlib
+import mmap
+import os
+import struct
+import time
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from room import SHIP_SIZES
+
+EXACT_LIMIT = 12  # Solve exactly once this few fleet layouts remain; each +2 costs about 4x the time
+TABLE_SIZE = 1 << 20  # Solved states the transposition table keeps before dropping the least recently used
+MISSED = -1  # Outcome of a shot that found water; 0 is a hit, a ship mask is that ship sunk
+
+# Policy file: header, fleet sizes, padding to 8 bytes, sorted uint64 state hashes, one cell per hash
+HEADER = struct.Struct('<4sHHBI')  # magic, rows, cols, ships in the fleet, states
+MAGIC = b'BSP1'
+
+
+def placements(rows, cols, size):
+    """Bitmask of every in-bounds placement of one ship, bit x * cols + y per cell"""
+    masks = set()
+    for x in range(rows):
+        for y in range(cols):
+            for direction in 'hv':
+                mask = ship_mask(rows, cols, size, direction, x, y)
+                if mask:
+                    masks.add(mask)
+    return sorted(masks)
+
+
+def ship_mask(rows, cols, size, direction, x, y):
+    """Cells of one ship, or 0 if it doesn't fit"""
+    if direction == 'h' and y + size > cols or direction == 'v' and x + size > rows:
+        return 0
+    step = 1 if direction == 'h' else cols
+    start = x * cols + y
+    mask = 0
+    for index in range(start, start + size * step, step):
+        mask |= 1 << index
+    return mask
+
+
+def fleet_layouts(rows, cols, fleet):
+    """Every legal fleet as (all ship cells, ship masks); ships of one size are interchangeable"""
+    sizes = sorted(fleet, reverse=True)
+    options = {size: placements(rows, cols, size) for size in set(sizes)}
+    layouts = []
+    ships = []
+
+    def extend(i, used):
+        if i == len(sizes):
+            layouts.append((used, tuple(ships)))
+            return
+        same = i and sizes[i - 1] == sizes[i]
+        for mask in options[sizes[i]]:
+            if mask & used or same and mask <= ships[-1]:
+                continue
+            ships.append(mask)
+            extend(i + 1, used | mask)
+            ships.pop()
+
+    extend(0, 0)
+    return layouts
+
+
+def cells_of(mask):
+    """Yield the index of every set bit"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class Symmetry:
+    """Board flips (and transposes on square boards) used to share one solution between mirrored states"""
+
+    def __init__(self, rows, cols):
+        moves = [lambda x, y: (x, y), lambda x, y: (rows - 1 - x, y),
+                 lambda x, y: (x, cols - 1 - y), lambda x, y: (rows - 1 - x, cols - 1 - y)]
+        if rows == cols:
+            moves += [lambda x, y, move=move: move(y, x) for move in moves]
+        cells = rows * cols
+        self.forward = []  # transform -> cell -> transformed cell
+        self.inverse = []
+        self.bytes = []  # transform -> byte position -> byte value -> transformed mask
+        for move in moves:
+            forward = [move(*divmod(cell, cols)) for cell in range(cells)]
+            forward = [x * cols + y for x, y in forward]
+            inverse = [0] * cells
+            for cell, moved in enumerate(forward):
+                inverse[moved] = cell
+            self.forward.append(forward)
+            self.inverse.append(inverse)
+            tables = []
+            for base in range(0, cells, 8):
+                table = [0] * 256
+                for value in range(1, 256):
+                    low = value & -value
+                    cell = base + low.bit_length() - 1
+                    table[value] = table[value ^ low] | (1 << forward[cell] if cell < cells else 0)
+                tables.append(table)
+            self.bytes.append(tables)
+        self.key_bytes = (cells + 7) // 8
+
+    def apply(self, transform, mask):
+        moved = 0
+        for table in self.bytes[transform]:
+            moved |= table[mask & 255]
+            mask >>= 8
+        return moved
+
+    def canonical(self, misses, hits, sunk):
+        """(smallest mirror image of a seen state, transform that produced it)"""
+        best = None
+        for transform in range(len(self.bytes)):
+            apply = self.apply
+            key = (apply(transform, misses), apply(transform, hits),
+                   tuple(sorted(apply(transform, ship) for ship in sunk)))
+            if best is None or key < best:
+                best, chosen = key, transform
+        return best, chosen
+
+    def key_hash(self, key):
+        """64-bit hash of a canonical state, as stored in policy files"""
+        misses, hits, sunk = key
+        data = b''.join(mask.to_bytes(self.key_bytes, 'little') for mask in (misses, hits, *sunk))
+        return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+class TranspositionTable:
+    """Solved states, keeping at most maxsize by dropping the least recently used"""
+
+    def __init__(self, maxsize=TABLE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        self.entries[key] = entry
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+
+class Solver:
+    """Picks shots to minimise the expected number needed to sink a uniformly random fleet
+
+    The shooter sees misses, hits and every ship sunk (a sinking reveals the
+    whole ship), but what is left to play only depends on which fleet
+    layouts are still possible and which of their cells were hit, so states
+    are solved and cached by that. Once at most exact_limit layouts remain,
+    every useful cell is tried and the one with the lowest expected shots
+    wins, so the whole endgame is optimal; above that the densest cell is
+    taken, as the heatmap bot does. A cell every layout covers is fired
+    first: it must be hit anyway and can only add information. Mirror
+    images of a state share one table entry.
+    """
+
+    def __init__(self, rows=6, cols=8, fleet=SHIP_SIZES, exact_limit=EXACT_LIMIT, table_size=TABLE_SIZE):
+        self.rows = rows
+        self.cols = cols
+        self.fleet = list(fleet)
+        self.exact_limit = exact_limit
+        self.layouts = fleet_layouts(rows, cols, fleet)
+        self.unions = [union for union, _ in self.layouts]
+        self.ship_cells = sum(fleet)
+        self.symmetry = Symmetry(rows, cols)
+        self.table = TranspositionTable(table_size)
+        index = {frozenset(ships): i for i, (_, ships) in enumerate(self.layouts)}
+        apply = self.symmetry.apply
+        self.mirrors = [[index[frozenset(apply(transform, ship) for ship in ships)] for _, ships in self.layouts]
+                        for transform in range(len(self.symmetry.forward))]  # transform -> layout -> mirrored layout
+
+    def canonical(self, layouts, hits):
+        """(smallest mirror image of a state, transform that produced it)"""
+        best = None
+        for transform, mirror in enumerate(self.mirrors):
+            key = (self.symmetry.apply(transform, hits), tuple(sorted(mirror[i] for i in layouts)))
+            if best is None or key < best:
+                best, chosen = key, transform
+        return best, chosen
+
+    def solve(self, layouts, hits):
+        """(expected shots to sink everything, cell to fire at) given the possible layouts and the hits"""
+        remaining = self.ship_cells - hits.bit_count()
+        if not remaining:
+            return 0, None
+        if len(layouts) == 1:
+            return remaining, next(cells_of(self.unions[layouts[0]] & ~hits))
+        symmetry = self.symmetry
+        key, transform = self.canonical(layouts, hits)
+        entry = self.table.get(key)
+        if entry is not None:
+            return entry[0], symmetry.inverse[transform][entry[1]]
+
+        n = len(layouts)
+        counts = self.counts(layouts, hits)
+        ranked = sorted(counts, key=lambda cell: (-counts[cell], cell))
+        if counts[ranked[0]] == n or n > self.exact_limit:
+            ranked = ranked[:1]
+        best, choice = float('inf'), None
+        for cell in ranked:
+            # Every ship cell left still costs a shot, and a miss costs one more
+            if remaining + 1 - counts[cell] / n >= best:
+                break
+            bit = 1 << cell
+            parts = [(part, hits if outcome == MISSED else hits | bit)
+                     for outcome, part in self.split(layouts, hits, cell).items()]
+            bounds = [len(part) * self.bound(part, part_hits) for part, part_hits in parts]
+            total = n + sum(bounds)  # n times the expected shots, exact for the parts solved so far
+            if total >= best * n:
+                continue
+            for (part, part_hits), low in zip(parts, bounds):
+                total += len(part) * self.solve(part, part_hits)[0] - low
+                if total >= best * n:
+                    break
+            else:
+                best, choice = total / n, cell
+        self.table.put(key, (best, symmetry.forward[transform][choice]))
+        return best, choice
+
+    def counts(self, layouts, hits):
+        """Unhit cell -> layouts with a ship there"""
+        counts = Counter()
+        unions = self.unions
+        for i in layouts:
+            counts.update(cells_of(unions[i] & ~hits))
+        return counts
+
+    def bound(self, layouts, hits):
+        """Lower bound on the expected shots: every ship cell left, plus the chance the next shot misses"""
+        remaining = self.ship_cells - hits.bit_count()
+        if len(layouts) == 1 or not remaining:
+            return remaining
+        return remaining + 1 - max(self.counts(layouts, hits).values()) / len(layouts)
+
+    def split(self, layouts, hits, cell):
+        """Outcome of firing at a cell -> the layouts giving it: MISSED, 0 for a hit, or the ship sunk"""
+        bit = 1 << cell
+        parts = {}
+        for i in layouts:
+            if not self.unions[i] & bit:
+                outcome = MISSED
+            else:
+                ship = next(ship for ship in self.layouts[i][1] if ship & bit)
+                outcome = ship if ship & ~hits == bit else 0
+            parts.setdefault(outcome, []).append(i)
+        return {outcome: tuple(part) for outcome, part in parts.items()}
+
+    def policy(self):
+        """Canonical seen state -> cell (in the canonical frame) for every state the policy can reach"""
+        symmetry = self.symmetry
+        entries = {}
+        stack = [(tuple(range(len(self.layouts))), 0, 0, ())]
+        while stack:
+            layouts, misses, hits, sunk = stack.pop()
+            _, cell = self.solve(layouts, hits)
+            if cell is None:
+                continue
+            key, transform = symmetry.canonical(misses, hits, sunk)
+            if key in entries:
+                continue
+            entries[key] = symmetry.forward[transform][cell]
+            bit = 1 << cell
+            for outcome, part in self.split(layouts, hits, cell).items():
+                if outcome == MISSED:
+                    stack.append((part, misses | bit, hits, sunk))
+                else:
+                    stack.append((part, misses, hits | bit, sunk + (outcome,) if outcome else sunk))
+        return entries
+
+    def save(self, path, entries):
+        """Write a policy as sorted state hashes and their cells for PolicyTable to map"""
+        hashed = sorted((self.symmetry.key_hash(key), cell) for key, cell in entries.items())
+        hashes = array.array('Q', [h for h, _ in hashed])
+        if len(set(hashes)) != len(hashes):
+            raise ValueError("state hash collision")
+        header = HEADER.pack(MAGIC, self.rows, self.cols, len(self.fleet), len(hashes)) + bytes(self.fleet)
+        with open(path, 'wb') as f:
+            f.write(header + bytes(-len(header) % 8))
+            f.write(hashes.tobytes())
+            f.write(bytes(cell for _, cell in hashed))
+
+
+class PolicyTable:
+    """A solved policy file, memory-mapped; a lookup is a binary search with no solving"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.rows, self.cols, ships, count = HEADER.unpack_from(self.mapped)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a policy file")
+        self.fleet = sorted(self.mapped[HEADER.size:HEADER.size + ships], reverse=True)
+        start = HEADER.size + ships
+        start += -start % 8
+        view = memoryview(self.mapped)
+        self.hashes = view[start:start + 8 * count].cast('Q')
+        self.cells = view[start + 8 * count:start + 9 * count]
+        self.symmetry = Symmetry(self.rows, self.cols)
+
+    def matches(self, rows, cols, fleet):
+        return (rows, cols, sorted(fleet, reverse=True)) == (self.rows, self.cols, self.fleet)
+
+    def lookup(self, misses, hits, sunk):
+        """Cell index to fire at in this state, or None if the policy never reaches it"""
+        key, transform = self.symmetry.canonical(misses, hits, sunk)
+        h = self.symmetry.key_hash(key)
+        i = bisect.bisect_left(self.hashes, h)
+        if i == len(self.hashes) or self.hashes[i] != h:
+            return None
+        return self.symmetry.inverse[transform][self.cells[i]]
+
+
+def policy_path(rows, cols, fleet):
+    """Where solver.py saves, and bots look for, the policy of a board and fleet"""
+    sizes = '-'.join(map(str, sorted(fleet, reverse=True)))
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), f"policy_{rows}x{cols}_{sizes}.bin")
+
+
+@lru_cache(maxsize=None)
+def load_policy(rows, cols, fleet):
+    """The saved policy for a board and fleet (a tuple), or None if it hasn't been solved"""
+    try:
+        return PolicyTable(policy_path(rows, cols, fleet))
+    except FileNotFoundError:
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solve the shooting policy for a small board and save it")
+    parser.add_argument("--rows", type=int, default=6)
+    parser.add_argument("--cols", type=int, default=8)
+    parser.add_argument("--fleet", type=lambda s: [int(size) for size in s.split(',')], default=SHIP_SIZES)
+    parser.add_argument("--exact-limit", type=int, default=EXACT_LIMIT,
+                        help="solve exactly once this few fleet layouts remain")
+    parser.add_argument("--table-size", type=int, default=TABLE_SIZE, help="transposition table entries")
+    parser.add_argument("-o", "--output", help="policy file (default: the one bots look for)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    solver = Solver(args.rows, args.cols, args.fleet, args.exact_limit, args.table_size)
+    print(f"🧮 {len(solver.layouts):,} fleet layouts on {args.rows}x{args.cols} for {args.fleet}")
+    value, _ = solver.solve(tuple(range(len(solver.layouts))), 0)
+    entries = solver.policy()
+    output = args.output or policy_path(args.rows, args.cols, args.fleet)
+    solver.save(output, entries)
+    table = solver.table
+    print(f"🎯 {value:.4f} expected shots to sink a random fleet")
+    print(f"💾 {len(entries):,} states saved to {output} in {time.perf_counter() - start:.1f}s "
+          f"(table {len(table.entries):,} entries, {table.hits:,} hits, {table.evictions:,} evictions)")
@@ -0,0 +1,237 @@
+import selectors
+import socket
+from collections import deque
+from protocol import FrameDecoder, ProtocolError, encode_message, negotiate
+
+SNAPSHOT_CHUNK = 2000  # Shots per snapshot frame, keeps every frame well under MAX_FRAME_SIZE
+MAX_SPECTATOR_BACKLOG = 1024 * 1024  # Unsent bytes before a spectator is dropped
+
+
+class MatchView:
+    """What a spectator may see of a match, rebuilt from the room's broadcasts
+
+    Ships stay hidden: only shots, sunk ships and the turn are tracked, so
+    the view grows with the number of shots and not with the board size.
+    """
+
+    def __init__(self):
+        self.rows = self.cols = None
+        self.sizes = []
+        self.game_started = False
+        self.current_player = None
+        self.winner = None
+        self.finished = False
+        self.shots = []  # [shooter, x, y, hit] for every valid shot
+        self.sunk = []  # [owner, ship, size, direction, x, y]
+
+    def apply(self, message):
+        """Fold one broadcast message into the view"""
+        msg_type = message.get("type")
+        if msg_type == "place_ships_request":
+            self.rows, self.cols, self.sizes = message["rows"], message["cols"], message["sizes"]
+        elif msg_type == "game_start":
+            self.game_started = True
+            self.current_player = message["current_player"]
+        elif msg_type == "shoot_result":
+            if message["result"] != "invalid":
+                x, y = message["position"]
+                self.shots.append([message["shooter"], x, y, int(message["result"] == "hit")])
+        elif msg_type == "ship_sunk":
+            x, y = message["position"]
+            self.sunk.append([message["owner"], message["ship"], message["size"], message["direction"], x, y])
+        elif msg_type == "turn_change":
+            self.current_player = message["current_player"]
+        elif msg_type == "game_over":
+            self.winner = message["winner"]
+            self.finished = True
+        elif msg_type == "player_disconnected":
+            self.finished = True
+
+    def snapshot(self):
+        """The current view as one or more "snapshot" messages; "more" counts the parts still to come"""
+        parts = max(1, -(-len(self.shots) // SNAPSHOT_CHUNK), -(-len(self.sunk) // SNAPSHOT_CHUNK))
+        messages = []
+        for part in range(parts):
+            window = slice(part * SNAPSHOT_CHUNK, (part + 1) * SNAPSHOT_CHUNK)
+            messages.append({"type": "snapshot", "shots": self.shots[window], "sunk": self.sunk[window],
+                             "more": parts - part - 1})
+        messages[0].update({
+            "rows": self.rows,
+            "cols": self.cols,
+            "sizes": self.sizes,
+            "game_started": self.game_started,
+            "current_player": self.current_player,
+            "winner": self.winner,
+            "finished": self.finished
+        })
+        return messages
+
+
+class Spectator:
+    """One spectator socket with its unsent bytes"""
+
+    def __init__(self, sock, addr):
+        self.sock = sock
+        self.addr = addr
+        self.decoder = FrameDecoder()
+        self.encoding = 'json'
+        self.subscribed = False
+        self.buffer = bytearray()
+        self.events = selectors.EVENT_READ
+
+
+class SpectatorHub:
+    """Accepts spectators and fans a match's broadcasts out to them from one thread
+
+    publish() only queues the message and wakes the hub, so the game threads
+    never wait on a spectator. The hub encodes each message once per encoding
+    and writes with non-blocking sends; a spectator whose backlog grows past
+    MAX_SPECTATOR_BACKLOG is dropped instead of slowing everyone else down.
+    """
+
+    def __init__(self, max_backlog=MAX_SPECTATOR_BACKLOG, handoff=None):
+        self.max_backlog = max_backlog
+        self.handoff = handoff  # handoff(sock, hello, decoder, pending) may claim a connection resuming a seat
+        self.view = MatchView()
+        self.spectators = set()
+        self.queue = deque()  # Messages published by the game, applied by the hub thread
+        self.selector = selectors.DefaultSelector()
+        self.wake_reader, self.wake_writer = socket.socketpair()
+        self.wake_reader.setblocking(False)
+        self.wake_writer.setblocking(False)
+        self.selector.register(self.wake_reader, selectors.EVENT_READ)
+
+    def publish(self, message):
+        """Queue a broadcast for the spectators; safe to call from any thread"""
+        self.queue.append(message)
+        try:
+            self.wake_writer.send(b'\0')
+        except BlockingIOError:
+            pass  # The hub has plenty of wake-ups pending already
+
+    def serve(self, server_socket):
+        """Accept spectators on a listening socket and serve them forever"""
+        server_socket.setblocking(False)
+        self.selector.register(server_socket, selectors.EVENT_READ)
+        while True:
+            for key, events in self.selector.select():
+                if key.fileobj is server_socket:
+                    self.accept(server_socket)
+                elif key.fileobj is self.wake_reader:
+                    self.drain_wakeups()
+                elif key.data in self.spectators:  # Skip spectators dropped earlier in this batch
+                    spectator = key.data
+                    if events & selectors.EVENT_READ:
+                        self.read(spectator)
+                    if events & selectors.EVENT_WRITE and spectator in self.spectators:
+                        self.flush(spectator)
+            self.fan_out()
+
+    def accept(self, server_socket):
+        try:
+            sock, addr = server_socket.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        spectator = Spectator(sock, addr)
+        self.spectators.add(spectator)
+        self.selector.register(sock, spectator.events, spectator)
+        print(f"👀 Spectator connected from {addr}")
+
+    def drain_wakeups(self):
+        try:
+            while self.wake_reader.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def read(self, spectator):
+        """Handle hello and spectate requests"""
+        try:
+            data = spectator.sock.recv(4096)
+            if not data:
+                raise ConnectionError("closed by peer")
+            messages = spectator.decoder.feed_messages(data)
+        except (OSError, ProtocolError):
+            self.drop(spectator)
+            return
+
+        try:
+            for i, message in enumerate(messages):
+                if message.get("type") == "hello" and message.get("token") and self.handoff and not spectator.buffer:
+                    # A player coming back: hand the socket over as it is
+                    self.spectators.discard(spectator)
+                    self.selector.unregister(spectator.sock)
+                    try:
+                        claimed = self.handoff(spectator.sock, message, spectator.decoder, messages[i + 1:])
+                    except Exception as e:
+                        # Only this connection goes; the hub keeps serving everyone else
+                        print(f"Error resuming {spectator.addr}: {e}")
+                        spectator.sock.close()
+                        return
+                    if claimed:
+                        return
+                    self.spectators.add(spectator)
+                    self.selector.register(spectator.sock, spectator.events, spectator)
+                    self.send(spectator, {"type": "message", "content": "⌛ Session expired"})
+                if message.get("type") == "hello":
+                    encoding = negotiate(message.get("encodings"))
+                    self.send(spectator, {"type": "hello", "encoding": encoding})
+                    spectator.encoding = encoding
+                elif message.get("type") == "spectate" and not spectator.subscribed:
+                    spectator.subscribed = True
+                    for part in self.view.snapshot():
+                        self.send(spectator, part)
+        except Exception as e:
+            # A bad request costs only this spectator, like a failed handoff
+            print(f"Error from spectator {spectator.addr}: {e}")
+            self.drop(spectator)
+            return
+        if spectator in self.spectators:
+            self.flush(spectator)
+
+    def send(self, spectator, message):
+        spectator.buffer += encode_message(message, spectator.encoding)
+
+    def fan_out(self):
+        """Apply queued broadcasts to the view and append them to every subscriber's buffer"""
+        if not self.queue:
+            return
+        frames = {spectator.encoding: [] for spectator in self.spectators if spectator.subscribed}
+        while self.queue:
+            message = self.queue.popleft()
+            self.view.apply(message)
+            for encoding, encoded in frames.items():
+                encoded.append(encode_message(message, encoding))
+        frames = {encoding: b''.join(encoded) for encoding, encoded in frames.items()}
+        for spectator in list(self.spectators):
+            if spectator.subscribed:
+                spectator.buffer += frames[spectator.encoding]
+                self.flush(spectator)
+
+    def flush(self, spectator):
+        """Write as much as the socket takes without blocking"""
+        try:
+            if spectator.buffer:
+                sent = spectator.sock.send(spectator.buffer)
+                del spectator.buffer[:sent]
+        except BlockingIOError:
+            pass
+        except OSError:
+            self.drop(spectator)
+            return
+
+        if len(spectator.buffer) > self.max_backlog:
+            print(f"🐢 Dropping spectator {spectator.addr}: {len(spectator.buffer)} bytes behind")
+            self.drop(spectator)
+            return
+
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if spectator.buffer else 0)
+        if events != spectator.events:
+            spectator.events = events
+            self.selector.modify(spectator.sock, events, spectator)
+
+    def drop(self, spectator):
+        self.spectators.discard(spectator)
+        self.selector.unregister(spectator.sock)
+        spectator.sock.close()
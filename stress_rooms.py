@@ -0,0 +1,171 @@
+import argparse
+import contextlib
+import random
+import sys
+import threading
+import time
+from fleet import random_fleet
+from room import RESULT_NAMES, GameRoom, RoomConfig
+from workers import RoomPool
+
+
+class Seat:
+    """One scripted player: places its fleet, then fires through a shuffled list of every cell"""
+
+    def __init__(self, room, seat, ships, targets):
+        self.room = room
+        self.seat = seat
+        self.ships = ships
+        self.targets = targets
+        self.received = []  # Everything the room sent to this seat
+        self.placed = False
+        self.fired = 0  # Results of our own shots, including invalid ones
+        self.busy = threading.Event()  # Set while a command of ours is waiting to be applied
+
+    def receive(self, message):
+        self.received.append(message)
+        if message["type"] == "ships_placed":
+            self.placed = True
+        elif message["type"] == "shoot_result" and message["shooter"] == self.seat + 1:
+            self.fired += 1
+
+    def next_command(self):
+        if not self.placed:
+            return {"type": "place_ships", "ships": self.ships}
+        x, y = self.targets[self.fired % len(self.targets)]
+        return {"type": "shoot", "position": [x, y]}
+
+    def apply(self, message):
+        try:
+            self.room.process_message(self.seat, message)
+        finally:
+            self.busy.clear()
+
+
+def make_rooms(count, config, rng, locked=True):
+    rooms, seats = [], []
+    for room_id in range(count):
+        pair = []
+        room = GameRoom(room_id, lambda seat, data, pair=pair: pair[seat].receive(data), config)
+        if not locked:
+            room.lock = contextlib.nullcontext()
+        for seat in range(2):
+            targets = [(x, y) for x in range(config.rows) for y in range(config.cols)]
+            rng.shuffle(targets)
+            pair.append(Seat(room, seat, random_fleet(config.rows, config.cols, config.fleet, rng), targets))
+        room.start()
+        rooms.append(room)
+        seats.extend(pair)
+    return rooms, seats
+
+
+def drive(seats, submit, done):
+    """Keep every seat of this thread firing until its room is over"""
+    while not done.is_set():
+        active = submitted = False
+        for seat in seats:
+            if seat.room.finished:
+                continue
+            active = True
+            if not seat.busy.is_set():
+                seat.busy.set()
+                submit(seat, seat.next_command())
+                submitted = True
+        if not active:
+            return
+        if not submitted:
+            time.sleep(0.0001)  # Everything is queued already; let the workers run
+
+
+def check(room, pair):
+    """Problems with a finished room, judged by replaying its shots on fresh boards"""
+    problems = []
+    for seat in pair:
+        starts = sum(m["type"] == "game_start" for m in seat.received)
+        if starts != 1:
+            problems.append(f"seat {seat.seat + 1} saw {starts} game_start")
+    if not room.finished:
+        problems.append("not finished")
+
+    boards = []
+    for seat in pair:
+        board = room.config.new_board()
+        for ship in seat.ships:
+            board.place(ship["size"], ship["direction"], *ship["position"])
+        boards.append(board)
+    turn = 1
+    for shooter, x, y, result in room.shots:
+        if shooter != turn:
+            problems.append(f"player {shooter} fired on player {turn}'s turn")
+            break
+        replayed = RESULT_NAMES.get(boards[2 - shooter].fire(x, y), "invalid")
+        if replayed != result:
+            problems.append(f"shot {x},{y} was {result}, replays as {replayed}")
+            break
+        if result == "miss":
+            turn = 3 - turn
+    for seat in pair:
+        # Each seat must be able to follow the game from its own messages, in the order they arrived
+        seen, turn = [], None
+        for m in seat.received:
+            if m["type"] in ("game_start", "turn_change"):
+                turn = m["current_player"]
+            elif m["type"] == "shoot_result" and m["result"] != "invalid":
+                if m["shooter"] != turn:
+                    problems.append(f"seat {seat.seat + 1} got player {m['shooter']}'s shot during player {turn}'s turn")
+                    break
+                seen.append([m["shooter"], *m["position"], m["result"]])
+        else:
+            if seen != room.shots:
+                problems.append(f"seat {seat.seat + 1} saw a different shot sequence")
+    return problems
+
+
+def run(rooms_count, threads, mode, config, seed, locked=True):
+    rng = random.Random(seed)
+    rooms, seats = make_rooms(rooms_count, config, rng, locked)
+    pool = RoomPool(threads) if mode == 'pool' else None
+    if pool:
+        submit = lambda seat, message: pool.submit(seat.room, seat.apply, message)
+    else:
+        submit = lambda seat, message: seat.apply(message)
+
+    done = threading.Event()
+    # Deal seats out so the two seats of a room are always driven by different threads
+    drivers = [threading.Thread(target=drive, args=(seats[i::threads], submit, done)) for i in range(threads)]
+    start = time.perf_counter()
+    for thread in drivers:
+        thread.start()
+    for thread in drivers:
+        thread.join()
+    if pool:
+        pool.shutdown()
+    elapsed = time.perf_counter() - start
+
+    shots = sum(len(room.shots) for room in rooms)
+    failures = {room.room_id: problems for room, pair in zip(rooms, zip(seats[::2], seats[1::2]))
+                if (problems := check(room, pair))}
+    return rooms_count / elapsed, shots / elapsed, failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hammer many rooms from many threads and check every game")
+    parser.add_argument("--rooms", type=int, default=500)
+    parser.add_argument("--threads", type=lambda s: [int(n) for n in s.split(',')], default=[2, 4, 8],
+                        help="comma-separated thread counts to try")
+    parser.add_argument("--mode", choices=['direct', 'pool'], default='direct',
+                        help="drivers call rooms themselves, or hand commands to a RoomPool of the same size")
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--cols", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-lock", action='store_true', help="disable the room lock to see what the checks catch")
+    args = parser.parse_args()
+
+    sys.setswitchinterval(1e-5)  # Switch threads often so races have a chance to show
+    config = RoomConfig(args.rows, args.cols, [5, 4, 3, 3, 2])
+    for threads in args.threads:
+        games, shots, failures = run(args.rooms, threads, args.mode, config, args.seed, not args.no_lock)
+        print(f"🧵 {threads} threads, {args.mode}: {games:,.0f} games/s, {shots:,.0f} shots/s, "
+              f"{len(failures)}/{args.rooms} rooms with problems")
+        for room_id, problems in list(failures.items())[:5]:
+            print(f"   room {room_id}: {'; '.join(problems)}")
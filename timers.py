@@ -0,0 +1,133 @@
+import math
+import threading
+import time
+
+TICK = 0.1  # Seconds per tick of the innermost wheel
+SLOT_BITS = 8  # Each wheel has 2**SLOT_BITS slots
+LEVELS = 4  # Wheels; with the defaults the outermost one reaches about 13 years ahead
+
+
+class Timer:
+    """A callback due at a tick of a TimerWheel; cancel() drops it in O(1)"""
+
+    __slots__ = ('wheel', 'due', 'callback', 'args', 'slot')
+
+    def __init__(self, wheel, due, callback, args):
+        self.wheel = wheel
+        self.due = due  # Absolute tick the callback runs at
+        self.callback = callback
+        self.args = args
+        self.slot = None  # The slot dict holding this timer while it is pending
+
+    def cancel(self):
+        with self.wheel.lock:
+            if self.slot is not None:
+                del self.slot[self]
+                self.slot = None
+
+    @property
+    def pending(self):
+        return self.slot is not None
+
+
+class TimerWheel:
+    """Hierarchical timing wheel for very many coarse timeouts
+
+    Level 0 has one slot per tick; each level above has slots as wide as a
+    full turn of the level below. A timer goes in the lowest level whose
+    range reaches its due tick, and when a lower wheel wraps around, the
+    next slot of the wheel above is emptied and its timers re-filed one
+    level down. Scheduling and cancelling are O(1), and so is a tick apart
+    from the timers it fires or moves, so a server can keep a timer per
+    connection and per room without a heap or a thread for each.
+
+    Slots are dicts keyed by timer, so a timer removes itself without a
+    search. Callbacks run from advance(), outside the wheel's lock; they
+    may schedule or cancel timers, and anything they schedule runs on a
+    later tick.
+    """
+
+    def __init__(self, tick=TICK, slot_bits=SLOT_BITS, levels=LEVELS, clock=time.monotonic):
+        self.tick = tick
+        self.bits = slot_bits
+        self.mask = (1 << slot_bits) - 1
+        self.levels = [[{} for _ in range(1 << slot_bits)] for _ in range(levels)]
+        self.span = 1 << (slot_bits * levels)  # Ticks ahead the outermost wheel can hold
+        self.clock = clock
+        self.origin = clock()
+        self.current = 0  # Last tick processed
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return sum(len(slot) for level in self.levels for slot in level)
+
+    def now_tick(self, now=None):
+        return int(((self.clock() if now is None else now) - self.origin) / self.tick)
+
+    def schedule(self, delay, callback, *args):
+        """Run callback(*args) once at least `delay` seconds from now; returns the Timer"""
+        with self.lock:
+            due = max(self.current + 1, math.ceil((self.clock() - self.origin + delay) / self.tick))
+            if due - self.current >= self.span:
+                raise ValueError(f"A delay of {delay}s is beyond the wheel's reach")
+            timer = Timer(self, due, callback, args)
+            self.file(timer)
+        return timer
+
+    def file(self, timer):
+        """Put a timer in the slot of the lowest level that reaches it"""
+        ahead = timer.due - self.current
+        level = 0
+        while ahead >> (self.bits * (level + 1)):
+            level += 1
+        slot = self.levels[level][(timer.due >> (self.bits * level)) & self.mask]
+        slot[timer] = None
+        timer.slot = slot
+
+    def take(self, level, index):
+        """Empty one slot and return the timers it held"""
+        wheel = self.levels[level]
+        slot = wheel[index]
+        if not slot:
+            return ()
+        wheel[index] = {}
+        for timer in slot:
+            timer.slot = None
+        return slot
+
+    def advance(self, now=None):
+        """Process every tick up to `now` and run the timers that fell due; returns how many ran"""
+        target = self.now_tick(now)
+        fired = 0
+        while True:
+            with self.lock:
+                if self.current >= target:
+                    return fired
+                self.current += 1
+                index = self.current & self.mask
+                level = 1
+                while index == 0 and level < len(self.levels):
+                    # A wheel wrapped: spread the next slot of the one above over the wheels below
+                    index = (self.current >> (self.bits * level)) & self.mask
+                    for timer in self.take(level, index):
+                        self.file(timer)
+                    level += 1
+                due = self.take(0, self.current & self.mask)
+            for timer in due:
+                try:
+                    timer.callback(*timer.args)
+                except Exception as e:
+                    print(f"Error in timer {timer.callback.__name__}: {e}")
+                fired += 1
+
+    def run(self, stop=None):
+        """Advance the wheel every tick until `stop` (a threading.Event) is set; for threaded servers"""
+        stop = stop or threading.Event()
+        while not stop.wait(self.tick):
+            self.advance()
+
+    def start(self):
+        """Advance the wheel from a daemon thread; returns the Event that stops it"""
+        stop = threading.Event()
+        threading.Thread(target=self.run, args=(stop,), daemon=True).start()
+        return stop
@@ -0,0 +1,224 @@
+import argparse
+import importlib
+import itertools
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from bot import ExpertTargeter, ProbabilityTargeter
+from fleet import random_fleet
+from game_logic import MISS, SUNK, Board
+from room import RESULT_NAMES, SHIP_SIZES
+
+
+class RandomStrategy:
+    """Shoot unshot cells in random order"""
+
+    def __init__(self, rows, cols, fleet, rng):
+        self.cells = [(x, y) for x in range(rows) for y in range(cols)]
+        rng.shuffle(self.cells)
+
+    def next_shot(self):
+        return self.cells[-1]
+
+    def record(self, x, y, result):
+        self.cells.remove((x, y))
+
+    def sunk(self, size, direction, x, y):
+        pass
+
+
+class HuntStrategy:
+    """Random hunting on a checkerboard, then work outwards from every hit"""
+
+    def __init__(self, rows, cols, fleet, rng):
+        self.rows = rows
+        self.cols = cols
+        self.unshot = {(x, y) for x in range(rows) for y in range(cols)}
+        parity = [(x, y) for x, y in self.unshot if (x + y) % 2 == 0]
+        rng.shuffle(parity)
+        self.hunt = parity + [cell for cell in self.unshot if (cell[0] + cell[1]) % 2]
+        self.targets = []
+
+    def next_shot(self):
+        while self.targets:
+            if self.targets[-1] in self.unshot:
+                return self.targets[-1]
+            self.targets.pop()
+        while self.hunt[-1] not in self.unshot:
+            self.hunt.pop()
+        return self.hunt[-1]
+
+    def record(self, x, y, result):
+        self.unshot.discard((x, y))
+        if result == "hit":
+            self.targets.extend((x + dx, y + dy) for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)))
+
+    def sunk(self, size, direction, x, y):
+        self.targets.clear()
+
+
+class DensityStrategy(ProbabilityTargeter):
+    """The bot's probability-density targeting"""
+
+    def __init__(self, rows, cols, fleet, rng):
+        super().__init__(rows, cols, fleet)
+
+
+class ExpertStrategy(ExpertTargeter):
+    """The solved policy from solver.py, or density targeting if none was saved for the board"""
+
+    def __init__(self, rows, cols, fleet, rng):
+        super().__init__(rows, cols, fleet)
+
+
+# A strategy is built with (rows, cols, fleet, rng) and answers next_shot(),
+# record(x, y, result) and sunk(size, direction, x, y)
+STRATEGIES = {'random': RandomStrategy, 'hunt': HuntStrategy, 'density': DensityStrategy, 'expert': ExpertStrategy}
+
+
+def load_strategy(name):
+    """Look up a built-in strategy or import one given as module:Class"""
+    if name in STRATEGIES:
+        return STRATEGIES[name]
+    module, _, attr = name.partition(':')
+    return getattr(importlib.import_module(module), attr)
+
+
+def play_game(strategy_classes, rows, cols, fleet, seed):
+    """Play one game on Boards and return (winner seat, shots fired by the winner)"""
+    rng = random.Random(seed)
+    boards = []
+    strategies = []
+    for strategy_class in strategy_classes:
+        board = Board(rows, cols)
+        for ship in random_fleet(rows, cols, fleet, rng):
+            board.place(ship["size"], ship["direction"], *ship["position"])
+        boards.append(board)
+        strategies.append(strategy_class(rows, cols, fleet, rng))
+
+    shots = [0, 0]
+    current = 0
+    while True:
+        strategy = strategies[current]
+        target = boards[1 - current]
+        x, y = strategy.next_shot()
+        result = target.fire(x, y)
+        shots[current] += 1
+        strategy.record(x, y, RESULT_NAMES.get(result, "invalid"))
+        if result == SUNK:
+            size, direction, (ship_x, ship_y) = target.fleet[target.last_sunk]
+            strategy.sunk(size, direction, ship_x, ship_y)
+        if target.all_ships_sunk():
+            return current, shots[current]
+        if result == MISS:
+            current = 1 - current
+
+
+def play_match(names, games, rows, cols, fleet, seed):
+    """Play a series between two strategies, alternating who shoots first"""
+    classes = [load_strategy(name) for name in names]
+    wins = [0, 0]
+    shots_to_win = [0, 0]
+    for game in range(games):
+        first = game % 2
+        order = [first, 1 - first]
+        seat, shots = play_game([classes[i] for i in order], rows, cols, fleet, f"{seed}:{names}:{game}")
+        winner = order[seat]
+        wins[winner] += 1
+        shots_to_win[winner] += shots
+    return names, wins, shots_to_win
+
+
+class Standings:
+    """Aggregated results per strategy"""
+
+    def __init__(self, names):
+        self.games = dict.fromkeys(names, 0)
+        self.wins = dict.fromkeys(names, 0)
+        self.shots_to_win = dict.fromkeys(names, 0)
+        self.played = set()  # Pairings already played, for Swiss pairing
+
+    def add(self, names, wins, shots_to_win):
+        self.played.add(frozenset(names))
+        for name, won, shots in zip(names, wins, shots_to_win):
+            self.games[name] += sum(wins)
+            self.wins[name] += won
+            self.shots_to_win[name] += shots
+
+    def ranking(self):
+        return sorted(self.games, key=lambda name: (-self.wins[name], name))
+
+    def print_table(self):
+        print(f"{'strategy':<24}{'games':>8}{'win rate':>10}{'avg shots to win':>18}")
+        for name in self.ranking():
+            games, wins = self.games[name], self.wins[name]
+            rate = wins / games if games else 0
+            shots = self.shots_to_win[name] / wins if wins else float('nan')
+            print(f"{name:<24}{games:>8}{rate:>10.1%}{shots:>18.2f}")
+
+
+def swiss_pairings(standings):
+    """Pair neighbours in the ranking, avoiding rematches where possible"""
+    unpaired = standings.ranking()
+    pairs = []
+    while len(unpaired) > 1:
+        first = unpaired.pop(0)
+        opponent = next((name for name in unpaired if frozenset((first, name)) not in standings.played), unpaired[0])
+        unpaired.remove(opponent)
+        pairs.append((first, opponent))
+    return pairs
+
+
+def run_round(pool, pairs, standings, games, rows, cols, fleet, seed, chunk):
+    """Spread a round's games over the pool and fold results in as they finish"""
+    jobs = []
+    for names in pairs:
+        for start in range(0, games, chunk):
+            jobs.append(pool.submit(play_match, names, min(chunk, games - start), rows, cols, fleet, f"{seed}:{start}"))
+    for job in as_completed(jobs):
+        names, wins, shots = job.result()
+        standings.add(names, wins, shots)
+        print(f"  {names[0]} {wins[0]} - {wins[1]} {names[1]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bot-vs-bot Battleship tournament")
+    parser.add_argument("strategies", nargs='*', default=list(STRATEGIES),
+                        help="built-in strategy names or module:Class paths")
+    parser.add_argument("--format", choices=['round-robin', 'swiss'], default='round-robin')
+    parser.add_argument("--rounds", type=int, default=3, help="rounds for the Swiss format")
+    parser.add_argument("-g", "--games", type=int, default=200, help="games per pairing")
+    parser.add_argument("--chunk", type=int, default=50, help="games per worker job")
+    parser.add_argument("--rows", type=int, default=6)
+    parser.add_argument("--cols", type=int, default=8)
+    parser.add_argument("--fleet", type=lambda s: [int(size) for size in s.split(',')], default=SHIP_SIZES)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if len(set(args.strategies)) != len(args.strategies) or len(args.strategies) < 2:
+        parser.error("need at least two distinct strategies")
+    for name in args.strategies:
+        try:
+            load_strategy(name)
+        except (ImportError, AttributeError, ValueError) as e:
+            parser.error(f"unknown strategy {name!r}: {e}")
+
+    standings = Standings(args.strategies)
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        if args.format == 'round-robin':
+            print("🏆 Round robin")
+            pairs = list(itertools.combinations(args.strategies, 2))
+            run_round(pool, pairs, standings, args.games, args.rows, args.cols, args.fleet, args.seed, args.chunk)
+        else:
+            for round_number in range(1, args.rounds + 1):
+                print(f"🏆 Swiss round {round_number}")
+                pairs = swiss_pairings(standings)
+                run_round(pool, pairs, standings, args.games, args.rows, args.cols, args.fleet,
+                          f"{args.seed}:{round_number}", args.chunk)
+
+    print()
+    standings.print_table()
+
+
+if __name__ == "__main__":
+    main()
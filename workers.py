@@ -0,0 +1,71 @@
+import os
+import queue
+import threading
+from collections import deque
+
+DRAIN_BATCH = 64  # Commands a worker runs for one room before letting other rooms have a turn
+
+
+class RoomPool:
+    """Runs room commands on a pool of worker threads, one at a time per room
+
+    Every room has a mailbox. Submitting to a room whose mailbox was empty
+    schedules a drain of that mailbox on the pool, so a room's commands run
+    in submission order and never overlap, while different rooms proceed on
+    different workers. A busy room is put back in line every DRAIN_BATCH
+    commands so it cannot starve the others.
+
+    No server uses it: BattleshipServer relies on the room lock,
+    AsyncBattleshipServer runs every room on its event loop, and
+    sharded_server spreads rooms over processes. It is here so that
+    stress_rooms.py can compare the mailbox model with the lock.
+    """
+
+    def __init__(self, workers=None):
+        self.ready = queue.SimpleQueue()  # Rooms with a drain scheduled; None stops a worker
+        self.mailboxes = {}  # room -> deque of (function, args); present while a drain is scheduled
+        self.lock = threading.Lock()  # Guards mailboxes
+        self.idle = threading.Condition(self.lock)  # Notified when the last mailbox empties
+        self.workers = [threading.Thread(target=self.work, daemon=True) for _ in range(workers or os.cpu_count())]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, room, function, *args):
+        """Queue function(*args) to run after every command already queued for the room"""
+        with self.lock:
+            mailbox = self.mailboxes.get(room)
+            idle = mailbox is None
+            if idle:
+                mailbox = self.mailboxes[room] = deque()
+            mailbox.append((function, args))
+        if idle:
+            self.ready.put(room)
+
+    def work(self):
+        while (room := self.ready.get()) is not None:
+            self.drain(room)
+
+    def drain(self, room):
+        for _ in range(DRAIN_BATCH):
+            with self.lock:
+                mailbox = self.mailboxes[room]
+                if not mailbox:
+                    del self.mailboxes[room]
+                    if not self.mailboxes:
+                        self.idle.notify_all()
+                    return
+                function, args = mailbox.popleft()
+            try:
+                function(*args)
+            except Exception as e:
+                print(f"Error in room {getattr(room, 'room_id', room)}: {e}")
+        self.ready.put(room)
+
+    def shutdown(self):
+        """Wait for the queued commands and stop the workers"""
+        with self.idle:
+            self.idle.wait_for(lambda: not self.mailboxes)
+        for _ in self.workers:
+            self.ready.put(None)
+        for worker in self.workers:
+            worker.join()